@@ -0,0 +1,362 @@
+# Fonctions communes générateur d'impulsions BNC505, sans dépendance Qt
+# By Arthur Péraud
+import io
+import csv
+import json
+import time
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from Instrument_pool import POOL
+
+PULSE_GENERATOR = "GPIB0::9::INSTR"
+CHANNELS = (1, 2, 3, 4)
+RESET_ON_INIT = False   # True : *RST à l'ouverture de session (comportement historique)
+PRESETS_FILE = "BNC505_presets.json"    # Presets locaux + contenu connu des slots *SAV/*RCL
+PRESET_SLOTS = tuple(range(1, 13))      # Slots utilisateur du BNC505 (0 : config par défaut)
+
+# Relecture : paramètres vérifiés par canal actif, et résolution instrument pour la comparaison
+VERIFY_CHANNEL_PARAMS = ("OUTP:AMPL", "WIDT", "DELAY", "CMODE")
+RESOLUTION = {"OUTP:AMPL": 0.01, "WIDT": 1e-11, "DELAY": 1e-11, "PER": 1e-11}   # V, s
+RELATIVE_TOL = 1e-6     # Tolérance relative (périodes / largeurs longues)
+
+
+def MHz_to_s(mhz: float) -> float:
+    if mhz <= 0:
+        raise ValueError("Frequence doit être > 0 MHz")
+    return 1.0 / (mhz * 1e6)
+
+
+class PulseGeneratorState:
+    """Etat connu du générateur : {en-tête SCPI: valeur} des dernières commandes envoyées.
+
+    apply() n'envoie que les commandes dont la valeur diffère de l'état connu : pas de *RST,
+    la sortie n'est pas interrompue pour un changement de largeur ou de retard.
+    clear() (état inconnu) force une écriture complète au prochain apply().
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.idn = None         # *IDN? de l'instrument de la session (slots propres à l'instrument)
+        self.lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.values.clear()
+            self.idn = None
+
+    def assume(self, desired: dict) -> None:
+        """Etat connu sans écriture (après un *RCL d'un slot dont le contenu est connu)."""
+        with self.lock:
+            self.values = dict(desired)
+
+    def forget(self, headers) -> None:
+        """Valeurs non confirmées par la relecture : renvoyées au prochain apply()."""
+        with self.lock:
+            for header in headers:
+                self.values.pop(header, None)
+
+    def identity(self, pulse_generator) -> str:
+        if self.idn is None:
+            self.idn = pulse_generator.query("*IDN?").strip()
+        return self.idn
+
+    def apply(self, pulse_generator, desired: dict, force: bool = False) -> list:
+        """Envoie les commandes nécessaires (dans l'ordre de desired), retourne celles envoyées."""
+        sent = []
+        with self.lock:
+            for header, value in desired.items():
+                if not force and self.values.get(header) == value:
+                    continue
+                # Etat inconnu tant que l'écriture n'a pas abouti
+                self.values.pop(header, None)
+                pulse_generator.write(f"{header} {value}")
+                self.values[header] = value
+                sent.append(f"{header} {value}")
+        return sent
+
+
+STATE = PulseGeneratorState()   # Etat partagé, associé à la session du pool
+
+
+def Pulse_generator_init(pulse_generator) -> None:
+    """Rejouée par le pool seulement si l'état de la session est inconnu."""
+    STATE.clear()
+    if RESET_ON_INIT:
+        pulse_generator.write("*RST")
+    pulse_generator.write("*CLS")
+
+
+def Gpid_devices_open():
+    """Session du pool, gardée ouverte entre deux Start."""
+    pulse_generator = POOL.open(PULSE_GENERATOR, Pulse_generator_init)
+    return POOL, pulse_generator
+
+
+def Invalidate() -> None:
+    """Erreur en cours d'échange : état du générateur inconnu."""
+    STATE.clear()
+    POOL.invalidate(PULSE_GENERATOR)
+
+
+def CLOSE_ALL(pulse_generator, pool) -> None:
+    pool.release(PULSE_GENERATOR)
+
+
+def Channel_commands(channel: int,
+                     ampl_v: float,
+                     width_s: float,
+                     delay_s: float,
+                     wait_count: int = 0,      # Nb de pulses à attendre
+                     mode: str = "NORMAL",
+                     polarity: str = "NORMAL",
+                     gate: str = "DISABLE") -> dict:
+    return {
+        f":PULSE{channel}:STATE": "ON",
+        f":PULSE{channel}:OUTP:AMPL": f"{ampl_v:.6f}",
+        f":PULSE{channel}:WIDT": f"{width_s:.12f}",
+        f":PULSE{channel}:DELAY": f"{delay_s:.12f}",
+        # Toujours écrit : sans *RST, un ancien compteur resterait actif
+        f":PULSE{channel}:WCOUNTER": f"{wait_count}N",
+        f":PULSE{channel}:CMODE": mode,
+        f":PULSE{channel}:POL": polarity,
+        f":PULSE{channel}:CGATE": gate,
+    }
+
+
+def System_commands(period_s: float, trigger: str = "DISABLED") -> dict:
+    return {
+        ":PULSE0:EXT:MODE": trigger,
+        ":PULSE0:MODE": "NORM",
+        ":PULSE0:PER": f"{period_s:.12f}",
+        ":PULSE0:STATE": "ON",
+    }
+
+
+def Pulse_commands(channels: dict, ampl_v: float, period_s: float, width_s: float, delay_s: float,
+                   wait_count: int = 0, mode: str = "NORMAL", polarity: str = "NORMAL",
+                   gate: str = "DISABLE", trigger: str = "DISABLED") -> dict:
+    """Etat complet voulu pour T1..T4 ({canal: actif}) et le système (PULSE0)."""
+    desired = {}
+    for ch in CHANNELS:
+        if channels.get(ch, False):
+            desired.update(Channel_commands(ch, ampl_v, width_s, delay_s, wait_count, mode, polarity, gate))
+        else:
+            desired[f":PULSE{ch}:STATE"] = "OFF"
+    desired.update(System_commands(period_s, trigger))
+    return desired
+
+
+def Verify_state(pulse_generator, desired: dict) -> list:
+    """Relit amplitude, largeur, retard et mode des canaux actifs et la période système
+    en UN message (requêtes concaténées par ';'), compare à desired à la résolution près.
+    Retourne les écarts [(en-tête, demandé, relu)] ; leurs valeurs sont retirées du cache."""
+    headers = []
+    for ch in CHANNELS:
+        if desired.get(f":PULSE{ch}:STATE") == "ON":
+            headers += [f":PULSE{ch}:{param}" for param in VERIFY_CHANNEL_PARAMS if f":PULSE{ch}:{param}" in desired]
+    if ":PULSE0:PER" in desired:
+        headers.append(":PULSE0:PER")
+    if not headers:
+        return []
+
+    answers = pulse_generator.query(";".join(f"{h}?" for h in headers)).strip().split(";")
+    if len(answers) != len(headers):
+        STATE.forget(headers)
+        raise RuntimeError(f"Relecture : {len(answers)} réponse(s) pour {len(headers)} requête(s)")
+
+    mismatches = []
+    for header, answer in zip(headers, answers):
+        expected = desired[header]
+        answer = answer.strip()
+        resolution = RESOLUTION.get(header.split(":", 2)[2])
+        if resolution is None:
+            # Mot-clé SCPI : forme courte acceptée (NORM / NORMAL), réponse vide refusée
+            ok = bool(answer) and (expected.upper().startswith(answer.upper())
+                                   or answer.upper().startswith(expected.upper()))
+        else:
+            try:
+                ok = abs(float(answer) - float(expected)) <= max(resolution, RELATIVE_TOL * abs(float(expected)))
+            except ValueError:
+                ok = False
+        if not ok:
+            mismatches.append((header, expected, answer))
+    STATE.forget(h for h, _, _ in mismatches)
+    return mismatches
+
+
+def Create_pulse(pulse_generator,
+                 channel: int,
+                 ampl_v: float,
+                 period_s: float,
+                 width_s: float,
+                 delay_s: float,
+                 wait_count: int = 0,
+                 mode: str = "NORMAL",
+                 polarity: str = "NORMAL",
+                 gate: str = "DISABLE",
+                 trigger: str = "DISABLED",) -> list:
+    """Un canal + le système, uniquement les paramètres modifiés."""
+    desired = Channel_commands(channel, ampl_v, width_s, delay_s, wait_count, mode, polarity, gate)
+    desired.update(System_commands(period_s, trigger))
+    return STATE.apply(pulse_generator, desired)
+
+
+def Stop_all(pulse_generator) -> list:
+    """T1..T4 et PULSE0 à OFF, envoyés même si l'état connu est déjà OFF (sécurité)."""
+    desired = {f":PULSE{ch}:STATE": "OFF" for ch in CHANNELS}
+    desired[":PULSE0:STATE"] = "OFF"
+    return STATE.apply(pulse_generator, desired, force=True)
+
+
+### Presets
+class PresetStore:
+    """Presets nommés (formulaire GUI) et contenu des slots de chaque instrument, dans PRESETS_FILE.
+
+    {"presets": {nom: formulaire},
+     "slots": {idn: {"3": {"name": nom, "desired": {en-tête SCPI: valeur}}}},
+     "last_idn": idn}
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else Path(__file__).resolve().parent / PRESETS_FILE
+        self.presets = {}
+        self.slots = {}
+        self.last_idn = None
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                data = json.load(f)
+            self.presets = data.get("presets", {})
+            self.slots = data.get("slots", {})
+            self.last_idn = data.get("last_idn")
+
+    def save(self) -> None:
+        data = {"presets": self.presets, "slots": self.slots, "last_idn": self.last_idn}
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, ensure_ascii=False)
+        tmp.replace(self.path)
+
+    def instrument_slots(self, idn: str = None) -> dict:
+        return self.slots.get(idn or self.last_idn or "", {})
+
+    def set_slot(self, idn: str, slot: int, name: str, desired: dict) -> None:
+        self.slots.setdefault(idn, {})[str(slot)] = {"name": name, "desired": desired}
+        self.last_idn = idn
+        self.save()
+
+    def slot(self, idn: str, slot: int):
+        return self.instrument_slots(idn).get(str(slot))
+
+
+def Save_to_slot(pulse_generator, slot: int, desired: dict) -> list:
+    """Applique desired (commandes modifiées seulement) puis *SAV slot."""
+    if slot not in PRESET_SLOTS:
+        raise ValueError(f"Slot {slot} hors de {PRESET_SLOTS[0]}..{PRESET_SLOTS[-1]}")
+    sent = STATE.apply(pulse_generator, desired)
+    pulse_generator.write(f"*SAV {slot}")
+    return sent
+
+
+def Recall_slot(pulse_generator, slot: int, desired: dict = None) -> None:
+    """*RCL slot : une commande au lieu de toute la configuration.
+    desired : contenu connu du slot (état du cache), None si inconnu (écriture complète au prochain apply)."""
+    if slot not in PRESET_SLOTS:
+        raise ValueError(f"Slot {slot} hors de {PRESET_SLOTS[0]}..{PRESET_SLOTS[-1]}")
+    pulse_generator.write(f"*RCL {slot}")
+    STATE.assume(desired or {})
+
+
+### Séquenceur
+SEQUENCE_PARAMS = ("width_s", "delay_s", "period_s", "ampl_v")
+TIMESTAMP_HEADERS = ["Pas", "Horodatage", "Epoch (s)", *SEQUENCE_PARAMS, "Dwell (s)", "Commandes"]
+
+
+def Sequence_range(param: str, start: float, stop: float, step: float) -> list:
+    """[{param: valeur}] de start à stop inclus (grille entière : pas de dérive des flottants)."""
+    if param not in SEQUENCE_PARAMS:
+        raise ValueError(f"Paramètre de séquence inconnu : {param}")
+    if step == 0:
+        raise ValueError("Pas de séquence doit être non nul")
+    n = int(round((stop - start) / step))
+    if n < 0:
+        raise ValueError("Pas de séquence de signe opposé à stop - start")
+    return [{param: start + k * step} for k in range(n + 1)]
+
+
+def Load_sequence_table(path: str) -> list:
+    """Table CSV (';' ou ','), une ligne par pas, colonnes parmi SEQUENCE_PARAMS et dwell_s (unités SI)."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        text = f.read()
+    delimiter = ";" if ";" in text.splitlines()[0] else ","
+    rows = list(csv.DictReader(io.StringIO(text), delimiter=delimiter))
+
+    steps = []
+    for i, row in enumerate(rows, start=2):
+        step = {}
+        for key, value in row.items():
+            key = (key or "").strip()
+            if not key or value is None or not value.strip():
+                continue
+            if key not in SEQUENCE_PARAMS + ("dwell_s",):
+                raise ValueError(f"{path} : colonne inconnue '{key}' (attendu : {', '.join(SEQUENCE_PARAMS)}, dwell_s)")
+            try:
+                step[key] = float(value.replace(",", ".") if delimiter == ";" else value)
+            except ValueError:
+                raise ValueError(f"{path} ligne {i} : valeur invalide '{value}' pour {key}")
+        if step:
+            steps.append(step)
+    if not steps:
+        raise ValueError(f"{path} : table vide")
+    return steps
+
+
+def Run_sequence(pulse_generator, base: dict, steps: list, dwell_s: float, log_func=print,
+                 stop_event: threading.Event = None, timestamps_file: str = None) -> int:
+    """Joue les pas sur la session ouverte : à chaque pas, seuls les paramètres modifiés sont envoyés
+    (STATE.apply), puis attente du dwell sur échéances absolues (time.monotonic).
+
+    base : arguments de Pulse_commands (period_s au lieu de la fréquence), complétés par chaque pas.
+    timestamps_file : CSV de l'instant d'application de chaque pas (corrélation avec d'autres mesures).
+    stop_event : interrompt la séquence entre deux pas / pendant un dwell. Retourne le nb de pas joués.
+    """
+    out = None
+    writer = None
+    if timestamps_file:
+        out = open(timestamps_file, "w", newline="", encoding="utf-8")
+        writer = csv.writer(out, delimiter=";")
+        writer.writerow(TIMESTAMP_HEADERS)
+
+    played = 0
+    try:
+        deadline = time.monotonic()
+        for i, step in enumerate(steps, start=1):
+            if stop_event is not None and stop_event.is_set():
+                break
+            config = {**base, **{k: v for k, v in step.items() if k != "dwell_s"}}
+            dwell = step.get("dwell_s", dwell_s)
+
+            sent = STATE.apply(pulse_generator, Pulse_commands(**config))
+            now = time.time()
+            played += 1
+
+            log_func(f"Pas {i}/{len(steps)} | " + " | ".join(f"{k} {config[k]:.6g}" for k in step if k != "dwell_s")
+                     + f" | {len(sent)} cmd")
+            if writer:
+                writer.writerow([i, datetime.fromtimestamp(now).isoformat(timespec="milliseconds"), f"{now:.3f}",
+                                 *[f"{config[k]:.12g}" for k in SEQUENCE_PARAMS], f"{dwell:g}", len(sent)])
+                out.flush()
+
+            deadline += dwell
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                if stop_event is not None:
+                    if stop_event.wait(remaining):
+                        break
+                else:
+                    time.sleep(remaining)
+    finally:
+        if out:
+            out.close()
+    return played
@@ -1,11 +1,15 @@
 # By Arthur Péraud 12/2025
-import os, openpyxl, sys, subprocess, csv, io 
-import pandas as pd
+import openpyxl, subprocess, io, typing
 import numpy as np
 from openpyxl.workbook import Workbook
 from openpyxl.worksheet.worksheet import Worksheet
 from pathlib import Path
 
+from Workbook_save import Save_workbook_safely
+
+if typing.TYPE_CHECKING:
+    import pandas as pd
+
 
 def Ltoi(c: str) -> int:
     """ """
@@ -17,8 +21,10 @@ def Find_sheet_index(wb : Workbook, sheet_name : str) -> int:
     return wb.sheetnames.index(sheet_name) if sheet_name in wb.sheetnames else -1
 
 
-def Read_mdb_table(path_mdb: str, table_name: str) -> pd.DataFrame:
-    """ """
+def Read_mdb_table(path_mdb: str, table_name: str) -> "pd.DataFrame":
+    """pandas importé au premier appel (démarrage de Gui_Cal_Switch_SPXT)"""
+    import pandas as pd
+
     cmd = ["mdb-export", path_mdb, table_name]
     result = subprocess.run(cmd, check=True, capture_output=True, text=True)
     data = io.StringIO(result.stdout)
@@ -39,36 +45,6 @@ def Get_col_from_mdb(mdb_file : Path, table_name : str, col_name : str) -> np.ar
     return df.to_numpy()
 
 
-def Get_unique_filename(path : str) -> str:
-    """Génère un nom de fichier unique en ajoutant (1), (2), etc. s'il existe déjà."""
-    base, ext = os.path.splitext(path)
-    i = 1
-    new_path = path
-    while os.path.exists(new_path):
-        new_path = f"{base}({i}){ext}"
-        i += 1
-    return new_path
-
-
-def Save_workbook_safely(wb : Workbook, output_file: str) -> None:
-    """Sauvegarde fichier excel, confirmation si existence sinon préfixe est ajouté (Get_unique_filename)."""
-    if os.path.exists(output_file):
-        confirm = input(f"⚠️  Le fichier '{output_file}' existe déjà. Voulez-vous l’écraser ? (o/n) : ").strip().lower()
-        
-        if confirm == 'o' or confirm == 'y':
-            wb.save(output_file)
-            print(f"✅ Fichier écrasé et sauvegardé sous {output_file}")
-        elif confirm == 'n':
-            new_file = Get_unique_filename(output_file)
-            wb.save(new_file)
-            print(f"📁 Fichier sauvegardé sous un nouveau nom : {new_file}")
-        else:
-            print("Réponse non reconnue")
-    else:
-        wb.save(output_file)
-        print(f"✅ Fichier sauvegardé sous {output_file}")
-
-
 def Add_offset(arr: np.ndarray, spacing: float = 0.1, min_range: float = 1.0) -> np.ndarray:
     """"""
     n_traces, _ = arr.shape
@@ -0,0 +1,132 @@
+# Feuille "Data" écrite en flux pour les acquisitions (9020B)
+# By Arthur Péraud
+import struct
+import tempfile
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import column_index_from_string
+from openpyxl.workbook import Workbook
+
+FIRST_ROW = 3   # Ligne 1 : en-têtes, ligne 2 : vide, données à partir de la ligne 3
+PENDING_ROWS = 1000             # Lignes incomplètes gardées en mémoire avant déversement sur disque
+SPOOL_RECORD = struct.Struct("<?d")  # Fichier temporaire par colonne : (présent, valeur) à l'offset index
+
+
+class DataSheetWriter:
+    """Ecrit la feuille "Data" point par point.
+
+    headers : {'B': 'Fréquence (GHz)', 'C': '-30 dBm', ...} (ligne 1).
+    streaming=True  : classeur write-only, une ligne est émise dès que toutes ses
+                      colonnes sont connues. Sweep colonne par colonne (plusieurs amplitudes) :
+                      au-delà de PENDING_ROWS lignes incomplètes, leurs valeurs sont déversées
+                      dans un fichier temporaire par colonne et relues à l'émission de la ligne.
+    streaming=False : classeur openpyxl classique (une cellule par point).
+    """
+
+    def __init__(self, headers: dict, number_format: str, streaming: bool = True):
+        self.headers = dict(headers)
+        self.number_format = number_format
+        self.streaming = streaming
+
+        self.columns = sorted(self.headers, key=column_index_from_string)
+        self.width = column_index_from_string(self.columns[-1])
+
+        self.pending = {}       # index -> {col: valeur}, lignes pas encore écrites
+        self.spool = {}         # col -> fichier temporaire des valeurs déversées
+        self.last_index = -1    # plus grand index reçu
+        self.next_index = 0     # prochain index à émettre (mode streaming)
+        self.closed = False
+
+        if streaming:
+            self.wb = openpyxl.Workbook(write_only=True)
+            self.sheet = self.wb.create_sheet("Data")
+            self.sheet.append(self._row_values(self.headers, formatted=False))
+            self.sheet.append([])
+        else:
+            self.wb = openpyxl.Workbook()
+            self.sheet = self.wb.active
+            self.sheet.title = "Data"
+            for col, text in self.headers.items():
+                self.sheet[f'{col}1'] = text
+
+    def _row_values(self, values: dict, formatted: bool = True) -> list:
+        row = [None] * self.width
+        for col, value in values.items():
+            if formatted and value is not None:
+                cell = WriteOnlyCell(self.sheet, value=value)
+                cell.number_format = self.number_format
+                value = cell
+            row[column_index_from_string(col) - 1] = value
+        return row
+
+    def _spill(self) -> None:
+        """Lignes incomplètes vers les fichiers temporaires, la mémoire est libérée."""
+        for index, values in self.pending.items():
+            for col, value in values.items():
+                if col not in self.spool:
+                    self.spool[col] = tempfile.TemporaryFile()
+                f = self.spool[col]
+                f.seek(index * SPOOL_RECORD.size)
+                f.write(SPOOL_RECORD.pack(True, value))
+        self.pending.clear()
+
+    def _row(self, index: int) -> dict:
+        """Valeurs connues de la ligne index (mémoire + fichiers temporaires)."""
+        values = {}
+        for col, f in self.spool.items():
+            f.seek(index * SPOOL_RECORD.size)
+            record = f.read(SPOOL_RECORD.size)
+            if len(record) == SPOOL_RECORD.size:
+                present, value = SPOOL_RECORD.unpack(record)
+                if present:
+                    values[col] = value
+        values.update(self.pending.get(index, {}))
+        return values
+
+    def _flush(self, force: bool = False) -> None:
+        while self.next_index <= self.last_index:
+            values = self._row(self.next_index)
+            if not force and len(values) < len(self.columns):
+                return
+            # Trou (point absent) : ligne vide pour garder l'alignement
+            self.sheet.append(self._row_values(values) if values else [])
+            self.pending.pop(self.next_index, None)
+            self.next_index += 1
+
+    def set(self, index: int, col: str, value: float) -> None:
+        """Valeur du point n° index (0 -> ligne 3) dans la colonne col."""
+        if self.closed:
+            raise RuntimeError("DataSheetWriter déjà finalisé")
+        if col not in self.headers:
+            raise KeyError(f"Colonne '{col}' non déclarée dans les en-têtes")
+
+        if not self.streaming:
+            cell = self.sheet[f'{col}{index + FIRST_ROW}']
+            cell.value = value
+            cell.number_format = self.number_format
+            return
+
+        if index < self.next_index:
+            raise ValueError(f"Ligne {index + FIRST_ROW} déjà écrite")
+        self.pending.setdefault(index, {})[col] = value
+        self.last_index = max(self.last_index, index)
+        if index == self.next_index:
+            self._flush()
+        elif len(self.pending) > PENDING_ROWS:
+            self._spill()
+
+    def set_row(self, index: int, values: dict) -> None:
+        """Plusieurs colonnes du même point d'un coup ({'B': t, 'C': level})."""
+        for col, value in values.items():
+            self.set(index, col, value)
+
+    def finalize(self) -> Workbook:
+        """Emet les lignes restantes (incomplètes comprises) et retourne le classeur."""
+        if not self.closed:
+            if self.streaming:
+                self._flush(force=True)
+                for f in self.spool.values():
+                    f.close()
+                self.spool.clear()
+            self.closed = True
+        return self.wb
@@ -1,106 +1,28 @@
 # Cal Info Mesure GUI - 9020B
 # By Arthur Péraud 12/2025
 import sys
-import os
-import openpyxl
-import pandas as pd
-import numpy as np
-import time
-import pyvisa
+import threading
 from pathlib import Path
-from openpyxl.workbook import Workbook
-from datetime import timedelta
+
+from Log_sink import LogSink
+from Gui_startup import Lazy_import, Preload_after_show
+from Workbook_save import Save_workbook_async
+from MI9020B_config import (
+    ADAPT_THRESHOLD_DB, ADAPT_SPEC_DB, ADAPT_MIN_STEP, ADAPT_BUDGET, Default_bench, Load_benches, Bench_addresses
+)
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QFormLayout, QLineEdit, QPushButton,
-    QVBoxLayout, QHBoxLayout, QMessageBox, QPlainTextEdit, QGridLayout, QFrame
+    QVBoxLayout, QHBoxLayout, QMessageBox, QPlainTextEdit, QGridLayout, QFrame, QCheckBox, QComboBox
 )
-from PySide6.QtCore import Qt, QCoreApplication, QThread, Signal
+from PySide6.QtCore import Qt, QObject, QThread, Signal
 from PySide6.QtGui import QIcon, QPixmap
 from PySide6.QtWidgets import QLabel
 
 ### Constants
-PRECISION = 3
-NB_DIGIT = 3      # Power Meter
-NB_ESE_BITS = 60
-NB_QUES_BITS = 952
-DEBUG = False
-
-def PRINT(*args, **kwargs):
-    if DEBUG:
-        return __builtins__.print(*args, **kwargs)
-
-def Hz_to_GHz(x: float) -> float:
-    return x * 1E9
-
-def Float_precision_str(n: int) -> str:
-    s = '#,##0.'
-    for i in range(n):
-        s += '0'
-    return s
-
-def Excel_name(name: str, precision: int, freq_start: float, freq_stop: float, nb_points: float, 
-               dwel: float, amp_start: float, amp_stop: float, amp_step: float, freq_multi : float) -> str:
-
-    def format_amp(amp: float) -> str:
-        if amp < 0:
-            return f"Neg{int(abs(amp))}"
-        return str(int(amp))
-
-    s = name
-    if freq_multi > 1:
-        s += f"_MI-757-{int(freq_multi)}X.xlsx"
-    else:
-        s += f"_{format_amp(amp_start)}"
-        s += f"_{format_amp(amp_stop)}"
-        s += f'_MI-9020B.xlsx'
-    return Path(s)
-
-def Excel_Index(n):
-    if n < 0: raise ValueError("n<0")
-    result = []
-    n += 1
-    while n > 0:
-        n -= 1
-        result.append(chr(ord('A') + (n % 26)))
-        n //= 26
-    return ''.join(reversed(result))
-
-def Get_unique_filename(path: str) -> str:
-    base, ext = os.path.splitext(path)
-    i = 1
-    new_path = path
-    while os.path.exists(new_path):
-        new_path = f"{base}({i}){ext}"
-        i += 1
-    return new_path
-
-def Build_path_names(name: str, client: str, year: int) -> Path:
-    base_dir = Path(rf"E:\\Cal Info Mesure\\{client}\\Data {year}")
-    base_dir.mkdir(parents=True, exist_ok=True)
-    return base_dir / name
-
-def Save_workbook_safely(wb: Workbook, output_file: str, log_func=None) -> None:
-    if os.path.exists(output_file):
-        if log_func:
-            log_func(f"⚠️ Fichier existe: {output_file}")
-        new_file = Get_unique_filename(output_file)
-        wb.save(new_file)
-        if log_func:
-            log_func(f"📁 Sauvegardé: {new_file}")
-    else:
-        wb.save(output_file)
-        if log_func:
-            log_func(f"✅ Sauvegardé: {output_file}")
-
-def format_time_remaining(seconds: float) -> str:
-    """Convert seconds to HH:MM:SS format"""
-    if seconds < 0:
-        return "00:00:00"
-    td = timedelta(seconds=int(seconds))
-    hours, remainder = divmod(td.seconds, 3600)
-    minutes, secs = divmod(remainder, 60)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+LOG_FILE = None     # ex: "FreqSweep_9020B.log" pour garder le journal complet
+# Acquisition (numpy, openpyxl, pyvisa) : chargée en fond après l'affichage, ou au premier run
+PRELOAD_MODULES = ("MI9020B",)
 
 class AcquisitionThread(QThread):
     log_signal = Signal(str)
@@ -108,7 +30,9 @@ class AcquisitionThread(QThread):
     error_signal = Signal(str)
     time_remaining_signal = Signal(str)
     
-    def __init__(self, year, client, freq_start, freq_stop, freq_step, dwel, amp_start, amp_step, amp_stop, freq_multi):
+    def __init__(self, year, client, freq_start, freq_stop, freq_step, dwel, amp_start, amp_step, amp_stop, freq_multi,
+                 adaptive=False, threshold_db=ADAPT_THRESHOLD_DB, spec_db=ADAPT_SPEC_DB,
+                 min_step=ADAPT_MIN_STEP, budget=ADAPT_BUDGET, bench=None, addresses=None):
         super().__init__()
         self.year = year
         self.client = client
@@ -120,175 +44,137 @@ class AcquisitionThread(QThread):
         self.amp_step = amp_step
         self.amp_stop = amp_stop
         self.freq_multi = freq_multi
+        self.adaptive = adaptive
+        self.threshold_db = threshold_db
+        self.spec_db = spec_db
+        self.min_step = min_step
+        self.budget = budget
+        self.bench = bench
+        self.addresses = addresses or Default_bench()
+        self.save_job = None    # SaveJob : copie vers le partage encore en cours à la fin du run
         
     def log(self, message):
         self.log_signal.emit(message)
     
-    def calculate_total_points(self) -> int:
-        """Calcule le nombre total de points à acquérir"""
-        freq_points = int((self.freq_stop - self.freq_start) / self.freq_step + 1)
-        
-        if self.amp_step == 0:
-            return freq_points
-        else:
-            amp_points = int((self.amp_stop - self.amp_start) / self.amp_step + 1)
-            return freq_points * amp_points
-    
     def run(self):
         try:
-            rm, power_meter, signal_source = Gpid_devices_open()
-            
-            Signal_source_init(signal_source)
-            Power_meter_init(power_meter)
+            mi = Lazy_import("MI9020B")
+            pool, power_meter, signal_source = mi.Gpid_devices_open(self.addresses)
             
-            excel_name = Excel_name('Flatness', PRECISION, self.freq_start, self.freq_stop, 
-                                  self.freq_step, self.dwel, self.amp_start, self.amp_stop, self.amp_step, self.freq_multi)
+            excel_name = mi.Excel_name('Flatness', mi.PRECISION, self.freq_start, self.freq_stop, 
+                                  self.freq_step, self.dwel, self.amp_start, self.amp_stop, self.amp_step, self.freq_multi,
+                                  self.bench or "")
             
-            excel = openpyxl.Workbook()
-            sheet = excel.active
-            sheet.title = "Data"
-            sheet['B1'] = 'Fréquence (GHz)'
+            excel = mi.Flatness_acquisition(power_meter, signal_source, self.freq_start, self.freq_stop, self.freq_step,
+                                            self.dwel, self.amp_start, self.amp_step, self.amp_stop, self.freq_multi,
+                                            self.log, self.time_remaining_signal, self.adaptive, self.threshold_db,
+                                            self.spec_db, self.min_step, self.budget)
             
-            self.log('START ACQUISITION')
-            start_tot = time.time()
+            # Copie vers le partage en fond : le banc est libéré dès la sérialisation locale
+            output_file = mi.Build_path_names(str(excel_name), self.client, self.year)
+            self.save_job = Save_workbook_async(excel, str(output_file), "rename", self.log)
             
-            total_points = self.calculate_total_points()
-            points_acquired = 0
-            
-            if self.amp_step == 0:
-                col = 'C'
-                points_acquired = Sweep_freq(excel, power_meter, signal_source, self.freq_start, self.freq_stop, 
-                          self.freq_step, self.dwel, self.amp_start, self.freq_multi, col, self.log, 
-                          start_tot, total_points, points_acquired, self.time_remaining_signal)
-            else:
-                k = 2
-                for i in range(int(self.amp_start), int(self.amp_stop)+1, int(self.amp_step)):
-                    col = Excel_Index(k)
-                    points_acquired = Sweep_freq(excel, power_meter, signal_source, self.freq_start, self.freq_stop, 
-                              self.freq_step, self.dwel, i, self.freq_multi, col, self.log,
-                              start_tot, total_points, points_acquired, self.time_remaining_signal)
-                    k = k + 1
-            
-            end_tot = time.time()
-            self.log(f'TOTAL TIME: {end_tot - start_tot:.3f}s')
-            
-            output_file = Build_path_names(str(excel_name), self.client, self.year)
-            Save_workbook_safely(excel, str(output_file), self.log)
-            
-            CLOSE_ALL(signal_source, power_meter, excel, rm)
-            self.finished_signal.emit(str(output_file))
+            mi.CLOSE_ALL(self.addresses, excel)
+            self.finished_signal.emit(self.save_job.path)
             
         except Exception as e:
+            # Etat des instruments inconnu : init complète au prochain run (pool chargé seulement si import réussi)
+            instrument_pool = sys.modules.get("Instrument_pool")
+            for address in Bench_addresses(self.addresses) if instrument_pool else ():
+                instrument_pool.POOL.invalidate(address)
             self.error_signal.emit(str(e))
 
-def Gpid_devices_open():
-    rm = pyvisa.ResourceManager()
-    power_meter = rm.open_resource('GPIB0::13::INSTR')
-    signal_source = rm.open_resource('TCPIP::192.168.10.100::INSTR')
-    
-    power_meter.write('SYST:LANG SCPI')
-    signal_source.write('SYST:LANG SCPI')
-    time.sleep(0.2)
-    
-    return rm, power_meter, signal_source
-
-def Signal_source_init(signal_source):
-    # signal_source.write('*RST')
-    signal_source.write('*CLS')
-    signal_source.write('*ESE 0')
-    signal_source.write('*SRE 0')
-
-def Power_meter_init(power_meter):
-    power_meter.write('*CLS')
-    power_meter.write('*ESE 1')
-    power_meter.write('UNIT:POW dBm')
-    power_meter.write(f'DISP:RES {NB_DIGIT}')
-
-def Show_parameters_sweep_freq(freq_start, freq_stop, nb_points, dwel, amplitude, log_func):
-    log_func(f'SWEEP FREQ | fstart:{freq_start:.3f}GHz fstop:{freq_stop:.3f}GHz pts:{nb_points} dwel:{dwel:.3f}ms amp:{amplitude}dBm')
-
-def Sweep_freq(excel, power_meter, signal_source, freq_start, freq_stop, freq_step, dwel, amplitude, freq_multi, col, log_func,
-               start_tot, total_points, points_acquired, time_remaining_signal):
-    freq_start = Hz_to_GHz(freq_start)
-    freq_stop = Hz_to_GHz(freq_stop)
-    freq_step = Hz_to_GHz(freq_step)
-    
-    sheet = excel.active
-    sheet[f'{col}1'] = f'{amplitude} dBm'
-    
-    signal_source.write('OUTP ON')
-    signal_source.write(f'POW {amplitude} dBm')
-    
-    freqcal = freq_start / freq_multi
-    freq = freq_start
-    precision_string = Float_precision_str(PRECISION)
-    
-    nb_points = int((freq_stop - freq_start) / freq_step + 1)
+class BenchScheduler(QObject):
+    """File de jobs par banc : un AcquisitionThread par banc en parallèle,
+    les jobs d'un même banc s'enchaînent. Chaque job a son ETA et son fichier."""
+    job_finished = Signal(str, str)   # banc, fichier (copie vers le partage en cours)
+    job_error = Signal(str, str)      # banc, message
+    save_finished = Signal(str, str)  # banc, fichier écrit sur le partage
+    save_error = Signal(str, str)     # banc, message
+    _done = Signal(str, str, str)     # banc, fichier, message d'erreur (interne)
+    _saved = Signal(str, str, str)    # banc, fichier, message d'erreur (interne, depuis le thread de copie)
+
+    def __init__(self, benches: dict, log_func, eta_func, parent=None):
+        super().__init__(parent)
+        self.benches = benches
+        self.log_func = log_func      # Thread-safe (LogSink.write)
+        self.eta_func = eta_func      # Thread-safe (LogSink.set_eta)
+        self.queues = {bench: [] for bench in benches}
+        self.running = {}             # banc -> AcquisitionThread
+        self.etas = {}
+        self.etas_lock = threading.Lock()
+        self._done.connect(self._on_done)
+        self._saved.connect(self._on_saved)
+
+    def _prefix(self, bench: str) -> str:
+        return f"[{bench}] " if len(self.benches) > 1 else ""
+
+    def _set_eta(self, bench: str, text) -> None:
+        # Appelé depuis les threads d'acquisition
+        with self.etas_lock:
+            if text is None:
+                self.etas.pop(bench, None)
+            else:
+                self.etas[bench] = text
+            if len(self.benches) > 1:
+                self.eta_func(" | ".join(f"{b} {eta}" for b, eta in sorted(self.etas.items())) or "00:00:00")
+            else:
+                self.eta_func(next(iter(self.etas.values()), "00:00:00"))
 
-    Show_parameters_sweep_freq(freq_start, freq_stop, nb_points, dwel, amplitude, log_func)
+    def submit(self, bench: str, **job) -> int:
+        """Ajoute un job (arguments d'AcquisitionThread) ; retourne sa position dans la file du banc."""
+        self.queues[bench].append(job)
+        position = len(self.queues[bench]) - 1 + (bench in self.running)
+        self._start_next(bench)
+        return position
 
-    for i in range(nb_points):
-        signal_source.write(f'FREQ:CW {freqcal}')
-        
-        power_meter.write('*CLS')
-        power_meter.write(f'FREQ {freq}')
-        
-        power_meter.write('TRIG:DEL:AUTO ON')
-        power_meter.write('INIT:CONT OFF')
-        power_meter.write('TRIG:SOUR IMM')
-        power_meter.write('INIT')
-        power_meter.write('*OPC')
-        
-        STB_polling(power_meter, signal_source, timeout=20, sleepTime=0.15)
-        time.sleep(1)
-        
-        power_meter.query('*ESR?')
-        level = power_meter.query('FETCH?')
-        
-        log_func(f'{i}: {freq/1e9:.3f}GHz | {float(level):.3f}dBm')
-        
-        sheet[f'B{i+3}'] = freq / 1e9
-        sheet[f'{col}{i+3}'] = float(level)
-        sheet[f'B{i+3}'].number_format = precision_string
-        sheet[f'{col}{i+3}'].number_format = precision_string
-        
-        points_acquired += 1
-        
-        # Actualiser l'ETA tous les 10 points
-        if points_acquired % 10 == 0:
-            elapsed_time = time.time() - start_tot
-            if points_acquired > 0:
-                time_per_point = elapsed_time / points_acquired
-                remaining_points = total_points - points_acquired
-                estimated_remaining = time_per_point * remaining_points
-                time_remaining_signal.emit(format_time_remaining(estimated_remaining))
-        
-        freq += freq_step
-        freqcal += freq_step / freq_multi
-    
-    return points_acquired
-
-def CLOSE_ALL(signal_source, power_meter, excel, rm):
-    signal_source.close()
-    power_meter.close()
-    excel.close()
-    rm.close()
-
-def STB_polling(instrument, instrument_bis, condition=32, timeout=1.0, sleepTime=0.3):
-    end_time = time.time() + timeout
-    status = False
-    error = False
-    stb = instrument.read_stb()
-    status = (stb & condition) == condition
-    error = (stb & 1) == 1
-    
-    while not status and time.time() < end_time and not error:
-        time.sleep(sleepTime)
-        stb = instrument.read_stb()
-        status = (stb & condition) == condition
-        error = (stb & 4) == 4
-    
-    return status
+    def busy(self) -> bool:
+        return bool(self.running) or any(self.queues.values())
+
+    def _start_next(self, bench: str) -> None:
+        if bench in self.running or not self.queues[bench]:
+            return
+        job = self.queues[bench].pop(0)
+        name = bench if len(self.benches) > 1 else None
+        thread = AcquisitionThread(**job, bench=name, addresses=self.benches[bench])
+        prefix = self._prefix(bench)
+
+        # Appels directs depuis le thread : LogSink se contente d'empiler,
+        # la fin de job repasse par _done (file d'événements du thread GUI)
+        thread.log_signal.connect(lambda msg: self.log_func(prefix + msg), Qt.DirectConnection)
+        thread.time_remaining_signal.connect(lambda text: self._set_eta(bench, text), Qt.DirectConnection)
+        thread.finished_signal.connect(lambda output: self._done.emit(bench, output, ""), Qt.DirectConnection)
+        thread.error_signal.connect(lambda msg: self._done.emit(bench, "", msg or "Erreur inconnue"), Qt.DirectConnection)
+        self.running[bench] = thread
+        self._set_eta(bench, "00:00:00")
+        thread.start()
+
+    def _on_done(self, bench: str, output_file: str, error_msg: str) -> None:
+        thread = self.running.pop(bench, None)
+        if thread is not None:
+            thread.wait()
+        self._set_eta(bench, None)
+        if not error_msg:
+            self.job_finished.emit(bench, output_file)
+            if thread is not None and thread.save_job:
+                self._watch_save(bench, thread.save_job)
+        else:
+            self.job_error.emit(bench, error_msg)
+        self._start_next(bench)
+
+    def _watch_save(self, bench: str, job) -> None:
+        """Fin de la copie vers le partage -> _saved (le thread d'acquisition est déjà libéré)."""
+        def done(future):
+            # Thread de copie, ou thread GUI si la copie est déjà terminée
+            e = future.exception()
+            self._saved.emit(bench, job.path, (str(e) or type(e).__name__) if e else "")
+        job.future.add_done_callback(done)
+
+    def _on_saved(self, bench: str, output_file: str, error_msg: str) -> None:
+        if not error_msg:
+            self.save_finished.emit(bench, output_file)
+        else:
+            self.save_error.emit(bench, f"Sauvegarde de {output_file} : {error_msg}")
 
 class MainWindow(QWidget):
     def __init__(self):
@@ -308,6 +194,10 @@ class MainWindow(QWidget):
         self.client_edit = QLineEdit()
         self.client_edit.setPlaceholderText("Nom du client")
 
+        self.benches = Load_benches()
+        self.bench_combo = QComboBox()
+        self.bench_combo.addItems(list(self.benches))
+
         self.freq_start_edit = QLineEdit()
         self.freq_start_edit.setPlaceholderText("0.01")
         self.freq_stop_edit = QLineEdit()
@@ -325,6 +215,17 @@ class MainWindow(QWidget):
         self.freq_multi_edit = QLineEdit()
         self.freq_multi_edit.setPlaceholderText("1")
 
+        # Sweep adaptatif : Freq inc = pas du passage grossier
+        self.adaptive_check = QCheckBox("Sweep adaptatif")
+        self.threshold_edit = QLineEdit()
+        self.threshold_edit.setPlaceholderText(str(ADAPT_THRESHOLD_DB))
+        self.spec_edit = QLineEdit()
+        self.spec_edit.setPlaceholderText(str(ADAPT_SPEC_DB))
+        self.min_step_edit = QLineEdit()
+        self.min_step_edit.setPlaceholderText(str(ADAPT_MIN_STEP))
+        self.budget_edit = QLineEdit()
+        self.budget_edit.setPlaceholderText(str(ADAPT_BUDGET))
+
         # Grille
         grid = QGridLayout()
         grid.addWidget(QLabel("Freq start (GHz):"), 0, 0)
@@ -348,9 +249,22 @@ class MainWindow(QWidget):
         grid.addWidget(QLabel("Freq-Multi:"), 3, 2)
         grid.addWidget(self.freq_multi_edit, 3, 3)
 
+        grid.addWidget(self.adaptive_check, 4, 0)
+        grid.addWidget(QLabel("Seuil (dB):"), 4, 2)
+        grid.addWidget(self.threshold_edit, 4, 3)
+
+        grid.addWidget(QLabel("Spec (dB):"), 5, 0)
+        grid.addWidget(self.spec_edit, 5, 1)
+        grid.addWidget(QLabel("Pas min (GHz):"), 5, 2)
+        grid.addWidget(self.min_step_edit, 5, 3)
+
+        grid.addWidget(QLabel("Budget (pts):"), 6, 0)
+        grid.addWidget(self.budget_edit, 6, 1)
+
         form = QFormLayout()
         form.addRow("Année :", self.year_edit)
         form.addRow("Client :", self.client_edit)
+        form.addRow("Banc :", self.bench_combo)
 
         self.run_button = QPushButton("START ACQUISITION")
         self.run_button.clicked.connect(self.on_ok_clicked)
@@ -385,17 +299,26 @@ class MainWindow(QWidget):
         layout.addWidget(self.log_edit, stretch=1)
 
         self.setLayout(layout)
-        
-        self.acquisition_thread = None
+
+        self.log_sink = LogSink(self.log_edit, self.eta_label, "Temps restant : {}", log_file=LOG_FILE)
+
+        self.scheduler = BenchScheduler(self.benches, self.log_sink.write, self.log_sink.set_eta, self)
+        self.scheduler.job_finished.connect(self.on_acquisition_finished)
+        self.scheduler.job_error.connect(self.on_acquisition_error)
+        self.scheduler.save_finished.connect(self.on_save_finished)
+        self.scheduler.save_error.connect(self.on_acquisition_error)
+
+        Preload_after_show(PRELOAD_MODULES, self.log_sink.write)
 
     def log(self, message: str):
-        self.log_edit.appendPlainText(message)
-        QCoreApplication.processEvents()
+        self.log_sink.write(message)
 
-    def update_eta(self, time_remaining: str):
-        """Met à jour l'affichage du temps restant"""
-        self.eta_label.setText(f"Temps restant : {time_remaining}")
-        QCoreApplication.processEvents()
+    def closeEvent(self, event):
+        self.log_sink.close()
+        instrument_pool = sys.modules.get("Instrument_pool")
+        if instrument_pool:
+            instrument_pool.POOL.close_all()
+        super().closeEvent(event)
 
     def on_ok_clicked(self):
         year_text = self.year_edit.text().strip()
@@ -419,35 +342,36 @@ class MainWindow(QWidget):
             amp_step = float(self.amp_step_edit.text() or "1")
             amp_stop = float(self.amp_stop_edit.text() or "15")
             freq_multi = float(self.freq_multi_edit.text() or "1")
-
-            self.log("=== DÉMARRAGE ACQUISITION ===")
-            self.run_button.setEnabled(False)
-            self.eta_label.setText("Temps restant : 00:00:00")
-            
-            self.acquisition_thread = AcquisitionThread(
-                year, client, freq_start, freq_stop, freq_step, dwel, 
-                amp_start, amp_step, amp_stop, freq_multi
+            adaptive = self.adaptive_check.isChecked()
+            threshold_db = float(self.threshold_edit.text() or ADAPT_THRESHOLD_DB)
+            spec_db = float(self.spec_edit.text() or ADAPT_SPEC_DB)
+            min_step = float(self.min_step_edit.text() or ADAPT_MIN_STEP)
+            budget = int(self.budget_edit.text() or ADAPT_BUDGET)
+
+            bench = self.bench_combo.currentText()
+            position = self.scheduler.submit(
+                bench, year=year, client=client, freq_start=freq_start, freq_stop=freq_stop,
+                freq_step=freq_step, dwel=dwel, amp_start=amp_start, amp_step=amp_step,
+                amp_stop=amp_stop, freq_multi=freq_multi, adaptive=adaptive,
+                threshold_db=threshold_db, spec_db=spec_db, min_step=min_step, budget=budget
             )
-            self.acquisition_thread.log_signal.connect(self.log)
-            self.acquisition_thread.time_remaining_signal.connect(self.update_eta)
-            self.acquisition_thread.finished_signal.connect(self.on_acquisition_finished)
-            self.acquisition_thread.error_signal.connect(self.on_acquisition_error)
-            self.acquisition_thread.start()
+            if position:
+                self.log(f"=== {bench} : ACQUISITION EN FILE (position {position}) ===")
+            else:
+                self.log(f"=== {bench} : DÉMARRAGE ACQUISITION ===")
             
         except ValueError as e:
             QMessageBox.warning(self, "Erreur saisie", f"Float/Int invalide:\n{e}")
 
-    def on_acquisition_finished(self, output_file):
-        self.log(f"✅ ACQUISITION TERMINÉE: {output_file}")
-        self.run_button.setEnabled(True)
-        self.eta_label.setText("Temps restant : 00:00:00")
-        QMessageBox.information(self, "Succès", f"Fichier généré:\n{output_file}")
-
-    def on_acquisition_error(self, error_msg):
-        self.log(f"❌ ERREUR: {error_msg}")
-        self.run_button.setEnabled(True)
-        self.eta_label.setText("Temps restant : 00:00:00")
-        QMessageBox.critical(self, "Erreur", error_msg)
+    def on_acquisition_finished(self, bench, output_file):
+        self.log(f"✅ {bench} : ACQUISITION TERMINÉE, copie en cours vers {output_file}")
+
+    def on_save_finished(self, bench, output_file):
+        QMessageBox.information(self, "Succès", f"{bench} - Fichier généré:\n{output_file}")
+
+    def on_acquisition_error(self, bench, error_msg):
+        self.log(f"❌ {bench} : ERREUR: {error_msg}")
+        QMessageBox.critical(self, "Erreur", f"{bench} : {error_msg}")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -6,68 +6,41 @@ from PySide6.QtWidgets import (
     QApplication, QWidget, QFormLayout, QLineEdit, QPushButton,
     QVBoxLayout, QHBoxLayout, QMessageBox, QPlainTextEdit
 )
-from PySide6.QtCore import Qt, QCoreApplication
+from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon,QPixmap
 from PySide6.QtWidgets import QLabel
 
-from Cal_Switch_SPXT import (
-    Ltoi,
-    Find_sheet_index,
-    Read_mdb_table,
-    Get_col_from_mdb,
-    Get_unique_filename,
-    Add_offset,
-    Fill_sheet_from_channel,
-    Fill_voies_sheets,
-    Build_path_names
-)
+from Log_sink import LogSink
+from Gui_startup import Lazy_import, Preload_after_show
+from Workbook_save import Save_workbook_async
 
+# Traitement (numpy, openpyxl, pandas) : chargé en fond après l'affichage, ou au premier OK
+PRELOAD_MODULES = ("Cal_Switch_SPXT", "pandas")
 
-def Save_workbook_gui(parent_widget, wb, output_file: str) -> bool:
-    """
-    Retourne True si un fichier a été sauvegardé, False sinon.
-    """
-    output_file = str(output_file)
-    path = Path(output_file)
-
-    if path.exists():
-        reply = QMessageBox.question(
-            parent_widget,
-            "Fichier existant",
-            f"Le fichier\n\n{output_file}\n\nexiste déjà.\n"
-            "Voulez-vous l'écraser ?",
-            QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
-            QMessageBox.Cancel
-        )
-
-        if reply == QMessageBox.Yes:
-            wb.save(output_file)
-            QMessageBox.information(
-                parent_widget, "Sauvegarde effectuée",
-                f"Fichier écrasé et sauvegardé sous :\n{output_file}"
-            )
-            return True
-
-        elif reply == QMessageBox.No:
-            new_file = Get_unique_filename(output_file)
-            wb.save(new_file)
-            QMessageBox.information(
-                parent_widget, "Sauvegarde effectuée",
-                f"Fichier sauvegardé sous un nouveau nom :\n{new_file}"
-            )
-            return True
 
-        else:
-            # Quitter OU croix
-            return False
+def Ask_overwrite_gui(parent_widget, output_file: str):
+    """Question "écraser ?" : overwrite, rename, ou None (Annuler / croix)."""
+    reply = QMessageBox.question(
+        parent_widget,
+        "Fichier existant",
+        f"Le fichier\n\n{output_file}\n\nexiste déjà.\n"
+        "Voulez-vous l'écraser ?",
+        QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
+        QMessageBox.Cancel
+    )
+    if reply == QMessageBox.Yes:
+        return "overwrite"
+    if reply == QMessageBox.No:
+        return "rename"
+    return None
+
 
-    else:
-        wb.save(output_file)
-        QMessageBox.information(
-            parent_widget, "Sauvegarde effectuée",
-            f"Fichier sauvegardé sous :\n{output_file}"
-        )
-        return True
+def Save_workbook_gui(parent_widget, wb, output_file: str, log_func):
+    """
+    Retourne la sauvegarde (SaveJob, copie vers le partage en cours) si un fichier est sauvegardé, None sinon.
+    """
+    return Save_workbook_async(wb, str(output_file), "ask", log_func,
+                               ask=lambda path: Ask_overwrite_gui(parent_widget, path))
 
 
 class MainWindow(QWidget):
@@ -134,9 +107,16 @@ class MainWindow(QWidget):
         self.setLayout(layout)
         self.resize(500, 300)
 
+        self.log_sink = LogSink(self.log_edit)
+
+        Preload_after_show(PRELOAD_MODULES, self.log)
+
     def log(self, message: str):
-        self.log_edit.appendPlainText(message)
-        QCoreApplication.processEvents()
+        self.log_sink.write(message)
+
+    def closeEvent(self, event):
+        self.log_sink.close()
+        super().closeEvent(event)
 
     def on_ok_clicked(self):
         year_text = self.year_edit.text().strip()
@@ -157,19 +137,21 @@ class MainWindow(QWidget):
         year = int(year_text)
 
         try:
+            cal_switch = Lazy_import("Cal_Switch_SPXT")
+
             # MAIN
-            data_path1, data_path2, output_file, input_file = Build_path_names(
+            data_path1, data_path2, output_file, input_file = cal_switch.Build_path_names(
                 client, year, freqband, sn
             )
 
-            wb = Fill_voies_sheets(input_file, data_path1, data_path2, log_func=self.log)
-            saved = Save_workbook_gui(self, wb, str(output_file))
+            wb = cal_switch.Fill_voies_sheets(input_file, data_path1, data_path2, log_func=self.log)
+            saved = Save_workbook_gui(self, wb, str(output_file), self.log)
 
             if saved:
                 QMessageBox.information(
                     self,
                     "Succès",
-                    f"Traitement terminé.\nFichier généré :\n{output_file}"
+                    f"Traitement terminé.\nFichier généré (copie en cours, voir le journal) :\n{saved.path}"
                 )
 
         except Exception as e:
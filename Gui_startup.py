@@ -0,0 +1,113 @@
+# Démarrage rapide des GUIs Qt : modules lourds (numpy, pandas, openpyxl, pyvisa) importés après l'affichage
+# By Arthur Péraud
+#
+# python Gui_startup.py [--offscreen] [Gui_Cal_Switch_SPXT.py FreqSweep_MI-9020B_GUI.py]
+#   Banc d'essai : temps jusqu'à la fenêtre affichée, imports les plus longs (-X importtime),
+#   modules lourds chargés avant l'affichage.
+import os
+import re
+import sys
+import time
+import argparse
+import importlib
+import threading
+import subprocess
+
+HEAVY_MODULES = ("numpy", "pandas", "openpyxl", "pyvisa")
+PRELOAD_DELAY_MS = 100      # Laisse la boucle Qt peindre la fenêtre avant de lancer les imports
+STARTUP_TARGET_S = 1.0
+BENCH_SCRIPTS = ("Gui_Cal_Switch_SPXT.py", "FreqSweep_MI-9020B_GUI.py")
+BENCH_TOP = 10              # Imports affichés par script
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+# Un seul import lourd à la fois : deux threads qui importent en même temps un paquet à imports
+# circulaires (openpyxl) peuvent obtenir un module partiellement initialisé
+_import_lock = threading.Lock()
+
+# Exécuté dans un interpréteur neuf : QApplication + MainWindow du script, fenêtre affichée
+BENCH_CODE = """
+import sys, time, importlib.util
+start = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+app = QApplication(sys.argv[:1])
+spec = importlib.util.spec_from_file_location("gui", sys.argv[1])
+gui = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(gui)
+win = gui.MainWindow()
+win.show()
+app.processEvents()
+shown = time.perf_counter() - start
+print(f"{shown:.3f};" + ",".join(m for m in sys.argv[2:] if m in sys.modules))
+win.close()
+"""
+
+
+def Lazy_import(name: str):
+    """Module name, importé au premier appel (attend la fin d'un préchargement en cours)."""
+    with _import_lock:
+        return importlib.import_module(name)
+
+
+def Preload_after_show(modules, log_func=None) -> threading.Thread:
+    """Importe modules (Lazy_import) dans un thread de fond, une fois la fenêtre affichée (boucle Qt démarrée)."""
+    from PySide6.QtCore import QTimer
+
+    thread = threading.Thread(target=_Preload, args=(tuple(modules), log_func), name="preload", daemon=True)
+    # lambda : une méthode liée passée à Qt n'est gardée que par référence faible
+    QTimer.singleShot(PRELOAD_DELAY_MS, lambda: thread.start())
+    return thread
+
+
+def _Preload(modules, log_func) -> None:
+    for name in modules:
+        try:
+            Lazy_import(name)
+        except Exception as e:
+            # L'erreur réapparaîtra au premier usage, avec son contexte
+            if log_func:
+                log_func(f"⚠️  Chargement de {name} impossible : {e}")
+
+
+def Bench_startup(script: str, offscreen: bool = False) -> dict:
+    """Temps jusqu'à la fenêtre affichée (hors démarrage de Python) et imports les plus longs."""
+    env = dict(os.environ)
+    if offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", BENCH_CODE, script, *HEAVY_MODULES],
+                          capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(script)))
+    total = time.perf_counter() - start
+    out = [line for line in proc.stdout.splitlines() if ";" in line]
+    if proc.returncode or not out:
+        raise RuntimeError(f"{script} : échec du banc d'essai\n{proc.stderr[-2000:]}")
+
+    shown, heavy = out[-1].split(";")
+    imports = []
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m and not m.group(3):    # Imports de premier niveau seulement
+            imports.append((int(m.group(2)) / 1e6, m.group(4)))
+    imports.sort(reverse=True)
+    return {"script": script, "shown": float(shown), "process": total, "heavy": [m for m in heavy.split(",") if m],
+            "imports": imports[:BENCH_TOP]}
+
+
+### Main Program
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc d'essai du démarrage des GUIs (-X importtime).")
+    parser.add_argument("scripts", nargs="*", default=BENCH_SCRIPTS, help="Scripts GUI (défaut : %(default)s)")
+    parser.add_argument("--offscreen", action="store_true", help="Sans affichage (QT_QPA_PLATFORM=offscreen)")
+    args = parser.parse_args()
+
+    ok = True
+    for script in args.scripts:
+        r = Bench_startup(script, args.offscreen)
+        slow = r["shown"] >= STARTUP_TARGET_S or r["heavy"]
+        ok = ok and not slow
+        print(f"\n{'❌' if slow else '✅'} {script} : fenêtre affichée en {r['shown']:.2f}s "
+              f"(processus complet {r['process']:.2f}s, objectif < {STARTUP_TARGET_S:.1f}s)")
+        if r["heavy"]:
+            print(f"   Modules lourds chargés avant l'affichage : {', '.join(r['heavy'])}")
+        for seconds, name in r["imports"]:
+            print(f"   {seconds:6.3f}s  {name}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,153 @@
+# Pool de sessions VISA partagé : ressources gardées ouvertes entre deux acquisitions
+# By Arthur Péraud
+import threading
+
+import pyvisa
+
+KEEP_SESSIONS = True    # False : fermeture à chaque release (comportement historique)
+
+
+# Un verrou par contrôleur (GPIB0, GPIB1...) partagé par tous les bancs
+BUS_LOCKS = {}
+BUS_LOCKS_GUARD = threading.Lock()
+
+def Bus_lock(address: str):
+    """Verrou du contrôleur d'une adresse VISA ('GPIB0::13::INSTR' -> 'GPIB0'), None si LAN."""
+    board = address.split('::')[0].upper()
+    if not board.startswith('GPIB'):
+        return None
+    with BUS_LOCKS_GUARD:
+        return BUS_LOCKS.setdefault(board, threading.RLock())
+
+
+class LockedResource:
+    """Ressource VISA dont chaque échange prend le verrou du contrôleur GPIB."""
+    def __init__(self, resource, lock):
+        self._resource = resource
+        self._lock = lock
+
+    def write(self, *args, **kwargs):
+        with self._lock:
+            return self._resource.write(*args, **kwargs)
+
+    def query(self, *args, **kwargs):
+        with self._lock:
+            return self._resource.query(*args, **kwargs)
+
+    def read(self, *args, **kwargs):
+        with self._lock:
+            return self._resource.read(*args, **kwargs)
+
+    def query_binary_values(self, *args, **kwargs):
+        with self._lock:
+            return self._resource.query_binary_values(*args, **kwargs)
+
+    def read_stb(self):
+        with self._lock:
+            return self._resource.read_stb()
+
+    def close(self):
+        with self._lock:
+            return self._resource.close()
+
+    def __getattr__(self, name):
+        return getattr(self._resource, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._resource, name, value)  # timeout, read_termination...
+
+
+class SessionPool:
+    """Sessions VISA ouvertes une fois et réutilisées.
+
+    open(address, init_func, init_key) retourne la ressource ouverte (verrouillée si GPIB).
+    init_func n'est rejouée que si l'état de l'instrument est inconnu : première ouverture,
+    health-check en échec, invalidate() après une erreur, ou init_key différente.
+    """
+
+    def __init__(self):
+        self.rm = None
+        self.sessions = {}          # adresse -> ressource
+        self.init_keys = {}         # adresse -> clé de la dernière init réussie
+        self.discovered = None      # Cache de list_resources()
+        self.lock = threading.RLock()
+
+    def resource_manager(self):
+        with self.lock:
+            if self.rm is None:
+                self.rm = pyvisa.ResourceManager()
+            return self.rm
+
+    def list_resources(self, refresh: bool = False) -> tuple:
+        """Adresses présentes sur les bus (scan uniquement au premier appel ou si refresh)."""
+        with self.lock:
+            if self.discovered is None or refresh:
+                self.discovered = self.resource_manager().list_resources()
+            return self.discovered
+
+    def healthy(self, resource) -> bool:
+        """Health-check peu coûteux : serial poll (*STB sans parsing SCPI)."""
+        try:
+            resource.read_stb()
+            return True
+        except Exception:
+            return False
+
+    def open(self, address: str, init_func=None, init_key=None):
+        with self.lock:
+            resource = self.sessions.get(address)
+            if resource is not None and not self.healthy(resource):
+                self.discard(address)
+                resource = None
+
+            if resource is None:
+                resource = self.resource_manager().open_resource(address)
+                lock = Bus_lock(address)
+                if lock is not None:
+                    resource = LockedResource(resource, lock)
+                self.sessions[address] = resource
+
+            key = init_key if init_key is not None else init_func
+            if init_func is not None and self.init_keys.get(address) != key:
+                self.init_keys.pop(address, None)
+                init_func(resource)
+                self.init_keys[address] = key
+            return resource
+
+    def invalidate(self, address: str) -> None:
+        """Etat de l'instrument inconnu (erreur en cours de run) : init refaite au prochain open."""
+        with self.lock:
+            self.init_keys.pop(address, None)
+
+    def discard(self, address: str) -> None:
+        with self.lock:
+            resource = self.sessions.pop(address, None)
+            self.init_keys.pop(address, None)
+            if resource is not None:
+                try:
+                    resource.close()
+                except Exception:
+                    pass
+
+    def release(self, address: str) -> None:
+        """Fin d'utilisation : la session reste ouverte sauf si KEEP_SESSIONS = False."""
+        if not KEEP_SESSIONS:
+            self.discard(address)
+
+    def close_all(self) -> None:
+        with self.lock:
+            for address in list(self.sessions):
+                self.discard(address)
+            if self.rm is not None:
+                try:
+                    self.rm.close()
+                except Exception:
+                    pass
+                self.rm = None
+            self.discovered = None
+
+
+POOL = SessionPool()    # Pool partagé par tous les scripts/threads d'un même process
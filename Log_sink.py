@@ -0,0 +1,83 @@
+# Journal des GUIs Qt : messages bufferisés, affichés à cadence fixe
+# By Arthur Péraud
+import time
+from collections import deque
+
+from PySide6.QtCore import QObject, QTimer, QThread, QCoreApplication
+
+LOG_FPS = 10            # Rafraîchissements du journal par seconde
+LOG_MAX_LINES = 5000    # Lignes conservées dans le widget (anneau)
+
+
+class LogSink(QObject):
+    """Reçoit les messages (depuis n'importe quel thread) et les affiche par paquets.
+
+    write() / set_eta() ne font qu'empiler : aucun repaint par point.
+    Un QTimer vide la file à LOG_FPS images/s dans le QPlainTextEdit,
+    limité à max_lines lignes. log_file : copie complète du journal (optionnel).
+    """
+
+    def __init__(self, log_edit, eta_label=None, eta_format: str = "{}",
+                 fps: int = LOG_FPS, max_lines: int = LOG_MAX_LINES, log_file=None,
+                 follow: bool = False):
+        super().__init__(log_edit)
+        self.log_edit = log_edit
+        self.eta_label = eta_label
+        self.eta_format = eta_format
+        self.follow = follow    # Force le défilement en bas à chaque paquet
+
+        self.pending = deque()                  # append/popleft thread-safe
+        self.lines = deque(maxlen=max_lines)    # Dernières lignes (anneau)
+        self.eta = None
+        self.eta_shown = None
+        self.interval = 1.0 / fps
+        self.last_flush = 0.0
+
+        self.log_edit.setMaximumBlockCount(max_lines)
+        self.file = open(log_file, "a", encoding="utf-8") if log_file else None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(1000 * self.interval))
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+    def _in_gui_thread(self) -> bool:
+        return QThread.currentThread() is self.thread()
+
+    def write(self, message: str) -> None:
+        self.pending.append(message)
+        # Code synchrone dans le thread GUI (ex: Fill_voies_sheets) : le timer ne tourne
+        # pas, on vide donc nous-mêmes la file, au plus à LOG_FPS.
+        if self._in_gui_thread() and time.monotonic() - self.last_flush >= self.interval:
+            self.flush()
+            QCoreApplication.processEvents()
+
+    def set_eta(self, text: str) -> None:
+        self.eta = text
+
+    def flush(self) -> None:
+        self.last_flush = time.monotonic()
+
+        batch = []
+        while self.pending:
+            batch.append(self.pending.popleft())
+        if batch:
+            self.lines.extend(batch)
+            self.log_edit.appendPlainText("\n".join(batch))
+            if self.follow:
+                self.log_edit.ensureCursorVisible()
+            if self.file:
+                self.file.write("\n".join(batch) + "\n")
+                self.file.flush()
+
+        eta = self.eta
+        if eta is not None and eta != self.eta_shown and self.eta_label is not None:
+            self.eta_label.setText(self.eta_format.format(eta))
+            self.eta_shown = eta
+
+    def close(self) -> None:
+        self.timer.stop()
+        self.flush()
+        if self.file:
+            self.file.close()
+            self.file = None
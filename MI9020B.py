@@ -0,0 +1,756 @@
+# Fonctions communes power meter MI-9020B (Flatness / Stabilité), sans dépendance Qt
+# By Arthur Péraud
+import os
+import time
+import heapq
+import queue
+import functools
+import threading
+import numpy as np
+from pathlib import Path
+from openpyxl.workbook import Workbook
+from datetime import timedelta
+
+from Excel_stream import DataSheetWriter
+from Stability_store import StabilityStore
+from Stability_stats import OnlineStats, STATS_LOG_S
+from Instrument_pool import POOL
+from MI9020B_config import (
+    ADAPT_THRESHOLD_DB, ADAPT_SPEC_DB, ADAPT_MIN_STEP, ADAPT_BUDGET, Default_bench, Bench_addresses
+)
+
+### Constants
+PRECISION = 3
+NB_DIGIT = 3            # Power Meter (Flatness)
+NB_DIGIT_STABILITY = 4  # Power Meter (Stabilité)
+NB_ESE_BITS = 60
+NB_QUES_BITS = 952
+STREAM_XLSX = True  # Feuille "Data" write-only, mémoire constante
+DEBUG = False
+
+BLOCK_TIMEOUT_S = 60.0      # Attente max de fin de bloc (*OPC)
+BLOCK_POLL_S = 0.01         # Période de scrutation du STB pendant un bloc
+
+# Cadencement Stabilité : échéances absolues sur horloge monotone
+STABILITY_OVERRUN = "skip"  # "skip" : échéances dépassées abandonnées, "catchup" : rattrapées d'affilée
+MAX_CATCHUP = 3             # Mesures rattrapées d'affilée au plus avant de sauter
+
+
+def PRINT(*args, **kwargs):
+    if DEBUG:
+        return __builtins__.print(*args, **kwargs)
+
+def Hz_to_GHz(x: float) -> float:
+    return x * 1E9
+
+def Float_precision_str(n: int) -> str:
+    s = '#,##0.'
+    for i in range(n):
+        s += '0'
+    return s
+
+def Excel_name(name: str, precision: int, freq_start: float, freq_stop: float, nb_points: float, 
+               dwel: float, amp_start: float, amp_stop: float, amp_step: float, freq_multi : float,
+               bench: str = "") -> str:
+
+    def format_amp(amp: float) -> str:
+        if amp < 0:
+            return f"Neg{int(abs(amp))}"
+        return str(int(amp))
+
+    s = name
+    if freq_multi > 1:
+        s += f"_MI-757-{int(freq_multi)}X"
+    else:
+        s += f"_{format_amp(amp_start)}"
+        s += f"_{format_amp(amp_stop)}"
+        s += '_MI-9020B'
+    if bench:
+        s += f"_{bench.replace(' ', '')}"
+    return Path(s + ".xlsx")
+
+def Excel_Index(n):
+    if n < 0: raise ValueError("n<0")
+    result = []
+    n += 1
+    while n > 0:
+        n -= 1
+        result.append(chr(ord('A') + (n % 26)))
+        n //= 26
+    return ''.join(reversed(result))
+
+def Build_path_names(name: str, client: str, year: int) -> Path:
+    base_dir = Path(rf"E:\\Cal Info Mesure\\{client}\\Data {year}")
+    base_dir.mkdir(parents=True, exist_ok=True)
+    return base_dir / name
+
+def Freq_grid(freq_start: float, freq_stop: float, freq_step: float) -> list:
+    """Grille de fréquences en Hz entiers (start + i*step), sans accumulation flottante."""
+    start = round(Hz_to_GHz(freq_start))
+    stop = round(Hz_to_GHz(freq_stop))
+    step = round(Hz_to_GHz(freq_step))
+    if step <= 0:
+        raise ValueError("Freq inc doit être > 0")
+    return [start + i * step for i in range((stop - start) // step + 1)]
+
+def format_time_remaining(seconds: float) -> str:
+    """Convert seconds to HH:MM:SS format"""
+    if seconds < 0:
+        return "00:00:00"
+    td = timedelta(seconds=int(seconds))
+    hours, remainder = divmod(td.seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+### Instruments
+def Gpid_devices_open(addresses=None, nb_digit=NB_DIGIT):
+    """Sessions du pool (ouvertes/initialisées seulement si l'état est inconnu)."""
+    if addresses is None:
+        addresses = Default_bench()
+    power_meter = POOL.open(addresses['power_meter'], functools.partial(Power_meter_setup, nb_digit=nb_digit),
+                            init_key=('power_meter', nb_digit))
+    signal_source = POOL.open(addresses['signal_source'], Signal_source_setup)
+    return POOL, power_meter, signal_source
+
+def Meters_open(meters: dict, nb_digit=NB_DIGIT_STABILITY) -> dict:
+    """Sessions du pool pour plusieurs power meters {nom: adresse} -> {nom: ressource}."""
+    return {name: POOL.open(address, functools.partial(Power_meter_setup, nb_digit=nb_digit),
+                            init_key=('power_meter', nb_digit))
+            for name, address in meters.items()}
+
+def Signal_source_setup(signal_source):
+    signal_source.write('SYST:LANG SCPI')
+    time.sleep(0.2)
+    Signal_source_init(signal_source)
+
+def Power_meter_setup(power_meter, nb_digit=NB_DIGIT):
+    power_meter.write('SYST:LANG SCPI')
+    time.sleep(0.2)
+    Power_meter_init(power_meter, nb_digit)
+
+def Signal_source_init(signal_source):
+    # signal_source.write('*RST')
+    signal_source.write('*CLS')
+    signal_source.write('*ESE 0')
+    signal_source.write('*SRE 0')
+
+def Power_meter_init(power_meter, nb_digit=NB_DIGIT):
+    power_meter.write('*CLS')
+    power_meter.write('*ESE 1')
+    power_meter.write('UNIT:POW dBm')
+    power_meter.write('FORM ASC')       # Sortie éventuelle du mode bloc
+    power_meter.write('TRIG:COUN 1')
+    PRINT('ESR : ', power_meter.write('*ESR?'))
+    power_meter.write(f'DISP:RES {nb_digit}')
+
+### Flatness
+def Show_parameters_sweep_freq(freq_start, freq_stop, nb_points, dwel, amplitude, log_func):
+    log_func(f'SWEEP FREQ | fstart:{freq_start:.3f}GHz fstop:{freq_stop:.3f}GHz pts:{nb_points} dwel:{dwel:.3f}ms amp:{amplitude}dBm')
+
+def Measure_level(power_meter, signal_source, freq: float, freq_multi: float) -> float:
+    """Règle source (freq / freq_multi) et power meter sur freq (Hz), retourne le niveau en dBm."""
+    signal_source.write(f'FREQ:CW {freq / freq_multi}')
+    
+    power_meter.write('*CLS')
+    power_meter.write(f'FREQ {freq}')
+    
+    power_meter.write('TRIG:DEL:AUTO ON')
+    power_meter.write('INIT:CONT OFF')
+    power_meter.write('TRIG:SOUR IMM')
+    power_meter.write('INIT')
+    power_meter.write('*OPC')
+    
+    STB_polling(power_meter, signal_source, timeout=20, sleepTime=0.15)
+    time.sleep(1)
+    
+    power_meter.query('*ESR?')
+    level = power_meter.query('FETCH?')
+    return float(level)
+
+def Update_eta(start_tot, total_points, points_acquired, time_remaining_signal):
+    # Actualiser l'ETA tous les 10 points
+    if points_acquired % 10 == 0:
+        elapsed_time = time.time() - start_tot
+        if points_acquired > 0:
+            time_per_point = elapsed_time / points_acquired
+            remaining_points = total_points - points_acquired
+            estimated_remaining = time_per_point * remaining_points
+            time_remaining_signal.emit(format_time_remaining(estimated_remaining))
+
+def Sweep_freq(writer, power_meter, signal_source, freq_start, freq_stop, freq_step, dwel, amplitude, freq_multi, col, log_func,
+               start_tot, total_points, points_acquired, time_remaining_signal):
+    freqs = Freq_grid(freq_start, freq_stop, freq_step)
+    
+    signal_source.write('OUTP ON')
+    signal_source.write(f'POW {amplitude} dBm')
+    
+    nb_points = len(freqs)
+
+    Show_parameters_sweep_freq(freqs[0], freqs[-1], nb_points, dwel, amplitude, log_func)
+
+    for i, freq in enumerate(freqs):
+        freq = float(freq)
+        level = Measure_level(power_meter, signal_source, freq, freq_multi)
+        
+        log_func(f'{i}: {freq/1e9:.3f}GHz | {level:.3f}dBm')
+        
+        writer.set_row(i, {'B': freq / 1e9, col: level})
+        
+        points_acquired += 1
+        Update_eta(start_tot, total_points, points_acquired, time_remaining_signal)
+    
+    return points_acquired
+
+def Sweep_freq_adaptive(power_meter, signal_source, freq_start, freq_stop, freq_step, dwel, amplitude, freq_multi, log_func,
+                        start_tot, total_points, points_acquired, time_remaining_signal,
+                        threshold_db, spec_db, min_step, budget):
+    """Passage grossier au pas freq_step, puis insertion de points (milieux) là où le niveau
+    varie de plus de threshold_db entre voisins ou s'écarte de plus de spec_db de la moyenne,
+    jusqu'à budget points ou au pas minimal min_step (GHz).
+    Retourne ({freq_Hz: niveau_dBm}, points_acquired)."""
+    coarse = Freq_grid(freq_start, freq_stop, freq_step)
+    min_step_hz = max(1, round(Hz_to_GHz(min_step)))
+    
+    signal_source.write('OUTP ON')
+    signal_source.write(f'POW {amplitude} dBm')
+
+    Show_parameters_sweep_freq(coarse[0], coarse[-1], len(coarse), dwel, amplitude, log_func)
+    log_func(f'ADAPTATIF | seuil:{threshold_db}dB spec:{spec_db}dB pas min:{min_step}GHz budget:{budget}pts')
+
+    levels = {}
+
+    def measure(freq_hz):
+        nonlocal points_acquired
+        level = Measure_level(power_meter, signal_source, float(freq_hz), freq_multi)
+        levels[freq_hz] = level
+        log_func(f'{len(levels) - 1}: {freq_hz/1e9:.6f}GHz | {level:.3f}dBm')
+        points_acquired += 1
+        Update_eta(start_tot, total_points, points_acquired, time_remaining_signal)
+
+    for freq_hz in coarse:
+        measure(freq_hz)
+
+    reference = sum(levels.values()) / len(levels)
+
+    def score(lo, hi):
+        """Priorité d'un intervalle (0 = rien à raffiner)."""
+        if hi - lo < 2 * min_step_hz:
+            return 0
+        delta = abs(levels[hi] - levels[lo])
+        s = delta if delta > threshold_db else 0
+        if spec_db > 0:
+            excess = max(abs(levels[lo] - reference), abs(levels[hi] - reference)) - spec_db
+            if excess > 0:
+                s = max(s, excess)
+        return s
+
+    heap = []
+    def push(lo, hi):
+        s = score(lo, hi)
+        if s > 0:
+            heapq.heappush(heap, (-s, lo, hi))
+
+    for lo, hi in zip(coarse, coarse[1:]):
+        push(lo, hi)
+
+    while heap and len(levels) < budget:
+        _, lo, hi = heapq.heappop(heap)
+        mid = lo + (hi - lo) // 2
+        measure(mid)
+        push(lo, mid)
+        push(mid, hi)
+
+    log_func(f'ADAPTATIF | {len(levels)} points mesurés ({len(coarse)} grossiers)')
+    return levels, points_acquired
+
+def Write_adaptive_results(writer, results) -> None:
+    """Une ligne par fréquence (union des amplitudes, triée), case vide si non mesurée."""
+    freqs = sorted(set().union(*(levels for _, levels in results)))
+    for i, freq_hz in enumerate(freqs):
+        writer.set(i, 'B', freq_hz / 1e9)
+        for col, levels in results:
+            if freq_hz in levels:
+                writer.set(i, col, levels[freq_hz])
+
+def Flatness_sweeps(amp_start, amp_step, amp_stop) -> list:
+    """[(amplitude, colonne)] : C seule si amp_step = 0, sinon C, D, E..."""
+    if amp_step == 0:
+        return [(amp_start, 'C')]
+    return [(amp, Excel_Index(k)) for k, amp in
+            enumerate(range(int(amp_start), int(amp_stop)+1, int(amp_step)), start=2)]
+
+def Flatness_total_points(freq_start, freq_stop, freq_step, amp_start, amp_step, amp_stop,
+                          adaptive=False, budget=ADAPT_BUDGET) -> int:
+    """Calcule le nombre total de points à acquérir"""
+    freq_points = len(Freq_grid(freq_start, freq_stop, freq_step))
+    if adaptive:
+        freq_points = max(budget, freq_points)
+    return freq_points * len(Flatness_sweeps(amp_start, amp_step, amp_stop))
+
+def Flatness_acquisition(power_meter, signal_source, freq_start, freq_stop, freq_step, dwel,
+                         amp_start, amp_step, amp_stop, freq_multi, log_func, time_remaining_signal,
+                         adaptive=False, threshold_db=ADAPT_THRESHOLD_DB, spec_db=ADAPT_SPEC_DB,
+                         min_step=ADAPT_MIN_STEP, budget=ADAPT_BUDGET) -> Workbook:
+    """Sweep(s) complet(s) d'une acquisition Flatness, retourne le classeur "Data"."""
+    sweeps = Flatness_sweeps(amp_start, amp_step, amp_stop)
+
+    headers = {'B': 'Fréquence (GHz)'}
+    for amplitude, col in sweeps:
+        headers[col] = f'{amplitude} dBm'
+    writer = DataSheetWriter(headers, Float_precision_str(PRECISION), streaming=STREAM_XLSX)
+    
+    log_func('START ACQUISITION')
+    start_tot = time.time()
+    
+    total_points = Flatness_total_points(freq_start, freq_stop, freq_step, amp_start, amp_step, amp_stop,
+                                         adaptive, budget)
+    points_acquired = 0
+    
+    if adaptive:
+        results = []
+        for amplitude, col in sweeps:
+            levels, points_acquired = Sweep_freq_adaptive(power_meter, signal_source, freq_start, freq_stop,
+                      freq_step, dwel, amplitude, freq_multi, log_func,
+                      start_tot, total_points, points_acquired, time_remaining_signal,
+                      threshold_db, spec_db, min_step, budget)
+            results.append((col, levels))
+        Write_adaptive_results(writer, results)
+    else:
+        for amplitude, col in sweeps:
+            points_acquired = Sweep_freq(writer, power_meter, signal_source, freq_start, freq_stop, 
+                      freq_step, dwel, amplitude, freq_multi, col, log_func,
+                      start_tot, total_points, points_acquired, time_remaining_signal)
+    excel = writer.finalize()
+    
+    end_tot = time.time()
+    log_func(f'TOTAL TIME: {end_tot - start_tot:.3f}s')
+    return excel
+
+### Stabilité
+def Excel_name_stability(name : str, precision : int, freq : float, amp : float) -> str:
+    def format_amp(amp: float) -> str:
+        if amp < 0:
+            return f"Neg{int(abs(amp))}"
+        return str(int(amp))
+
+    s = name
+    s += f"_{format_amp(freq)}"
+    s += f"_{format_amp(amp)}"
+    s += '_MI-9020B.xlsx'
+    return s
+
+def Raw_base(output_file: str) -> str:
+    """Préfixe des fichiers bruts d'un test : 'Stability_1_Neg30_MI-9020B.xlsx' -> '..._raw'."""
+    return os.path.splitext(str(output_file))[0] + "_raw"
+
+def Show_parameters(freq : float, dwel : float, amplitude : float, t : float) -> None:
+    print('\nSTARTING ACQUISITION WITH PARAMETERS :')
+    print('freq :', ('{:.%df}' % PRECISION).format(freq), 'Ghz')
+    print('dwel   :', ('{:.%df}' % PRECISION).format(dwel), 'ms')
+    print('amp    :', ('{:.%df}' % PRECISION).format(amplitude), 'dBm')
+    print('temps    :', ('{:.%df}' % PRECISION).format(t), 's')
+    print('\n')
+
+
+def Stability_meter_setup(power_meter, freq : float) -> None:
+    power_meter.write('*CLS')
+    power_meter.write('FREQ ' + str(freq))
+    power_meter.write('TRIG:DEL:AUTO ON')
+    power_meter.write('INIT:CONT OFF')
+    power_meter.write('TRIG:SOUR IMM')
+
+def Stability_point(power_meter, timeout : float) -> float:
+    """Une mesure déclenchée (INIT), fin attendue sur le bit ESB au plus timeout s."""
+    power_meter.write('INIT')
+    power_meter.write('*OPC')
+
+    STB_polling(power_meter, None, timeout=timeout, sleepTime=BLOCK_POLL_S)
+
+    #Clear ESE
+    power_meter.query('*ESR?') 
+
+    #Read Level
+    return float(power_meter.query('FETCH?'))
+
+def Stability_test(power_meter, signal_source, freq : float, dwel : float, amp : float, t_tot : float, t : float,
+                   block : int = 0, log_func=print, raw_base : str = None) -> Workbook:
+    """block > 0 : mesures par blocs de block points (transfert binaire), un bloc toutes les t s (0 : enchaînés).
+    raw_base : mesures brutes en fichiers binaires tournants, résumés 10 s / 1 min / 10 min dans l'xlsx."""
+    if block <= 0 and t <= 0:
+        raise ValueError("Période d'échantillonnage doit être > 0 (mesure point par point)")
+    freq = Hz_to_GHz(freq)
+
+    Show_parameters(freq, dwel, amp, t_tot)
+    
+    precision_string = Float_precision_str(PRECISION)
+    if raw_base:
+        writer = StabilityStore(raw_base, precision_string)
+    else:
+        writer = DataSheetWriter({'B': 'Fréquence (GHz)', 'C': f'{amp} dBm'}, precision_string, streaming=STREAM_XLSX)
+
+    # signal_source.write('OUTP ON')
+    PRINT(signal_source.query('*OPC?'))
+    signal_source.write('POW %f dBm' % amp)
+
+    if block > 0:
+        return Stability_test_block(writer, power_meter, signal_source, freq, t_tot, t, block, log_func)
+
+    stats = OnlineStats()
+    next_stats = STATS_LOG_S
+
+    # Configuration hors boucle : seuls INIT / FETCH? restent dans la période
+    signal_source.write('FREQ:CW %f' % freq)
+    Stability_meter_setup(power_meter, freq)
+
+    scheduler = SampleScheduler(t, t_tot)
+    measure_count = 0
+    while scheduler.wait_next():
+        # Horodatage réel du déclenchement (s depuis le début)
+        t_0 = scheduler.stamp()
+        level = Stability_point(power_meter, t)
+
+        measure_count += 1
+        log_func(f"{measure_count:4d}: {t_0:9.3f}s | "
+              f"{float(freq):.3f} GHz | {float(level):.3f} dBm")
+
+        #Excel array (ligne measure_count + 2)
+        writer.set_row(measure_count - 1, {'B': t_0, 'C': float(level)})  # Secondes totales
+
+        stats.add(t_0, float(level))
+        if t_0 >= next_stats:
+            log_func(stats.summary())
+            next_stats += STATS_LOG_S
+
+    log_func(f"FIN {measure_count} mesures en {scheduler.elapsed():.0f}s")
+    log_func(scheduler.report())
+    log_func(stats.summary())
+
+    excel = writer.finalize()
+    stats.write_sheet(excel, extra_rows=scheduler.sheet_rows())
+    return excel
+
+def Stability_test_block(writer, power_meter, signal_source, freq : float, t_tot : float, t : float,
+                         block : int, log_func=print) -> Workbook:
+    """Blocs de block mesures lus en un transfert binaire, horodatage réparti sur la durée du bloc.
+    Un bloc démarre toutes les t s (SampleScheduler, t = 0 : blocs enchaînés)."""
+    signal_source.write('FREQ:CW %f' % freq)
+    meter = BufferedMeter(power_meter, block)
+    meter.configure(freq)
+
+    stats = OnlineStats()
+    next_stats = STATS_LOG_S
+    scheduler = SampleScheduler(t, t_tot)
+    measure_count = 0
+    try:
+        while scheduler.wait_next():
+            block_start = scheduler.stamp()
+            levels = meter.read_block()
+            dt = meter.last_block_time / max(len(levels), 1)
+
+            for k, level in enumerate(levels):
+                t_k = block_start + (k + 1) * dt
+                writer.set_row(measure_count, {'B': t_k, 'C': float(level)})
+                stats.add(t_k, float(level))
+                measure_count += 1
+
+            t_0 = scheduler.elapsed()
+            log_func(f"{measure_count:6d}: {t_0:7.1f}s | {float(freq):.3f} GHz | "
+                  f"bloc {len(levels)} pts moy {levels.mean():.3f} dBm | {meter.rate:.1f} pts/s")
+            if t_0 >= next_stats:
+                log_func(stats.summary())
+                next_stats += STATS_LOG_S
+    finally:
+        meter.restore()
+
+    log_func(f"FIN {measure_count} mesures en {scheduler.elapsed():.0f}s ({meter.rate:.1f} pts/s)")
+    log_func(scheduler.report())
+    log_func(stats.summary())
+
+    excel = writer.finalize()
+    stats.write_sheet(excel, extra_rows=scheduler.sheet_rows())
+    return excel
+
+class MeterWorker(threading.Thread):
+    """Thread d'E/S d'un power meter : une mesure par index reçu, résultat dans results."""
+
+    def __init__(self, name : str, power_meter, timeout : float, results : queue.Queue):
+        super().__init__(name=f"Stability {name}", daemon=True)
+        self.meter_name = name
+        self.power_meter = power_meter
+        self.timeout = timeout
+        self.results = results
+        self.requests = queue.Queue()
+
+    def run(self):
+        while True:
+            index = self.requests.get()
+            if index is None:
+                return
+            try:
+                start = time.monotonic()
+                level = Stability_point(self.power_meter, self.timeout)
+                self.results.put((index, self.meter_name, level, start, None))
+            except Exception as e:
+                self.results.put((index, self.meter_name, None, None, e))
+
+def Stability_test_multi(power_meters : dict, signal_source, freq : float, dwel : float, amp : float,
+                         t_tot : float, t : float, log_func=print) -> Workbook:
+    """Plusieurs power meters {nom: ressource} mesurés en parallèle sur la même source.
+
+    Un MeterWorker par instrument, déclenchés ensemble à chaque échéance du SampleScheduler :
+    une ligne par échéance, colonne B = temps, puis une colonne de niveau par capteur.
+    """
+    if t <= 0:
+        raise ValueError("Période d'échantillonnage doit être > 0")
+    freq = Hz_to_GHz(freq)
+    Show_parameters(freq, dwel, amp, t_tot)
+
+    names = list(power_meters)
+    cols = {name: Excel_Index(i + 2) for i, name in enumerate(names)}    # C, D, E...
+    headers = {'B': 'Temps (s)', **{cols[name]: f'{name} {amp} dBm' for name in names}}
+    writer = DataSheetWriter(headers, Float_precision_str(PRECISION), streaming=STREAM_XLSX)
+
+    PRINT(signal_source.query('*OPC?'))
+    signal_source.write('POW %f dBm' % amp)
+    signal_source.write('FREQ:CW %f' % freq)
+    for power_meter in power_meters.values():
+        Stability_meter_setup(power_meter, freq)
+
+    results = queue.Queue()
+    workers = [MeterWorker(name, power_meters[name], t, results) for name in names]
+    for worker in workers:
+        worker.start()
+
+    stats = {name: OnlineStats() for name in names}
+    next_stats = STATS_LOG_S
+    skew_max = 0.0
+    scheduler = SampleScheduler(t, t_tot)
+    measure_count = 0
+    try:
+        while scheduler.wait_next():
+            t_0 = scheduler.stamp()
+            for worker in workers:
+                worker.requests.put(measure_count)
+
+            levels = {}
+            starts = []
+            for _ in workers:
+                _, name, level, start, error = results.get()
+                if error is not None:
+                    raise RuntimeError(f"{name} : {error}") from error
+                levels[name] = level
+                starts.append(start)
+            skew_max = max(skew_max, max(starts) - min(starts))
+
+            writer.set_row(measure_count, {'B': t_0, **{cols[name]: levels[name] for name in names}})
+            for name in names:
+                stats[name].add(t_0, levels[name])
+            measure_count += 1
+
+            log_func(f"{measure_count:4d}: {t_0:9.3f}s | " + " | ".join(f"{name} {levels[name]:.3f} dBm" for name in names))
+            if t_0 >= next_stats:
+                for name in names:
+                    log_func(f"{name} {stats[name].summary()}")
+                next_stats += STATS_LOG_S
+    finally:
+        for worker in workers:
+            worker.requests.put(None)
+        for worker in workers:
+            worker.join(timeout=t + 1)
+
+    log_func(f"FIN {measure_count} mesures x {len(names)} capteurs en {scheduler.elapsed():.0f}s")
+    log_func(scheduler.report() + f" | décalage max entre capteurs {skew_max * 1e3:.2f} ms")
+
+    excel = writer.finalize()
+    for name in names:
+        log_func(f"{name} {stats[name].summary()}")
+        stats[name].write_sheet(excel, f"Stats {name}"[:31], scheduler.sheet_rows())
+    return excel
+
+def CLOSE_ALL(addresses, excel):
+    excel.close()
+    for address in Bench_addresses(addresses):
+        POOL.release(address)
+
+def STB_polling(instrument, instrument_bis, condition=32, timeout=1.0, sleepTime=0.3):
+    end_time = time.time() + timeout
+    status = False
+    error = False
+    stb = instrument.read_stb()
+    status = (stb & condition) == condition
+    error = (stb & 1) == 1
+    
+    while not status and time.time() < end_time and not error:
+        time.sleep(sleepTime)
+        stb = instrument.read_stb()
+        status = (stb & condition) == condition
+        error = (stb & 4) == 4
+    
+    return status
+
+
+class SampleScheduler:
+    """Cadence une mesure toutes les period s sur des échéances absolues start + k*period
+    (time.monotonic), sans dérive due aux latences des commandes.
+
+    wait_next() attend l'échéance suivante et retourne False une fois t_tot atteint.
+    Si une mesure déborde sur les échéances suivantes : "skip" les abandonne (comptées dans
+    skipped), "catchup" les enchaîne sans attente (au plus MAX_CATCHUP puis skip).
+    stamp() : instant réel de la mesure, jitter = retard par rapport à l'échéance.
+    period = 0 : mesures enchaînées sans attente, seul t_tot est respecté.
+    """
+
+    def __init__(self, period: float, t_tot: float, overrun: str = None, max_catchup: int = MAX_CATCHUP):
+        if period < 0:
+            raise ValueError("Période d'échantillonnage doit être >= 0")
+        self.period = period
+        self.t_tot = t_tot
+        self.overrun = overrun or STABILITY_OVERRUN
+        self.max_catchup = max_catchup
+
+        self.start = None
+        self.k = 0              # Index de la prochaine échéance
+        self.deadline = 0.0     # Echéance courante (s depuis start)
+        self.catchup = 0
+        self.skipped = 0
+        self.late = 0           # Mesures démarrées après une période de retard ou plus
+
+        # Jitter (s) : somme, somme des carrés, max
+        self.n = 0
+        self.jitter_sum = 0.0
+        self.jitter_sq = 0.0
+        self.jitter_max = 0.0
+
+    def now(self) -> float:
+        return time.monotonic() - self.start
+
+    def wait_next(self) -> bool:
+        if self.start is None:
+            self.start = time.monotonic()
+        now = self.now()
+
+        if self.period == 0:
+            self.deadline = now
+            self.k += 1
+            return now < self.t_tot
+
+        # Echéances dépassées pendant la mesure précédente
+        missed = int(now // self.period) - self.k + 1 if now > self.k * self.period else 0
+        if missed > 1:
+            if self.overrun == "catchup" and self.catchup < self.max_catchup:
+                self.catchup += 1
+            else:
+                self.skipped += missed - 1
+                self.k += missed - 1
+                self.catchup = 0
+        else:
+            self.catchup = 0
+
+        self.deadline = self.k * self.period
+        if self.deadline >= self.t_tot:
+            return False
+        self.k += 1
+
+        delay = self.deadline - self.now()
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    def stamp(self) -> float:
+        """Instant réel (s depuis start), jitter enregistré par rapport à l'échéance."""
+        t = self.now()
+        jitter = t - self.deadline
+        self.n += 1
+        self.jitter_sum += jitter
+        self.jitter_sq += jitter * jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+        if jitter >= self.period:
+            self.late += 1
+        return t
+
+    def elapsed(self) -> float:
+        return self.now() if self.start is not None else 0.0
+
+    def jitter(self) -> tuple:
+        """(moyenne, écart-type) du jitter en s."""
+        if self.n == 0:
+            return 0.0, 0.0
+        mean = self.jitter_sum / self.n
+        return mean, max(self.jitter_sq / self.n - mean * mean, 0.0) ** 0.5
+
+    def report(self) -> str:
+        if self.n == 0:
+            return "Jitter : aucune mesure"
+        mean, std = self.jitter()
+        return (f"Jitter : moy {mean * 1e3:.2f} ms | écart-type {std * 1e3:.2f} ms | "
+                f"max {self.jitter_max * 1e3:.2f} ms | en retard {self.late} | sautées {self.skipped}")
+
+    def sheet_rows(self) -> list:
+        """Lignes de la feuille Stats (OnlineStats.write_sheet extra_rows)."""
+        mean, std = self.jitter()
+        return [["Période (s)", self.period],
+                ["Jitter moyen (ms)", mean * 1e3],
+                ["Jitter écart-type (ms)", std * 1e3],
+                ["Jitter max (ms)", self.jitter_max * 1e3],
+                ["Echéances en retard", self.late],
+                ["Echéances sautées", self.skipped]]
+
+
+class BufferedMeter:
+    """Acquisition bufferisée : le power meter mesure count points sur un seul INIT
+    (TRIG:COUN) et les renvoie en un bloc binaire REAL,64 lu directement dans un tableau NumPy.
+    rate : points/s obtenus (moyenne sur tous les blocs lus).
+    """
+
+    def __init__(self, power_meter, count: int):
+        if count < 1:
+            raise ValueError("Taille de bloc doit être >= 1")
+        self.power_meter = power_meter
+        self.count = count
+        self.samples = 0
+        self.elapsed = 0.0
+        self.last_block_time = 0.0
+
+    def configure(self, freq: float) -> None:
+        pm = self.power_meter
+        pm.write('*CLS')
+        pm.write(f'FREQ {freq}')
+        pm.write('INIT:CONT OFF')
+        pm.write('TRIG:SOUR IMM')
+        pm.write('TRIG:DEL:AUTO OFF')
+        pm.write(f'TRIG:COUN {self.count}')
+        pm.write('FORM REAL')
+        pm.write('FORM:BORD NORM')
+
+    def read_block(self) -> np.ndarray:
+        """Déclenche un bloc et le lit en un seul transfert binaire."""
+        pm = self.power_meter
+        start = time.perf_counter()
+        pm.write('INIT')
+        pm.write('*OPC')
+
+        # Fin de bloc : bit ESB (32) du STB, sans bloquer le bus pendant la mesure
+        end_time = start + BLOCK_TIMEOUT_S
+        while not pm.read_stb() & 32:
+            if time.perf_counter() > end_time:
+                raise TimeoutError(f"Bloc de {self.count} mesures non terminé après {BLOCK_TIMEOUT_S}s")
+            time.sleep(BLOCK_POLL_S)
+        pm.query('*ESR?')
+
+        values = pm.query_binary_values('FETCH?', datatype='d', is_big_endian=True,
+                                        container=np.array)
+        self.last_block_time = time.perf_counter() - start
+        self.elapsed += self.last_block_time
+        self.samples += len(values)
+        return values
+
+    @property
+    def rate(self) -> float:
+        return self.samples / self.elapsed if self.elapsed > 0 else 0.0
+
+    def restore(self) -> None:
+        """Retour au mode ASCII un point par INIT (FETCH? + float())."""
+        pm = self.power_meter
+        pm.write('FORM ASC')
+        pm.write('TRIG:COUN 1')
+        pm.write('TRIG:DEL:AUTO ON')
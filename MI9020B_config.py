@@ -0,0 +1,43 @@
+# Bancs et paramètres par défaut MI-9020B, sans dépendance lourde (importé par les GUIs avant MI9020B)
+# By Arthur Péraud
+import json
+from pathlib import Path
+
+# Bancs (power meter + source). Surchargé par benches.json à côté du script :
+# {"Banc 2": {"power_meter": "GPIB0::14::INSTR", "signal_source": "TCPIP::192.168.10.101::INSTR"}}
+# "power_meters" (optionnel) : capteurs mesurés en parallèle en stabilité multi
+# {"Banc 3": {"power_meter": "GPIB0::13::INSTR", "signal_source": "...",
+#             "power_meters": {"Capteur A": "GPIB0::13::INSTR", "Capteur B": "GPIB0::15::INSTR"}}}
+BENCHES = {
+    "Banc 1": {"power_meter": "GPIB0::13::INSTR", "signal_source": "TCPIP::192.168.10.100::INSTR"},
+}
+BENCHES_FILE = "benches.json"
+
+# Sweep adaptatif (valeurs par défaut)
+ADAPT_THRESHOLD_DB = 0.1   # Ecart max entre deux points voisins
+ADAPT_SPEC_DB = 0.0        # Ecart max à la moyenne du passage grossier (0 = désactivé)
+ADAPT_MIN_STEP = 0.001     # GHz, pas minimal du raffinement
+ADAPT_BUDGET = 200         # Points max par amplitude
+
+
+def Load_benches() -> dict:
+    """Registre des bancs : BENCHES, complété/surchargé par BENCHES_FILE s'il existe."""
+    benches = dict(BENCHES)
+    path = Path(__file__).resolve().parent / BENCHES_FILE
+    if path.exists():
+        with path.open(encoding="utf-8") as f:
+            benches.update(json.load(f))
+    return benches
+
+def Default_bench() -> dict:
+    return next(iter(BENCHES.values()))
+
+def Bench_meters(addresses) -> dict:
+    """Power meters du banc {nom: adresse} : clé "power_meters" si définie (plusieurs capteurs
+    sur la même source), sinon le power meter unique."""
+    return dict(addresses.get('power_meters') or {'Power meter': addresses['power_meter']})
+
+def Bench_addresses(addresses) -> list:
+    """Toutes les adresses VISA d'un banc (power meter, source, capteurs supplémentaires)."""
+    found = [addresses['power_meter'], addresses['signal_source'], *Bench_meters(addresses).values()]
+    return list(dict.fromkeys(found))
@@ -1,241 +1,246 @@
 # By Arthur Péraud
 import os
-import calendar
+import sys
+import pickle
+import zipfile
+import argparse
 import openpyxl
 import typing
-from datetime import datetime, timedelta, date
+from copy import copy
+from io import BytesIO
+from datetime import timedelta
+from openpyxl.utils import coordinate_to_tuple, get_column_letter
 from openpyxl.workbook import Workbook
+from Xlsx_patch import Cell_xml, SheetTemplate, Rewrite_package
+from NDF_calendar import FiscalWeek, Fiscal_year
+from NDF_index import Write_index
+from Workbook_save import OVERWRITE_POLICIES, Is_file_locked, Save_workbook_safely
 
 MONTH_FR = [
     "Janvier", "Février", "Mars", "Avril", "Mai", "Juin",
     "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre"
 ]
-
-def Is_file_locked(filepath: str) -> bool:
-    """Vérifie si un fichier est ouvert ou verrouillé (ex: par Excel)."""
-    if not os.path.exists(filepath):
-        return False
-    try:
-        with open(filepath, "a"):
-            return False
-    except IOError:
-        return True
-
-def Get_unique_filename(path : str) -> str:
-    """Génère un nom de fichier unique en ajoutant (1), (2), etc. s'il existe déjà."""
-    base, ext = os.path.splitext(path)
-    i = 1
-    new_path = path
-    while os.path.exists(new_path):
-        new_path = f"{base}({i}){ext}"
-        i += 1
-    return new_path
-
-def Save_workbook_safely(wb: Workbook, output_file: str) -> None:
-    """Sauvegarde fichier Excel, confirmation si existence sinon préfixe est ajouté (Get_unique_filename).
-    Crée le dossier si le chemin n'existe pas.
-    """
-
-    # Vérifie et crée le dossier si nécessaire
-    folder = os.path.dirname(output_file)
-    if folder and not os.path.exists(folder):
-        os.makedirs(folder, exist_ok=True)
-        print(f"📂 Dossier créé : {folder}")
-
-    if os.path.exists(output_file):
-        confirm = input(f"\n⚠️  Le fichier '{output_file}' existe déjà. Voulez-vous l’écraser ? (o/n) : ").strip().lower()
-        
-        if confirm in ['o', 'y']:
-            wb.save(output_file)
-            print(f"✅ Fichier écrasé et sauvegardé sous {output_file}")
-        elif confirm == 'n':
-            new_file = Get_unique_filename(output_file)
-            wb.save(new_file)
-            print(f"📁 Fichier sauvegardé sous un nouveau nom : {new_file}")
-        else:
-            print("Réponse non reconnue, fichier non sauvegardé.")
-    else:
-        wb.save(output_file)
-        print(f"\n✅ Fichier sauvegardé sous {output_file}")
-
-def Get_number_of_weeks(year : int) -> int:
-    """Calcule le nombre de semaines ISO pour une année donnée (52 ou 53 semaines)."""
-    # Vérifie le numéro de semaine du dernier jour de l'année
-    last_day_of_year = datetime(year, 12, 31)
-    last_week = last_day_of_year.isocalendar()[1]
-
-    # S'il y a 53 semaines ISO dans l'année, sinon il y en a 52
-    return 53 if last_week == 53 else 52
-
-def Get_start_of_week(year : int, week : int) -> int:
-    """Calcule la date de début (lundi) pour une semaine ISO donnée d'une année donnée."""
-    # Le 4 janvier est toujours dans la première semaine ISO
-    first_day_of_year = datetime(year, 1, 4)
-    # Trouve le lundi de la première semaine ISO
-    first_week_start = first_day_of_year - timedelta(days=first_day_of_year.weekday())
-
-    # Calcule le début de la semaine demandée
-    week_start = first_week_start + timedelta(weeks=week - 1)
-    return week_start
-
-def Get_last_day_in_week_range(week_start: datetime, week_end: datetime) -> typing.Tuple[int, int]:
-    """
-    Vérifie si la période [week_start, week_end] inclut le dernier jour du mois de week_start.
-    Retourne (jour_du_dernier_jour, mois_en_francais) si trouvé,
-    sinon (0, mois_en_francais).
-    """
-    last_day = calendar.monthrange(week_start.year, week_start.month)[1]
-    last_day_date = date(week_start.year, week_start.month, last_day)
-    month = last_day_date.month
-
-    if week_start.date() <= last_day_date <= week_end.date():
-        return last_day_date.day, month
-    return 0, month
-
-def Last_week_contains_4_days_of_month(year : int, month : int = 4) -> (bool, int):
-    """Retourne un tuple (True/False, numéro de la semaine) si la dernière semaine du mois contient au moins 4 jours du mois."""
-    
-    # Gérer le cas où le mois est décembre (12)
-    if month == 12:
-        next_month = 1
-        year += 1  # Passage à l'année suivante
-    else:
-        next_month = month + 1
-    
-    # Dernier jour du mois
-    last_day_of_month = datetime(year, next_month, 1) - timedelta(days=1)
-    
-    # Le premier jour de la semaine (lundi) pour le dernier jour du mois
-    last_week_start = last_day_of_month - timedelta(days=last_day_of_month.weekday())
-    
-    # Calcul du nombre de jours du mois dans la dernière semaine
-    days_in_last_week = 0
-    for i in range(7):  
-        current_day = last_week_start + timedelta(days=i)
-        if current_day.month == month:
-            days_in_last_week += 1
-    
-    # Le numéro de la semaine ISO de la dernière semaine du mois
-    last_week_number = last_week_start.isocalendar()[1]
-    
-    # Si la dernière semaine contient 4 jours ou plus du mois
-    contains_4_days = days_in_last_week >= 4
-    
-    return contains_4_days, last_week_number
-
-
-def Create_weekly_sheets(input_file : str, year : int, km_rate : float, meal_price : float, loyer : float) -> Workbook:
-    wb = openpyxl.load_workbook(input_file)
-    ws_template = wb.active  # Feuille modèle par défaut
-
-    num_weeks = Get_number_of_weeks(year)
-    flag, start_week = Last_week_contains_4_days_of_month(year)
-    if flag : start_week += 1
-    flag, end_week_next_year = Last_week_contains_4_days_of_month(year+1)
-    print("")
-
-    # 20XX
-    for week_num in range(start_week, num_weeks + 1):
-        # Calcule les dates de début (lundi) et de fin (dimanche) pour chaque semaine
-        week_start = Get_start_of_week(year, week_num)
-        week_end = week_start + timedelta(days=6)
-
-        # Crée une nouvelle feuille pour chaque semaine
-        ws = wb.copy_worksheet(ws_template)
-        ws.title = f"Sem {week_num}_{year}"
-
-        print(f"Création de la feuille pour la semaine {week_num}, du {week_start.strftime('%d/%m/%Y')} au {week_end.strftime('%d/%m/%Y')}.")
-
-        ws["K1"].value = week_num  # Numéro de la semaine
-        ws["O5"].value = week_start.strftime("%d/%m/%Y")  # Date de début
-        ws["O6"].value = week_end.strftime("%d/%m/%Y")    # Date de fin
-
-        # Affichage Total et Mois
-        lastday, month = Get_last_day_in_week_range(week_start, week_end)
-        if lastday:
-            flag2, _ = Last_week_contains_4_days_of_month(year, month)
-            if not flag2: month = (month + 1) % 12
-
-            # Total Péage fin du mois
-            pos = 12 + (lastday - week_start.day)*2
-            ws[f"E{pos}"].value = "Pe"
-            ws[f"F{pos}"].font = openpyxl.styles.Font(color="FF0000", size = 8)            
-            ws[f"F{pos+1}"].value = "Total Mois"
-            # Loyer
-            ws[f"L{pos+1}"].value = "Loyer_ES"
-            ws[f"L{pos}"].value = loyer
-
-        ws["O3"].value = MONTH_FR[month-1]
-        ws["O3"].font = openpyxl.styles.Font(bold=True, color="008000", size = 9) # Texte en Gras et Vert
-
-        k = 0
-        for i in range(12, 26, 2):
-            ws[f"B{i}"].value = (week_start + timedelta(days=(k))).day  # Dates
-            k = k + 1
-
-        for i in range(12, 26, 2):
-            ws[f"I{i}"].value = meal_price  # Prix du repas 
-        ws["F26"].value = km_rate  # Taux kilométrique     
-
-    # 20XX +1
-    if not flag : end_week_next_year -= 1
-    for week_num in range(1, end_week_next_year + 1):
-        # Calcule les dates de début (lundi) et de fin (dimanche) pour chaque semaine
-        week_start = Get_start_of_week(year+1, week_num)
-        week_end = week_start + timedelta(days=6)
-
-        # Crée une nouvelle feuille pour chaque semaine
+RED_FONT = openpyxl.styles.Font(color="FF0000", size = 8)               # Total Péage fin du mois
+MONTH_FONT = openpyxl.styles.Font(bold=True, color="008000", size = 9)  # Mois en O3
+STAMP_SHEETS = True     # Feuilles de semaine générées par substitution XML (False : copy_worksheet par semaine)
+TEMPLATE_FILE = "Frais Sem_Modele.xlsx"         # Fichier modèle pour le sheet modèle
+OUTPUT_ROOT = "E:\\Cal Info Mesure\\Note de Frais"
+
+def Arg_or_input(value, prompt : str, cast=float):
+    """Valeur passée en argument, sinon demandée à l'utilisateur."""
+    return value if value is not None else cast(input(prompt))
+
+def Add_rate_arguments(parser : argparse.ArgumentParser, required : bool = False) -> None:
+    """Année et taux communs aux scripts NDF (demandés par input() s'ils sont absents)."""
+    parser.add_argument("--year", type=int, required=required, help="Année du 1er Mai 20XX")
+    parser.add_argument("--km-rate", type=float, required=required, help="Taux kilométrique")
+    parser.add_argument("--meal-price", type=float, required=required, help="Prix du repas")
+    parser.add_argument("--loyer", type=float, required=required, help="Prix du loyer")
+
+def Output_path(year : int, employee : str, root : str = OUTPUT_ROOT) -> str:
+    """...\\Année 20XX-20XX+1\\<salarié>\\Frais Sem_20XX-20XX+1.xlsx"""
+    return os.path.join(root, f"Année {year}-{year + 1}", employee, f"Frais Sem_{year}-{year+1}.xlsx")
+
+def Week_plan(row : FiscalWeek, km_rate : float, meal_price : float, loyer : float, log_func=print) -> dict:
+    """Contenu d'une feuille de semaine : titre, {cellule: valeur} et cellule F passée en rouge (ou None)."""
+    week_start = row.monday
+    week_end = week_start + timedelta(days=6)
+
+    log_func(f"Création de la feuille pour la semaine {row.week}, du {week_start.strftime('%d/%m/%Y')} au {week_end.strftime('%d/%m/%Y')}.")
+
+    values = {
+        "K1": row.week,                         # Numéro de la semaine
+        "O5": week_start.strftime("%d/%m/%Y"),  # Date de début
+        "O6": week_end.strftime("%d/%m/%Y"),    # Date de fin
+    }
+    red = None
+
+    # Affichage Total et Mois
+    if row.last_day:
+        # Total Péage fin du mois
+        pos = 12 + row.offset*2
+        values[f"E{pos}"] = "Pe"
+        red = f"F{pos}"
+        values[f"F{pos+1}"] = "Total Mois"
+        # Loyer
+        values[f"L{pos+1}"] = "Loyer_ES"
+        values[f"L{pos}"] = loyer
+
+    values["O3"] = MONTH_FR[row.month-1]
+
+    k = 0
+    for i in range(12, 26, 2):
+        values[f"B{i}"] = (week_start + timedelta(days=(k))).day  # Dates
+        k = k + 1
+
+    for i in range(12, 26, 2):
+        values[f"I{i}"] = meal_price  # Prix du repas
+    values["F26"] = km_rate  # Taux kilométrique
+
+    return {"title": row.title, "values": values, "red": red}
+
+def Apply_week_plan(ws, plan : dict) -> None:
+    for coord, value in plan["values"].items():
+        ws[coord].value = value
+    if plan["red"]:
+        ws[plan["red"]].font = RED_FONT
+    ws["O3"].font = MONTH_FONT  # Texte en Gras et Vert
+
+def Create_sheets_copy(wb: Workbook, ws_template, plans : list) -> Workbook:
+    """Une copie complète du modèle (copy_worksheet) par semaine."""
+    for plan in plans:
         ws = wb.copy_worksheet(ws_template)
-        ws.title = f"Sem {week_num}_{year + 1}"
-
-        print(f"Création de la feuille pour la semaine {week_num}, du {week_start.strftime('%d/%m/%Y')} au {week_end.strftime('%d/%m/%Y')}.")
-
-        ws["K1"].value = week_num  # Numéro de la semaine
-        ws["O5"].value = week_start.strftime("%d/%m/%Y")  # Date de début
-        ws["O6"].value = week_end.strftime("%d/%m/%Y")    # Date de fin
-
-        # Affichage Total et Mois
-        lastday, month = Get_last_day_in_week_range(week_start, week_end)
-        if lastday:
-            flag2, _ = Last_week_contains_4_days_of_month(year + 1, month)
-            if not flag2: month = (month + 1) % 12
-
-            # Total Péage fin du mois
-            pos = 12 + (lastday - week_start.day)*2
-            ws[f"E{pos}"].value = "Pe"
-            ws[f"F{pos}"].font = openpyxl.styles.Font(color="FF0000", size = 8)
-            ws[f"F{pos+1}"].value = "Total Mois"
-            # Loyer
-            ws[f"L{pos+1}"].value = "Loyer_ES"
-            ws[f"L{pos}"].value = None
-         
-        ws["O3"].value = MONTH_FR[month-1]
-        ws["O3"].font = openpyxl.styles.Font(bold=True, color="008000", size = 9) # Texte en Gras et Vert
-
-        k = 0
-        for i in range(12, 26, 2):
-            ws[f"B{i}"].value = (week_start + timedelta(days=(k))).day  # Dates
-            k = k + 1
-
-        ### On ne remplit pas pour l'année suivante, on modifiera plus tard les valeurs, mises à NONE    
-        for i in range(12, 26, 2):
-            ws[f"I{i}"].value = None  # Prix du repas 
-        ws["F26"].value = None  # Taux kilométrique   
-
+        ws.title = plan["title"]
+        Apply_week_plan(ws, plan)
     wb.remove(ws_template)
-    print(f"{num_weeks - start_week + 1 + end_week_next_year} feuilles de semaine créées.")
-
     return wb
 
+class StampedWorkbook:
+    """Classeur déjà sérialisé par Create_sheets_stamped, save() comme un Workbook."""
+    def __init__(self, package : bytes, sheets : dict, sheetnames : list):
+        self.package = package  # xlsx avec les feuilles de semaine vides
+        self.sheets = sheets    # {membre du zip: XML de la feuille}
+        self.sheetnames = sheetnames
+
+    def save(self, filename) -> None:
+        Rewrite_package(BytesIO(self.package), filename, self.sheets)
+
+def Create_sheets_stamped(wb: Workbook, ws_template, plans : list) -> typing.Optional[StampedWorkbook]:
+    """Le modèle n'est copié et sérialisé qu'une fois : le XML de chaque semaine est obtenu en y
+    substituant les seules cellules variables. Résultat identique à Create_sheets_copy.
+    Retourne None (classeur intact) si le modèle ne s'y prête pas."""
+    template_cells = ws_template._cells
+    if any(cell.hyperlink or cell.comment for cell in template_cells.values()):
+        return None
+    # Bordures des cellules fusionnées : styles créés par openpyxl pendant la sauvegarde seulement
+    if ws_template.merged_cells.ranges:
+        return None
+
+    touched = [set(plan["values"]) | {plan["red"], "O3"} - {None} for plan in plans]
+    slots = sorted(set().union(*touched), key=coordinate_to_tuple)
+
+    # Chaque ligne à trou doit exister dans toutes les semaines, sinon la structure des <row> varie
+    rows = {row for row, _ in template_cells} | {coordinate_to_tuple(c)[0] for c in set.intersection(*touched)}
+    if any(coordinate_to_tuple(c)[0] not in rows for c in slots):
+        return None
+
+    proto = wb.copy_worksheet(ws_template)
+    proto.title = plans[0]["title"]
+    base = {}
+    for coord in slots:
+        cell = proto[coord]
+        base[coord] = (cell._value, cell.data_type, copy(cell._style))
+
+    # Polices puis styles enregistrés dans l'ordre où copy_worksheet + save les créerait
+    styles = []
+    for plan in plans:
+        week = {}
+        for coord, font in ((plan["red"], RED_FONT), ("O3", MONTH_FONT)):
+            if coord:
+                cell = proto[coord]
+                cell._style = copy(base[coord][2])
+                cell.font = font
+                week[coord] = cell._style
+        styles.append(week)
+    for plan, week in zip(plans, styles):
+        for coord in slots:
+            style = week.get(coord, base[coord][2])
+            if style and any(style):
+                wb._cell_styles.add(style)
+
+    # Valeur bidon : toutes les cellules à trou apparaissent dans le XML du prototype
+    for coord in slots:
+        proto[coord]._style = copy(base[coord][2])
+        proto[coord].value = 0
+
+    sheets = [proto] + [wb.create_sheet(plan["title"]) for plan in plans[1:]]
+    wb.remove(ws_template)
+    nb_styles = len(wb._cell_styles)
+    buffer = BytesIO()
+    wb.save(buffer)
+
+    with zipfile.ZipFile(buffer) as archive:
+        sheet_xml = SheetTemplate(archive.read(proto.path[1:]), slots)
+
+    stamped = {}
+    for ws, plan, week, coords in zip(sheets, plans, styles, touched):
+        cells = {}
+        for coord in slots:
+            value, data_type, style = base[coord]
+            cell = proto[coord]
+            cell._style = copy(week.get(coord, style))
+            if coord in plan["values"]:
+                cell.value = plan["values"][coord]
+            else:
+                cell._value, cell.data_type = value, data_type
+            cells[coord] = Cell_xml(cell)
+        # <dimension> : cellules du modèle + cellules accédées cette semaine (même vides)
+        bounds = list(template_cells) + [coordinate_to_tuple(c) for c in coords]
+        rows, cols = [r for r, _ in bounds], [c for _, c in bounds]
+        dimension = f"{get_column_letter(min(cols))}{min(rows)}:{get_column_letter(max(cols))}{max(rows)}"
+        stamped[ws.path[1:]] = sheet_xml.stamp(cells, dimension)
+
+    if len(wb._cell_styles) != nb_styles:
+        raise RuntimeError("Style non enregistré avant la sauvegarde du modèle")
+    return StampedWorkbook(buffer.getvalue(), stamped, wb.sheetnames)
+
+def Create_weekly_sheets(input_file, year : int, km_rate : float, meal_price : float, loyer : float,
+                         log_func=print, next_year : typing.Optional[tuple] = None) -> Workbook:
+    """input_file : chemin du modèle, ou modèle déjà chargé (Workbook, consommé par l'appel).
+    next_year : (km_rate, meal_price, loyer) de l'année suivante, écrits directement (comme NDF_fill)."""
+    wb = input_file if isinstance(input_file, Workbook) else openpyxl.load_workbook(input_file)
+    ws_template = wb.active  # Feuille modèle par défaut
+    log_func("")
+
+    ### Sans next_year, on ne remplit pas l'année suivante : valeurs mises à NONE, complétées plus tard par NDF_fill
+    next_km, next_meal, next_loyer = next_year or (None, None, None)
+    plans = [Week_plan(row, km_rate, meal_price, loyer, log_func) if row.year == year
+             else Week_plan(row, next_km, next_meal, next_loyer, log_func) for row in Fiscal_year(year)]
+
+    result = None
+    if STAMP_SHEETS:
+        # Modèle déjà chargé : copie de secours, wb est modifié même si le tampon échoue
+        snapshot = pickle.dumps(wb) if isinstance(input_file, Workbook) else None
+        try:
+            result = Create_sheets_stamped(wb, ws_template, plans)
+        except RuntimeError as e:
+            log_func(f"⚠️  {e} : feuilles recréées par copie du modèle.")
+            wb = pickle.loads(snapshot) if snapshot else openpyxl.load_workbook(input_file)
+            ws_template = wb.active
+    if result is None:
+        result = Create_sheets_copy(wb, ws_template, plans)
+    log_func(f"{len(plans)} feuilles de semaine créées.")
+
+    return result
+
+def Generate_year(year : int, km_rate : float, meal_price : float, loyer : float, output_file : str = None,
+                  template : str = TEMPLATE_FILE, overwrite : str = "ask", next_year : typing.Optional[tuple] = None,
+                  log_func=print) -> typing.Optional[str]:
+    """Crée, sauvegarde et indexe le classeur de l'année. Retourne le fichier écrit (None si non sauvegardé)."""
+    output_file = output_file or Output_path(year, "Peraud")
+    wb = Create_weekly_sheets(template, year, km_rate, meal_price, loyer, log_func, next_year)
+    saved = Save_workbook_safely(wb, output_file, overwrite)
+    if saved:
+        Write_index(saved, year, wb.sheetnames)
+    return saved
+
 ### Main Program
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crée le classeur Frais Sem d'une année fiscale (paramètres absents demandés).")
+    Add_rate_arguments(parser)
+    parser.add_argument("--template", default=TEMPLATE_FILE, help=f"Classeur modèle (défaut : {TEMPLATE_FILE})")
+    parser.add_argument("--output", help="Classeur créé (défaut : Note de Frais\\Année ...\\<salarié>\\Frais Sem_....xlsx)")
+    parser.add_argument("--employee", default="Peraud", help="Salarié, pour le chemin par défaut")
+    parser.add_argument("--overwrite", choices=OVERWRITE_POLICIES, default="ask", help="Si le fichier existe déjà (défaut : ask)")
+    args = parser.parse_args()
+
     print("Bienvenue dans le programme Cal Info Mesure de fraude fiscal.")
     
     try:
-        year = int(input("Entrez l'année du 1er Mai 20XX : "))
+        year = Arg_or_input(args.year, "Entrez l'année du 1er Mai 20XX : ", int)
 
-        input_file = "Frais Sem_Modele.xlsx"  # Fichier modèle pour le sheet modèle
-        output_file = f"E:\\Cal Info Mesure\\Note de Frais\\Année {year }-{year + 1}\\Peraud\\Frais Sem_{year}-{year+1}.xlsx"
+        input_file = args.template
+        output_file = args.output or Output_path(year, args.employee)
 
         # Arthur
         # input_file = f"Excel\\Frais Sem1_2025.xlsx"  # Fichier modèle pour le sheet modèle
@@ -247,11 +252,11 @@ if __name__ == "__main__":
             print("Fermez-le puis relancez le programme.")
             exit(1)
 
-        km_rate = float(input("Entrez le taux kilométrique : "))
-        meal_price = float(input("Entrez le prix du repas : "))
-        loyer = float(input("Entrez le prix du loyer : "))
+        km_rate = Arg_or_input(args.km_rate, "Entrez le taux kilométrique : ")
+        meal_price = Arg_or_input(args.meal_price, "Entrez le prix du repas : ")
+        loyer = Arg_or_input(args.loyer, "Entrez le prix du loyer : ")
 
-        wb = Create_weekly_sheets(input_file, year, km_rate, meal_price, loyer)
-        Save_workbook_safely(wb , output_file)
+        Generate_year(year, km_rate, meal_price, loyer, output_file, input_file, args.overwrite)
     except Exception as e:
         print(f"Une erreur s'est produite : {e}")
+        sys.exit(1)
@@ -1,95 +1,32 @@
 # By Arthur Péraud
 import os
+import sys
+import typing
+import argparse
 import openpyxl
-from datetime import datetime, timedelta
+from openpyxl.comments import Comment
 from openpyxl.workbook import Workbook
-
-def Is_file_locked(filepath: str) -> bool:
-    """Vérifie si un fichier est ouvert ou verrouillé (ex: par Excel)."""
-    if not os.path.exists(filepath):
-        return False
-    try:
-        with open(filepath, "a"):
-            return False
-    except IOError:
-        return True
-
-def Get_unique_filename(path : str) -> str:
-    """Génère un nom de fichier unique en ajoutant (1), (2), etc. s'il existe déjà."""
-    base, ext = os.path.splitext(path)
-    i = 1
-    new_path = path
-    while os.path.exists(new_path):
-        new_path = f"{base}({i}){ext}"
-        i += 1
-    return new_path
-
-def Save_workbook_safely(wb: Workbook, output_file: str) -> None:
-    """Sauvegarde fichier Excel, confirmation si existence sinon préfixe est ajouté (Get_unique_filename).
-    Crée le dossier si le chemin n'existe pas.
-    """
-
-    # Vérifie et crée le dossier si nécessaire
-    folder = os.path.dirname(output_file)
-    if folder and not os.path.exists(folder):
-        os.makedirs(folder, exist_ok=True)
-        print(f"📂 Dossier créé : {folder}")
-
-    if os.path.exists(output_file):
-        confirm = input(f"\n⚠️  Le fichier '{output_file}' existe déjà. Voulez-vous l’écraser ? (o/n) : ").strip().lower()
-        
-        if confirm in ['o', 'y']:
-            wb.save(output_file)
-            print(f"✅ Fichier écrasé et sauvegardé sous {output_file}")
-        elif confirm == 'n':
-            new_file = Get_unique_filename(output_file)
-            wb.save(new_file)
-            print(f"📁 Fichier sauvegardé sous un nouveau nom : {new_file}")
-        else:
-            print("Réponse non reconnue, fichier non sauvegardé.")
-    else:
-        wb.save(output_file)
-        print(f"\n✅ Fichier sauvegardé sous {output_file}")
-
-def Get_number_of_weeks(year : int) -> int:
-    """Calcule le nombre de semaines ISO pour une année donnée (52 ou 53 semaines)."""
-    # Vérifie le numéro de semaine du dernier jour de l'année
-    last_day_of_year = datetime(year, 12, 31)
-    last_week = last_day_of_year.isocalendar()[1]
-
-    # S'il y a 53 semaines ISO dans l'année, sinon il y en a 52
-    return 53 if last_week == 53 else 52
-
-def Last_week_contains_4_days_of_month(year : int, month : int = 4) -> (bool, int):
-    """Retourne un tuple (True/False, numéro de la semaine) si la dernière semaine du mois contient au moins 4 jours du mois."""
-    
-    # Gérer le cas où le mois est décembre (12)
-    if month == 12:
-        next_month = 1
-        year += 1  # Passage à l'année suivante
-    else:
-        next_month = month + 1
-    
-    # Dernier jour du mois
-    last_day_of_month = datetime(year, next_month, 1) - timedelta(days=1)
-    
-    # Le premier jour de la semaine (lundi) pour le dernier jour du mois
-    last_week_start = last_day_of_month - timedelta(days=last_day_of_month.weekday())
-    
-    # Calcul du nombre de jours du mois dans la dernière semaine
-    days_in_last_week = 0
-    for i in range(7):  # Vérifier les 7 jours de la semaine
-        current_day = last_week_start + timedelta(days=i)
-        if current_day.month == month:
-            days_in_last_week += 1
-    
-    # Le numéro de la semaine ISO de la dernière semaine du mois
-    last_week_number = last_week_start.isocalendar()[1]
-    
-    # Si la dernière semaine contient 4 jours ou plus du mois
-    contains_4_days = days_in_last_week >= 4
-    
-    return contains_4_days, last_week_number
+from NDF_calendar import Fiscal_year, Period_sheets
+from NDF import Output_path, Arg_or_input
+from NDF_index import Load_index, Period_total
+from Workbook_save import OVERWRITE_POLICIES, Is_file_locked, Save_workbook_safely
+
+PERIODS = [
+    "Mai/Juin",
+    "Juillet/Août",
+    "Septembre/Octobre",
+    "Novembre/Décembre",
+    "Janvier/Février",
+    "Mars/Avril"
+]
+# (colonne du rapport, décalage de ligne, cellule sommée sur les feuilles de semaine)
+REPORT_METRICS = [("B", 0, "M30"), ("C", 0, "M28"), ("C", 1, "M25"), ("G", 0, "I30"), ("H", 0, "I29"), ("K", 0, "M27")]
+REPORT_TEMPLATE = "Note de Frais Report_Modele.xlsx"   # Fichier Modèle
+REPORT_ROOT = "E:\\Cal Info Mesure\\Invoice&Royalty"
+
+def Report_path(year : int, root : str = REPORT_ROOT) -> str:
+    """...\\IR20XX-20XX+1\\Note de Frais Report_20XX-20XX+1.xlsx"""
+    return os.path.join(root, f"IR{year}-{year + 1}", f"Note de Frais Report_{year}-{year+1}.xlsx")
 
 def Add_brackets_to_filename(path : str) -> str:
     """Rajoute les [] au niveau du nom de fichier"""
@@ -106,110 +43,103 @@ def Add_brackets_to_filename(path : str) -> str:
         return corrected
     return f"[{path}]"
 
-def Create_report_sheet(example_file : str, input_file : str, year : int) -> Workbook:
-    periods = [
-        "Mai/Juin",
-        "Juillet/Août",
-        "Septembre/Octobre",
-        "Novembre/Décembre",
-        "Janvier/Février",
-        "Mars/Avril"
-    ]
-
+def Create_report_sheet(example_file : str, input_file : str, year : int, values : bool = False,
+                        annotate : bool = True, index : typing.Optional[dict] = None) -> Workbook:
+    """values : totaux calculés ici à partir des valeurs enregistrées du classeur de semaines
+    (pas de liens externes), formule d'origine en commentaire si annotate.
+    Le classeur de semaines n'est ouvert que si son index (NDF_index) est absent ou périmé.
+    index : index déjà en mémoire (retour de Write_index), utilisé tel quel."""
     wb = openpyxl.load_workbook(example_file)
-    wb2 = openpyxl.load_workbook(input_file)
+    # Feuilles, K1 et totaux du classeur de semaines lus dans son index (reconstruit si périmé)
+    if index is None:
+        index = Load_index(input_file, year, need_totals=values)
 
     # Feuille modèle par défaut
-    ws_template = wb.worksheets[0] 
-    ws2 = wb2.worksheets[0]  
+    ws_template = wb.worksheets[0]
 
-    sheet_titles = wb2.sheetnames
-    start_week = ws2["K1"].value
+    sheet_titles = [sheet["title"] for sheet in index["sheets"]]
+    rows = Fiscal_year(year)
+    start_week = index["start_week"]
+    if start_week != rows[0].week:
+        print(f"⚠️  {input_file} commence en semaine {start_week}, attendu : semaine {rows[0].week}")
+    week_values = {sheet["title"]: sheet["totals"] or {} for sheet in index["sheets"]} if values else {}
 
-    start_month = 4 # On commence par le couple Mai/Juin
-    nb_weeks = Get_number_of_weeks(year)
     bracket_input_file = Add_brackets_to_filename(input_file)
+    invalid = []
 
-    # 20XX
-    k = 0
-    for i in range(6):
-        if start_month == 12 : #20XX + 1
-            year += 1
-            start_month = 0   
-
-        start_month += 2;
-        flag, end_week = Last_week_contains_4_days_of_month(year, start_month)
-
-        if not flag : end_week -= 1
-
-        if i not in [4, 5]:
-            if end_week == 0: end_week = nb_weeks
-            if end_week == 1: end_week = nb_weeks + 1
-        else: # 20XX + 1
-            end_week += nb_weeks 
-
-        end = end_week - start_week + 1 
+    # Mai/Juin 20XX ... Mars/Avril 20XX + 1
+    for i, (k, end) in enumerate(Period_sheets(year)):
         if i == 5 : end = len(sheet_titles) # 20XX + 1
-
-        start_sheet = sheet_titles[k]
-        end_sheet = sheet_titles[end - 1]
-
-        formula1 = f"='{bracket_input_file}{start_sheet}'!M30"    
-        formula2a = f"='{bracket_input_file}{start_sheet}'!M28"    
-        formula2b = f"='{bracket_input_file}{start_sheet}'!M25"    
-        formula3 = f"='{bracket_input_file}{start_sheet}'!I30"    
-        formula4 = f"='{bracket_input_file}{start_sheet}'!I29"    
-        formula5 = f"='{bracket_input_file}{start_sheet}'!M27"  
-
-
-        # Création des formules de sommes
-        for isheet in range(k+1, end):
-            sheet = sheet_titles[isheet]
-
-            formula1 += "+" + f"'{bracket_input_file}{sheet}'!M30"    
-            formula2a += "+" + f"'{bracket_input_file}{sheet}'!M28"    
-            formula2b += "+" + f"'{bracket_input_file}{sheet}'!M25"    
-            formula3 += "+" + f"'{bracket_input_file}{sheet}'!I30"    
-            formula4 += "+" + f"'{bracket_input_file}{sheet}'!I29"    
-            formula5 += "+" + f"'{bracket_input_file}{sheet}'!M27"  
-        
-        print(formula1, "\n")    
+        sheets = sheet_titles[k:end]
 
         # Colonne MOIS
         number1 = sheet_titles[k][4] + sheet_titles[k][5] if sheet_titles[k][5] != '_' else sheet_titles[k][4]
         number2 = sheet_titles[end - 1][4] + sheet_titles[end - 1][5] if sheet_titles[end - 1][5] != '_' else sheet_titles[end - 1][4]
-        
-        ws_template[f"A{27 + i*2}"].value = periods[i] + " (Sem " + number1 + "-" + number2 + ")" 
-        ws_template[f"A{5 + i*2}"].value = periods[i] + " (Sem " + number1 + "-" + number2 + ")" 
-        
-        # Formules Excel
-        ws_template[f"B{27 + i*2}"].value = formula1
-        ws_template[f"C{27 + i*2}"].value = formula2a
-        ws_template[f"C{28 + i*2}"].value = formula2b
-        ws_template[f"G{27 + i*2}"].value = formula3
-        ws_template[f"H{27 + i*2}"].value = formula4
-        ws_template[f"K{27 + i*2}"].value = formula5
 
-        k = end
+        ws_template[f"A{27 + i*2}"].value = PERIODS[i] + " (Sem " + number1 + "-" + number2 + ")"
+        ws_template[f"A{5 + i*2}"].value = PERIODS[i] + " (Sem " + number1 + "-" + number2 + ")"
+
+        # Formules Excel de sommes (ou leur valeur)
+        for column, offset, cell in REPORT_METRICS:
+            formula = "=" + "+".join(f"'{bracket_input_file}{sheet}'!{cell}" for sheet in sheets)
+            target = ws_template[f"{column}{27 + i*2 + offset}"]
+            if values:
+                target.value, bad = Period_total(week_values, sheets, cell)
+                invalid += bad
+                if annotate:
+                    target.comment = Comment(formula, "NDF")
+            else:
+                target.value = formula
+
+        if values:
+            print(f"{PERIODS[i]} : M30 = {ws_template[f'B{27 + i*2}'].value}")
+        else:
+            print(ws_template[f"B{27 + i*2}"].value, "\n")
+
+    if values and all(v is None for sheet in week_values.values() for v in sheet.values()):
+        print("⚠️  Aucune valeur calculée dans le classeur de semaines : ouvrez-le et enregistrez-le dans Excel.")
+    if invalid:
+        print(f"⚠️  {len(invalid)} cellule(s) non numérique(s) ignorée(s) : {', '.join(invalid[:5])}")
 
     # Années 7CV
-    ws_template["H21"].value = year - 1   
-    ws_template["I21"].value = year   
+    ws_template["H21"].value = year
+    ws_template["I21"].value = year + 1
 
     print("")
     return wb
 
+def Generate_report(year : int, input_file : str = None, output_file : str = None, example_file : str = REPORT_TEMPLATE,
+                    values : bool = False, overwrite : str = "ask", index : typing.Optional[dict] = None) -> typing.Optional[str]:
+    """Crée et sauvegarde le rapport de l'année. Retourne le fichier écrit (None si non sauvegardé)."""
+    input_file = input_file or Output_path(year, "Peraud")
+    wb = Create_report_sheet(example_file, input_file, year, values, index=index)
+    return Save_workbook_safely(wb, output_file or Report_path(year), overwrite)
+
 ### Main Program
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rapport des notes de frais par période de 2 mois (paramètres absents demandés).")
+    parser.add_argument("--year", type=int, help="Année du 1er Mai 20XX")
+    parser.add_argument("--example", default=REPORT_TEMPLATE, help=f"Classeur modèle du rapport (défaut : {REPORT_TEMPLATE})")
+    parser.add_argument("--input", help="Classeur Frais Sem (défaut : Note de Frais\\Année ...\\<salarié>\\Frais Sem_....xlsx)")
+    parser.add_argument("--employee", default="Peraud", help="Salarié, pour le chemin par défaut")
+    parser.add_argument("--output", help="Rapport créé (défaut : Invoice&Royalty\\IR...\\Note de Frais Report_....xlsx)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--values", dest="values", action="store_true", default=None, help="Totaux écrits en valeurs")
+    mode.add_argument("--formulas", dest="values", action="store_false", help="Totaux écrits en formules liées")
+    parser.add_argument("--overwrite", choices=OVERWRITE_POLICIES, default="ask", help="Si le fichier existe déjà (défaut : ask)")
+    args = parser.parse_args()
+
     print("Bienvenue dans le Programme Cal Info Mesure du Rapport des Notes de Frais.")
-    print("Ecriture des formules : ")
-    print("")
     try:
-        year = int(input("Entrez l'année au 1er Mai 20XX : "))
-
-        example_file = f"Note de Frais Report_Modele.xlsx" # Fichier Modèle
-        input_file = f"E:\\Cal Info Mesure\\Note de Frais\\Année {year }-{year + 1}\\Peraud\\Frais Sem_{year}-{year+1}.xlsx" 
-        output_file = f"E:\\Cal Info Mesure\\Invoice&Royalty\\IR{year }-{year + 1}\\Note de Frais Report_{year}-{year+1}.xlsx"
+        year = Arg_or_input(args.year, "Entrez l'année au 1er Mai 20XX : ", int)
+        values = Arg_or_input(args.values, "Ecrire les totaux en valeurs plutôt qu'en formules liées ? (o/n) : ",
+                              lambda answer: answer.strip().lower() in ['o', 'y'])
+        print("Ecriture des valeurs : " if values else "Ecriture des formules : ")
+        print("")
+
+        example_file = args.example
+        input_file = args.input or Output_path(year, args.employee)
+        output_file = args.output or Report_path(year)
         
         # Arthur
         # example_file = f"C:\\Users\\aznrm\\Desktop\\Programme\\Excel\\Note de Frais Report_2024-2025.xlsx" # Fichier Modèle
@@ -222,10 +152,7 @@ if __name__ == "__main__":
             print("Fermez-le puis relancez le programme.")
             exit(1)
         
-        wb = Create_report_sheet(example_file, input_file, year)
-        Save_workbook_safely(wb , output_file)
+        Generate_report(year, input_file, output_file, example_file, values, args.overwrite)
     except Exception as e:
         print(f"Une erreur s'est produite : {e}")
-
-
-
+        sys.exit(1)
@@ -0,0 +1,121 @@
+# Génération des classeurs "Frais Sem" de tous les salariés pour une année fiscale, en parallèle
+# By Arthur Péraud
+#
+# python NDF_batch.py salaries.csv 2025 [--template "Frais Sem_Modele.xlsx"] [--root "E:\...\Note de Frais"] [--workers 4]
+#
+# salaries.csv (';' ou ',') :
+#   employee;km_rate;meal_price;loyer
+#   Peraud;0,603;12,5;650
+import io
+import os
+import csv
+import sys
+import time
+import pickle
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import openpyxl
+
+from NDF import TEMPLATE_FILE, OUTPUT_ROOT, Output_path, Create_weekly_sheets
+from NDF_index import Write_index
+from Workbook_save import Save_workbook_safely
+
+ROSTER_COLUMNS = ("employee", "km_rate", "meal_price", "loyer")
+
+TEMPLATE = None     # Modèle déjà chargé (Workbook picklé), un par processus
+
+
+def Load_roster(path: str) -> list:
+    """Table CSV (';' ou ','), une ligne par salarié, colonnes ROSTER_COLUMNS."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        text = f.read()
+    delimiter = ";" if ";" in text.splitlines()[0] else ","
+    rows = list(csv.DictReader(io.StringIO(text), delimiter=delimiter))
+
+    roster = []
+    for i, row in enumerate(rows, start=2):
+        row = {(key or "").strip(): (value or "").strip() for key, value in row.items()}
+        missing = [key for key in ROSTER_COLUMNS if key not in row]
+        if missing:
+            raise ValueError(f"{path} : colonne(s) manquante(s) {', '.join(missing)}")
+        if not row["employee"]:
+            continue
+        entry = {"employee": row["employee"]}
+        for key in ROSTER_COLUMNS[1:]:
+            try:
+                entry[key] = float(row[key].replace(",", ".") if delimiter == ";" else row[key])
+            except ValueError:
+                raise ValueError(f"{path} ligne {i} : valeur invalide '{row[key]}' pour {key}")
+        roster.append(entry)
+    if not roster:
+        raise ValueError(f"{path} : aucun salarié")
+    return roster
+
+
+def Init_worker(template: bytes) -> None:
+    global TEMPLATE
+    TEMPLATE = template
+
+
+def Generate_employee(entry: dict, year: int, root: str) -> dict:
+    """Exécuté dans un processus du pool : un classeur, à partir d'une copie du modèle partagé."""
+    result = {"employee": entry["employee"], "status": "OK", "file": "", "message": ""}
+    start = time.perf_counter()
+    try:
+        quiet = lambda msg: None
+        wb = Create_weekly_sheets(pickle.loads(TEMPLATE), year, entry["km_rate"], entry["meal_price"], entry["loyer"],
+                                  log_func=quiet)
+        output_file = Save_workbook_safely(wb, Output_path(year, entry["employee"], root), "rename", quiet)
+        Write_index(output_file, year, wb.sheetnames)
+        result["file"] = output_file
+    except Exception as e:
+        traceback.print_exc()
+        result["status"] = "ERREUR"
+        result["message"] = str(e)
+    result["duration"] = time.perf_counter() - start
+    return result
+
+
+def Run_batch(roster_file: str, year: int, template_file: str = TEMPLATE_FILE, root: str = OUTPUT_ROOT,
+              workers: int = None) -> list:
+    roster = Load_roster(roster_file)
+    start_run = time.perf_counter()
+
+    # Modèle lu et parsé une seule fois, transmis aux processus déjà chargé
+    template = pickle.dumps(openpyxl.load_workbook(template_file))
+    workers = workers or min(len(roster), os.cpu_count() or 1)
+    print(f"{len(roster)} salarié(s), année {year}-{year + 1}, {workers} processus")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=Init_worker, initargs=(template,)) as pool:
+        futures = [pool.submit(Generate_employee, entry, year, root) for entry in roster]
+        for future in as_completed(futures):
+            r = future.result()
+            results.append(r)
+            if r["status"] == "OK":
+                print(f"[{len(results)}/{len(roster)}] ✅ {r['employee']} : {r['duration']:.2f}s -> {r['file']}")
+            else:
+                print(f"[{len(results)}/{len(roster)}] ❌ {r['employee']} : {r['message']}")
+
+    total = time.perf_counter() - start_run
+    slowest = max(results, key=lambda r: r["duration"])
+    nb_ok = sum(r["status"] == "OK" for r in results)
+    print(f"\nFIN : {nb_ok}/{len(results)} classeur(s) en {total:.2f}s "
+          f"(le plus long : {slowest['employee']} {slowest['duration']:.2f}s)")
+    return results
+
+
+### Main Program
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crée les classeurs Frais Sem de tous les salariés d'une année fiscale.")
+    parser.add_argument("roster", help="Table CSV des salariés (employee;km_rate;meal_price;loyer)")
+    parser.add_argument("year", type=int, help="Année du 1er Mai 20XX")
+    parser.add_argument("--template", default=TEMPLATE_FILE, help=f"Classeur modèle (défaut : {TEMPLATE_FILE})")
+    parser.add_argument("--root", default=OUTPUT_ROOT, help=f"Dossier Note de Frais (défaut : {OUTPUT_ROOT})")
+    parser.add_argument("--workers", type=int, help="Nombre de processus (défaut : un par salarié, max nb de CPU)")
+    args = parser.parse_args()
+
+    results = Run_batch(args.roster, args.year, args.template, args.root, args.workers)
+    sys.exit(0 if all(r["status"] == "OK" for r in results) else 1)
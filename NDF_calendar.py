@@ -0,0 +1,118 @@
+# Calendrier fiscal des notes de frais (Mai 20XX -> Avril 20XX+1), calculé une seule fois par année
+# By Arthur Péraud
+import calendar
+import typing
+from datetime import date, timedelta
+from functools import lru_cache
+
+PERIOD_END_MONTHS = [6, 8, 10, 12, 2, 4]   # Dernier mois des périodes Mai/Juin ... Mars/Avril
+
+
+class FiscalWeek(typing.NamedTuple):
+    year: int                       # Année ISO de la semaine
+    week: int                       # Numéro de semaine ISO
+    monday: date
+    month: int                      # Mois affiché en O3 (MONTH_FR[month-1])
+    last_day: int                   # Dernier jour du mois s'il tombe dans la semaine, sinon 0
+    offset: typing.Optional[int]    # last_day - lundi (ligne 12 + 2*offset), None sans fin de mois
+    period: typing.Optional[int]    # Période de 2 mois 0..5 (Mai/Juin ... Mars/Avril)
+
+    @property
+    def title(self) -> str:
+        return f"Sem {self.week}_{self.year}"
+
+
+@lru_cache(maxsize=None)
+def Number_of_weeks(year : int) -> int:
+    """Nombre de semaines ISO de l'année (52 ou 53)."""
+    return 53 if date(year, 12, 31).isocalendar()[1] == 53 else 52
+
+
+@lru_cache(maxsize=None)
+def Week_start(year : int, week : int) -> date:
+    """Lundi de la semaine ISO (le 4 janvier est toujours en semaine 1)."""
+    jan4 = date(year, 1, 4)
+    return jan4 - timedelta(days=jan4.weekday()) + timedelta(weeks=week - 1)
+
+
+@lru_cache(maxsize=None)
+def Month_last_week(year : int, month : int) -> typing.Tuple[bool, int]:
+    """(la dernière semaine du mois contient au moins 4 jours du mois, numéro ISO de cette semaine)."""
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    # Du lundi au dernier jour : weekday() + 1 jours du mois dans la semaine
+    return last.weekday() >= 3, (last - timedelta(days=last.weekday())).isocalendar()[1]
+
+
+def Week_row(year : int, week : int, period : typing.Optional[int] = None) -> FiscalWeek:
+    monday = Week_start(year, week)
+    month = monday.month
+    last_day = calendar.monthrange(monday.year, month)[1]
+    if last_day - monday.day > 6:
+        last_day = 0
+
+    if last_day:
+        flag, _ = Month_last_week(year, month)
+        if not flag: month = (month + 1) % 12
+    return FiscalWeek(year, week, monday, month, last_day, last_day - monday.day if last_day else None, period)
+
+
+def Period_ends(year : int, start_week : int) -> list:
+    """Indice (exclu) de la dernière feuille de chaque période de 2 mois."""
+    nb_weeks = Number_of_weeks(year)
+    ends = []
+    for i, month in enumerate(PERIOD_END_MONTHS):
+        flag, end_week = Month_last_week(year if i < 4 else year + 1, month)
+        if not flag: end_week -= 1
+
+        if i < 4:
+            if end_week == 0: end_week = nb_weeks
+            if end_week == 1: end_week = nb_weeks + 1
+        else: # 20XX + 1
+            end_week += nb_weeks
+        ends.append(end_week - start_week + 1)
+    return ends
+
+
+@lru_cache(maxsize=None)
+def Fiscal_year(year : int) -> typing.Tuple[FiscalWeek, ...]:
+    """Une ligne par feuille de semaine, dans l'ordre du classeur "Frais Sem_{year}-{year+1}"."""
+    flag, start_week = Month_last_week(year, 4)
+    if flag : start_week += 1
+    flag, end_week_next_year = Month_last_week(year + 1, 4)
+    if not flag : end_week_next_year -= 1
+
+    weeks = [(year, week) for week in range(start_week, Number_of_weeks(year) + 1)]
+    weeks += [(year + 1, week) for week in range(1, end_week_next_year + 1)]
+
+    ends = Period_ends(year, start_week)
+    rows = []
+    period = 0
+    for index, (iso_year, week) in enumerate(weeks):
+        while period < len(ends) - 1 and index >= ends[period]:
+            period += 1
+        rows.append(Week_row(iso_year, week, period))
+    return tuple(rows)
+
+
+@lru_cache(maxsize=None)
+def Fiscal_index(year : int) -> dict:
+    return {(row.year, row.week): row for row in Fiscal_year(year)}
+
+
+def Fiscal_week(year : int, iso_year : int, week : int) -> FiscalWeek:
+    """Ligne du calendrier fiscal de year (calculée à part si la semaine n'y est pas)."""
+    return Fiscal_index(year).get((iso_year, week)) or Week_row(iso_year, week)
+
+
+def Period_sheets(year : int) -> list:
+    """[(première feuille, dernière feuille + 1)] pour chacune des 6 périodes."""
+    rows = Fiscal_year(year)
+    bounds = []
+    start = 0
+    for period in range(len(PERIOD_END_MONTHS)):
+        end = start
+        while end < len(rows) and rows[end].period == period:
+            end += 1
+        bounds.append((start, end))
+        start = end
+    return bounds
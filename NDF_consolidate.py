@@ -0,0 +1,129 @@
+# Consolidation des notes de frais : totaux par période de 2 mois pour tous les salariés et toutes les années
+# By Arthur Péraud
+#
+# python NDF_consolidate.py [--root "E:\...\Note de Frais"] [--years 2024 2025] [--output Consolidation.xlsx] [--workers 4]
+#
+# Parcourt root\Année YYYY-YYYY+1\<salarié>\Frais Sem_YYYY-YYYY+1.xlsx. Les totaux de chaque classeur viennent
+# de son index (NDF_index) : seuls les classeurs modifiés depuis le dernier passage sont relus, en parallèle.
+import os
+import re
+import time
+import argparse
+import traceback
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import openpyxl
+
+from NDF import OUTPUT_ROOT
+from NDF_index import TOTAL_CELLS, Cached_index, Load_index, Period_titles, Period_total
+from NDF_Report_By2Months import PERIODS
+from Workbook_save import Save_workbook_safely
+
+YEAR_FOLDER_RE = re.compile(r"Année (\d{4})-(\d{4})$")
+
+
+def Find_workbooks(root: str, years: list = None) -> list:
+    """[(année, salarié, fichier)] de l'arborescence Note de Frais, triés par année puis salarié."""
+    found = []
+    for folder in os.scandir(root):
+        m = YEAR_FOLDER_RE.match(folder.name)
+        if not folder.is_dir() or not m or int(m.group(2)) != int(m.group(1)) + 1:
+            continue
+        year = int(m.group(1))
+        if years and year not in years:
+            continue
+        for employee in os.scandir(folder.path):
+            path = os.path.join(employee.path, f"Frais Sem_{year}-{year + 1}.xlsx")
+            if employee.is_dir() and os.path.isfile(path):
+                found.append((year, employee.name, path))
+    return sorted(found)
+
+
+def Read_workbook(path: str, year: int) -> dict:
+    """Exécuté dans un processus du pool : relit le classeur (read_only) et met son index à jour."""
+    return Load_index(path, year, need_totals=True)
+
+
+def Consolidate(root: str = OUTPUT_ROOT, years: list = None, workers: int = None) -> list:
+    """Lignes [année, salarié, période, semaines, totaux TOTAL_CELLS..., cellules ignorées]."""
+    workbooks = Find_workbooks(root, years)
+    if not workbooks:
+        raise FileNotFoundError(f"Aucun classeur Frais Sem sous {root}")
+
+    # Index à jour : pas de lecture du xlsx. Les autres sont relus en parallèle.
+    indexes = {}
+    stale = []
+    for year, employee, path in workbooks:
+        index = Cached_index(path, year, need_totals=True)
+        if index:
+            indexes[path] = index
+        else:
+            stale.append((year, employee, path))
+    print(f"{len(workbooks)} classeur(s) : {len(workbooks) - len(stale)} depuis l'index, {len(stale)} à relire")
+
+    if stale:
+        workers = workers or min(len(stale), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(Read_workbook, path, year): (employee, path) for year, employee, path in stale}
+            for future in as_completed(futures):
+                employee, path = futures[future]
+                try:
+                    indexes[path] = future.result()
+                    print(f"  ✅ {employee} : {os.path.basename(path)}")
+                except Exception as e:
+                    traceback.print_exc()
+                    print(f"  ❌ {employee} : {path} ({e})")
+
+    rows = []
+    for year, employee, path in workbooks:
+        index = indexes.get(path)
+        if index is None:
+            continue
+        week_values = {sheet["title"]: sheet["totals"] or {} for sheet in index["sheets"]}
+        for period, sheets in zip(PERIODS, Period_titles(index)):
+            totals = [Period_total(week_values, sheets, cell) for cell in TOTAL_CELLS]
+            weeks = f"{sheets[0]} - {sheets[-1]}" if sheets else ""
+            rows.append([f"{year}-{year + 1}", employee, period, weeks] + [total for total, _ in totals]
+                        + [sum(len(invalid) for _, invalid in totals)])
+    return rows
+
+
+def Write_consolidation(rows: list, output_file: str) -> str:
+    wb = openpyxl.Workbook(write_only=True)
+    headers = ["Année", "Salarié", "Période", "Feuilles"] + TOTAL_CELLS + ["Cellules ignorées"]
+
+    detail = wb.create_sheet("Par salarié")
+    detail.append(headers)
+    for row in rows:
+        detail.append(row)
+
+    # Total de tous les salariés par année et période
+    totals = {}
+    for row in rows:
+        key = (row[0], row[2])
+        sums = totals.setdefault(key, [0] * (len(TOTAL_CELLS) + 1))
+        for i, value in enumerate(row[4:]):
+            sums[i] += value
+    company = wb.create_sheet("Société")
+    company.append(["Année", "Période"] + TOTAL_CELLS + ["Cellules ignorées"])
+    for (year, period), sums in totals.items():
+        company.append([year, period] + sums)
+
+    return Save_workbook_safely(wb, output_file, "rename", log_func=lambda msg: None)
+
+
+### Main Program
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Totaux des notes de frais de tous les salariés, par période de 2 mois.")
+    parser.add_argument("--root", default=OUTPUT_ROOT, help=f"Dossier Note de Frais (défaut : {OUTPUT_ROOT})")
+    parser.add_argument("--years", type=int, nargs="+", help="Années fiscales (1er Mai 20XX) à inclure (défaut : toutes)")
+    parser.add_argument("--output", help="Classeur de synthèse (défaut : root\\Consolidation NDF_<date>.xlsx)")
+    parser.add_argument("--workers", type=int, help="Processus de lecture (défaut : nb de CPU)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = Consolidate(args.root, args.years, args.workers)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_file = Write_consolidation(rows, args.output or os.path.join(args.root, f"Consolidation NDF_{stamp}.xlsx"))
+    print(f"📁 Consolidation : {output_file} ({len(rows)} ligne(s), {time.perf_counter() - start:.1f}s)")
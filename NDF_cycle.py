@@ -0,0 +1,65 @@
+# Cycle complet d'une année fiscale sans interaction : classeur de semaines, année 20XX+1, rapport 2 mois
+# By Arthur Péraud
+#
+# python NDF_cycle.py --year 2025 --km-rate 0.603 --meal-price 12.5 --loyer 650
+#                     [--next-km-rate ... --next-meal-price ... --next-loyer ...] [--no-fill]
+#                     [--employee Peraud] [--output ...] [--report-output ...] [--overwrite rename]
+#
+# Les étapes s'enchaînent en mémoire : les feuilles 20XX+1 sont remplies à la création (pas de réouverture par
+# NDF_fill) et le rapport est construit à partir de l'index renvoyé par Write_index (pas de relecture du classeur).
+# Les totaux en valeurs n'existent qu'après un recalcul par Excel : le rapport est écrit en formules liées.
+import sys
+import time
+import argparse
+
+from NDF import TEMPLATE_FILE, Output_path, Create_weekly_sheets, Add_rate_arguments
+from NDF_index import Write_index
+from NDF_Report_By2Months import REPORT_TEMPLATE, Report_path, Create_report_sheet
+from Workbook_save import OVERWRITE_POLICIES, Save_workbook_safely
+
+
+def Run_cycle(year: int, km_rate: float, meal_price: float, loyer: float, next_year: tuple = None,
+              employee: str = "Peraud", template: str = TEMPLATE_FILE, report_template: str = REPORT_TEMPLATE,
+              output_file: str = None, report_file: str = None, overwrite: str = "rename") -> tuple:
+    """(classeur de semaines, rapport) écrits, None pour une étape non sauvegardée.
+    next_year : (km_rate, meal_price, loyer) de 20XX+1, None pour laisser ces feuilles vides."""
+    start = time.perf_counter()
+    wb = Create_weekly_sheets(template, year, km_rate, meal_price, loyer, log_func=lambda msg: None,
+                              next_year=next_year)
+    saved = Save_workbook_safely(wb, output_file or Output_path(year, employee), overwrite)
+    if saved is None:
+        return None, None
+    index = Write_index(saved, year, wb.sheetnames)
+    print(f"Classeur de semaines : {len(wb.sheetnames)} feuilles, {time.perf_counter() - start:.2f}s")
+
+    report = Create_report_sheet(report_template, saved, year, index=index)
+    report_saved = Save_workbook_safely(report, report_file or Report_path(year), overwrite)
+    print(f"FIN : {time.perf_counter() - start:.2f}s")
+    return saved, report_saved
+
+
+### Main Program
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crée le classeur Frais Sem, remplit 20XX+1 et écrit le rapport, sans question.")
+    Add_rate_arguments(parser, required=True)
+    parser.add_argument("--next-km-rate", type=float, help="Taux kilométrique 20XX+1 (défaut : --km-rate)")
+    parser.add_argument("--next-meal-price", type=float, help="Prix du repas 20XX+1 (défaut : --meal-price)")
+    parser.add_argument("--next-loyer", type=float, help="Prix du loyer 20XX+1 (défaut : --loyer)")
+    parser.add_argument("--no-fill", action="store_true", help="Feuilles 20XX+1 laissées vides (à compléter par NDF_fill)")
+    parser.add_argument("--employee", default="Peraud", help="Salarié, pour le chemin par défaut")
+    parser.add_argument("--template", default=TEMPLATE_FILE, help=f"Modèle Frais Sem (défaut : {TEMPLATE_FILE})")
+    parser.add_argument("--report-template", default=REPORT_TEMPLATE, help=f"Modèle du rapport (défaut : {REPORT_TEMPLATE})")
+    parser.add_argument("--output", help="Classeur de semaines (défaut : Note de Frais\\Année ...\\<salarié>\\...)")
+    parser.add_argument("--report-output", help="Rapport (défaut : Invoice&Royalty\\IR...\\...)")
+    parser.add_argument("--overwrite", choices=OVERWRITE_POLICIES, default="rename", help="Si un fichier existe déjà (défaut : rename)")
+    args = parser.parse_args()
+
+    next_year = None
+    if not args.no_fill:
+        next_year = (args.km_rate if args.next_km_rate is None else args.next_km_rate,
+                     args.meal_price if args.next_meal_price is None else args.next_meal_price,
+                     args.loyer if args.next_loyer is None else args.next_loyer)
+
+    saved, report_saved = Run_cycle(args.year, args.km_rate, args.meal_price, args.loyer, next_year, args.employee,
+                                    args.template, args.report_template, args.output, args.report_output, args.overwrite)
+    sys.exit(0 if saved and report_saved else 1)
@@ -1,92 +1,96 @@
 import openpyxl
-import calendar
-import typing
-import os
-from datetime import datetime, timedelta, date
-
-def Is_file_locked(filepath: str) -> bool:
-    """Vérifie si un fichier est ouvert ou verrouillé (ex: par Excel)."""
-    if not os.path.exists(filepath):
-        return False
+import sys
+import zipfile
+import argparse
+from NDF import Output_path, Arg_or_input, Add_rate_arguments
+from NDF_calendar import Fiscal_week
+from NDF_index import Write_index
+from Xlsx_patch import Sheet_members, Patch_workbook
+from Workbook_save import Is_file_locked
+
+PATCH_IN_PLACE = True   # Seul le XML des feuilles modifiées est réécrit dans le zip (False : chargement / sauvegarde openpyxl)
+
+def Next_year_values(sheet_titles : list, km_rate : float, meal_price : float, year : int, loyer : int) -> dict:
+    """{feuille: {cellule: valeur}} pour les feuilles de "Sem 1_20XX + 1" jusqu'à la dernière."""
+    week_num = 1
+    next_year = year + 1
+    start_found = False
+    sheet_values = {}
+
+    # Parcour des feuilles
+    for title in sheet_titles:
+        # On cherche la sheet "Sem 1_20XX + 1"
+        if not start_found and title == f"Sem 1_{next_year}":
+            start_found = True
+
+        if start_found:
+            print(f"Remplissage des données pour la feuille : {title}")
+
+            values = {f"I{i}": meal_price for i in range(12, 26, 2)} # Prix du repas
+            values["F26"] = km_rate # Taux kilométrique
+
+            row = Fiscal_week(year, next_year, week_num)
+            if row.last_day:
+                pos = 12 + row.offset*2
+                values[f"L{pos}"] = loyer
+
+            sheet_values[title] = values
+            week_num += 1
+
+    return sheet_values
+
+def Fill_next_year_sheets(file_path : str, km_rate : float, meal_price : float, year : int, loyer : int) -> bool:
+    """ Remplit les feuilles de l'année suivante à partir de "Sem 1_20XX + 1" jusqu'à la dernière.
+    Retourne False si le classeur n'a pas été modifié."""
     try:
-        with open(filepath, "a"):
-            return False
-    except IOError:
-        return True
+        if PATCH_IN_PLACE:
+            try:
+                with zipfile.ZipFile(file_path) as archive:
+                    sheet_titles = list(Sheet_members(archive))
+                sheet_values = Next_year_values(sheet_titles, km_rate, meal_price, year, loyer)
+                if not sheet_values:
+                    print(f"ERREUR Sem 1_{year + 1} n'a pas été trouvée.")
+                    return False
+
+                Patch_workbook(file_path, sheet_values)
+                Write_index(file_path, year, sheet_titles)
+                print(f"Fichier mis à jour et sauvegardé : {file_path}")
+                return True
+            except ValueError as e:
+                print(f"⚠️  Modification directe impossible ({e}), chargement complet du classeur.")
 
-def Get_last_day_in_week_range(week_start: datetime, week_end: datetime) -> typing.Tuple[int, int]:
-    """
-    Vérifie si la période [week_start, week_end] inclut le dernier jour du mois de week_start.
-    Retourne (jour_du_dernier_jour, mois_en_francais) si trouvé,
-    sinon (0, mois_en_francais).
-    """
-    last_day = calendar.monthrange(week_start.year, week_start.month)[1]
-    last_day_date = date(week_start.year, week_start.month, last_day)
-    month = last_day_date.month
-
-    if week_start.date() <= last_day_date <= week_end.date():
-        return last_day_date.day, month
-    return 0, month
-
-def Get_start_of_week(year : int, week : int) -> int:
-    """Calcule la date de début (lundi) pour une semaine ISO donnée d'une année donnée."""
-    # Le 4 janvier est toujours dans la première semaine ISO
-    first_day_of_year = datetime(year, 1, 4)
-    # Trouve le lundi de la première semaine ISO
-    first_week_start = first_day_of_year - timedelta(days=first_day_of_year.weekday())
-
-    # Calcule le début de la semaine demandée
-    week_start = first_week_start + timedelta(weeks=week - 1)
-    return week_start
-
-def Fill_next_year_sheets(file_path : str, km_rate : float, meal_price : float, year : int, loyer : int) -> None:
-    """ Remplit les feuilles de l'année suivante à partir de "Sem 1_20XX + 1" jusqu'à la dernière."""
-    try:
         wb = openpyxl.load_workbook(file_path)
+        sheet_values = Next_year_values([ws.title for ws in wb.worksheets], km_rate, meal_price, year, loyer)
+        if not sheet_values:
+            print(f"ERREUR Sem 1_{year + 1} n'a pas été trouvée.")
+            return False
 
-        week_num = 1
-        next_year = year + 1
-        start_found = False
-
-        # Parcour des feuilles
-        for ws in wb.worksheets:
-            # On cherche la sheet "Sem 1_20XX + 1"
-            if not start_found and ws.title == f"Sem 1_{next_year}":
-                start_found = True
-
-            if start_found:
-                print(f"Remplissage des données pour la feuille : {ws.title}")
-
-                for i in range(12, 26, 2):
-                    ws[f"I{i}"].value = meal_price # Prix du repas 
-                ws["F26"].value = km_rate # Taux kilométrique  
-
-                week_start = Get_start_of_week(year+1, week_num)
-                week_end = week_start + timedelta(days=6)
-
-                lastday, month = Get_last_day_in_week_range(week_start, week_end)
-                if lastday:
-                    pos = 12 + (lastday - week_start.day)*2
-                    ws[f"L{pos}"].value = loyer
-
-                week_num += 1
-
-        if not start_found:
-            print(f"ERREUR Sem 1_{next_year} n'a pas été trouvée.")
-            return
+        for title, values in sheet_values.items():
+            ws = wb[title]
+            for coord, value in values.items():
+                ws[coord].value = value
 
         wb.save(file_path)
+        Write_index(file_path, year, wb.sheetnames)
         print(f"Fichier mis à jour et sauvegardé : {file_path}")
+        return True
 
     except Exception as e:
         print(f"Une erreur s'est produite : {e}")
+        return False
 
 ### Main Program
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Complète les feuilles de l'année 20XX+1 d'un classeur Frais Sem (paramètres absents demandés).")
+    Add_rate_arguments(parser)
+    parser.add_argument("--file", help="Classeur à compléter (défaut : Note de Frais\\Année ...\\<salarié>\\Frais Sem_....xlsx)")
+    parser.add_argument("--employee", default="Peraud", help="Salarié, pour le chemin par défaut")
+    args = parser.parse_args()
+
     print("Bienvenue dans le programme Cal Info Mesure de fraude fiscal qui COMPLETE l'année 20XX+1")
     try:
-        year = int(input("Entrez l'année : "))
-        file_path = f"E:\\Cal Info Mesure\\Note de Frais\\Année {year }-{year + 1}\\Peraud\\Frais Sem_{year}-{year+1}.xlsx"
+        year = Arg_or_input(args.year, "Entrez l'année : ", int)
+        file_path = args.file or Output_path(year, args.employee)
         
         # Arthur
         # file_path = f"prout\\Frais Sem_{year}-{year+1}.xlsx"
@@ -97,10 +101,12 @@ if __name__ == "__main__":
             print("Fermez-le puis relancez le programme.")
             exit(1)
         
-        km_rate = float(input("Entrez le taux kilométrique : "))
-        meal_price = float(input("Entrez le prix du repas : "))
-        loyer = float(input("Entrez le prix du loyer : "))
+        km_rate = Arg_or_input(args.km_rate, "Entrez le taux kilométrique : ")
+        meal_price = Arg_or_input(args.meal_price, "Entrez le prix du repas : ")
+        loyer = Arg_or_input(args.loyer, "Entrez le prix du loyer : ")
 
-        Fill_next_year_sheets(file_path, km_rate, meal_price, year, loyer)
+        if not Fill_next_year_sheets(file_path, km_rate, meal_price, year, loyer):
+            sys.exit(1)
     except Exception as e:
         print(f"Une erreur s'est produite : {e}")
+        sys.exit(1)
@@ -0,0 +1,137 @@
+# Index JSON à côté des classeurs "Frais Sem" : semaine, dates, période et totaux de chaque feuille
+# By Arthur Péraud
+#
+# Frais Sem_2025-2026.xlsx -> Frais Sem_2025-2026.index.json, écrit par NDF / NDF_fill / NDF_batch.
+# L'index est valide tant que la taille et la date de modification du xlsx n'ont pas changé,
+# sinon il est reconstruit (lecture read_only du classeur) au premier Load_index.
+import os
+import re
+import json
+import typing
+import openpyxl
+from datetime import timedelta
+from openpyxl.utils import coordinate_to_tuple
+from openpyxl.workbook import Workbook
+from NDF_calendar import Fiscal_week, Period_sheets
+
+INDEX_VERSION = 1
+TOTAL_CELLS = ["M30", "M28", "M25", "I30", "I29", "M27"]   # Totaux repris par le rapport 2 mois
+SHEET_TITLE_RE = re.compile(r"Sem (\d+)_(\d+)$")
+
+
+def Index_path(xlsx_file: str) -> str:
+    return os.path.splitext(xlsx_file)[0] + ".index.json"
+
+
+def Read_week_values(wb: Workbook, cells: list) -> dict:
+    """{feuille: {cellule: valeur}} de toutes les feuilles, en une passe (classeur ouvert en read_only)."""
+    coords = [coordinate_to_tuple(cell) for cell in cells]
+    min_row, max_row = min(r for r, _ in coords), max(r for r, _ in coords)
+    min_col, max_col = min(c for _, c in coords), max(c for _, c in coords)
+
+    values = {}
+    for ws in wb.worksheets:
+        grid = {}
+        for r, row in enumerate(ws.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col,
+                                             values_only=True), start=min_row):
+            for c, value in enumerate(row, start=min_col):
+                grid[r, c] = value
+        values[ws.title] = {cell: grid.get(coord) for cell, coord in zip(cells, coords)}
+    return values
+
+
+def Period_total(week_values: dict, sheets: list, cell: str) -> typing.Tuple[float, list]:
+    """Somme de cell sur les feuilles (vide = 0 comme dans Excel), et les feuilles non numériques."""
+    total = 0
+    invalid = []
+    for sheet in sheets:
+        value = week_values.get(sheet, {}).get(cell)
+        if isinstance(value, (int, float)):
+            total += value
+        elif value is not None:
+            invalid.append(f"{sheet}!{cell}={value}")
+    return total, invalid
+
+
+def Sheet_entry(year: int, title: str, totals: dict = None) -> dict:
+    entry = {"title": title, "year": None, "week": None, "monday": None, "sunday": None, "period": None,
+             "totals": totals}
+    m = SHEET_TITLE_RE.match(title)
+    if m:
+        row = Fiscal_week(year, int(m.group(2)), int(m.group(1)))
+        entry.update(year=row.year, week=row.week, monday=row.monday.isoformat(),
+                     sunday=(row.monday + timedelta(days=6)).isoformat(),
+                     period=row.period)
+    return entry
+
+
+def Write_index(xlsx_file: str, year: int, sheet_titles: list, start_week: typing.Optional[int] = None,
+                totals: dict = None) -> dict:
+    """Index du classeur tel qu'il vient d'être écrit. totals {feuille: {cellule: valeur}} : None si inconnus
+    (classeur écrit par openpyxl, formules pas encore recalculées par Excel).
+    start_week : K1 de la première feuille, par défaut la semaine de son titre."""
+    stat = os.stat(xlsx_file)
+    sheets = [Sheet_entry(year, title, (totals or {}).get(title)) for title in sheet_titles]
+    index = {
+        "version": INDEX_VERSION,
+        "file": os.path.basename(xlsx_file),
+        "year": year,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "start_week": start_week if start_week is not None or not sheets else sheets[0]["week"],
+        "totals_valid": totals is not None,
+        "sheets": sheets,
+    }
+    path = Index_path(xlsx_file)
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=1, default=str)
+        os.replace(tmp, path)
+    except OSError as e:
+        # L'index n'est qu'un cache : le classeur reste la référence
+        print(f"⚠️  Index non écrit ({path}) : {e}")
+    return index
+
+
+def Build_index(xlsx_file: str, year: int) -> dict:
+    """Reconstruit l'index en lisant le classeur une fois (read_only, valeurs en cache)."""
+    wb = openpyxl.load_workbook(xlsx_file, read_only=True, data_only=True)
+    try:
+        start_week = wb.worksheets[0]["K1"].value if wb.worksheets else None
+        totals = Read_week_values(wb, TOTAL_CELLS)
+        sheet_titles = wb.sheetnames
+    finally:
+        wb.close()
+    return Write_index(xlsx_file, year, sheet_titles, start_week, totals)
+
+
+def Is_index_fresh(index: dict, xlsx_file: str, year: int) -> bool:
+    stat = os.stat(xlsx_file)
+    return (index.get("version") == INDEX_VERSION and index.get("year") == year
+            and index.get("size") == stat.st_size and index.get("mtime_ns") == stat.st_mtime_ns)
+
+
+def Cached_index(xlsx_file: str, year: int, need_totals: bool = False) -> typing.Optional[dict]:
+    """Index du classeur s'il est à jour (None sinon), sans ouvrir le xlsx."""
+    try:
+        with open(Index_path(xlsx_file), encoding="utf-8") as f:
+            index = json.load(f)
+        if Is_index_fresh(index, xlsx_file, year) and (index["totals_valid"] or not need_totals):
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def Load_index(xlsx_file: str, year: int, need_totals: bool = False) -> dict:
+    """Index du classeur, reconstruit s'il manque, s'il est périmé, ou si need_totals et que les totaux
+    n'ont pas encore été lus dans le classeur."""
+    return Cached_index(xlsx_file, year, need_totals) or Build_index(xlsx_file, year)
+
+
+def Period_titles(index: dict) -> list:
+    """Feuilles de chacune des 6 périodes (la dernière va jusqu'à la fin du classeur, comme le rapport)."""
+    titles = [sheet["title"] for sheet in index["sheets"]]
+    bounds = Period_sheets(index["year"])
+    return [titles[k:len(titles) if i == len(bounds) - 1 else end] for i, (k, end) in enumerate(bounds)]
@@ -1,80 +1,30 @@
 # Pulse Generator GUI - BNC505 by Arthur Péraud 17/02/2026
 
 import sys
-import time
+import threading
 from pathlib import Path
 
-import pyvisa
-
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLineEdit, QPushButton,
     QVBoxLayout, QHBoxLayout, QMessageBox, QPlainTextEdit, QGridLayout,
-    QLabel, QCheckBox, QComboBox, QSizePolicy
+    QLabel, QCheckBox, QComboBox, QSizePolicy, QFileDialog, QInputDialog
 )
-from PySide6.QtCore import Qt, QCoreApplication, QThread, Signal, QDateTime
+from PySide6.QtCore import Qt, QThread, Signal, QDateTime
 from PySide6.QtGui import QIcon, QPixmap
 
-PRECISION = 2
-
-def MHz_to_s(mhz: float) -> float:
-    if mhz <= 0:
-        raise ValueError("Frequence doit être > 0 MHz")
-    return 1.0 / (mhz * 1e6)
-
-
-def Gpid_devices_open():
-    rm = pyvisa.ResourceManager()
-    pulse_generator = rm.open_resource("GPIB0::9::INSTR")
-    return rm, pulse_generator
-
-
-def Pulse_generator_init(pulse_generator) -> None:
-    pulse_generator.write("*RST")
-    pulse_generator.write("*CLS")
-
-
-def CLOSE_ALL(pulse_generator, rm) -> None:
-    try:
-        pulse_generator.close()
-    except Exception:
-        pass
-    try:
-        rm.close()
-    except Exception:
-        pass
-
-
-def Create_pulse(pulse_generator,
-                 channel: int,
-                 ampl_v: float,
-                 period_s: float,
-                 width_s: float,
-                 delay_s: float,
-                 wait_count: int = 0,      # Nb de pulses à attendre
-                 mode: str = "NORMAL",
-                 polarity: str = "NORMAL",
-                 gate: str = "DISABLE",
-                 trigger: str = "DISABLED",) -> None:
-
-    pulse_generator.write(f":PULSE{channel}:STATE ON")
-
-    pulse_generator.write(f":PULSE{channel}:OUTP:AMPL {ampl_v:.6f}")
-    pulse_generator.write(f":PULSE{channel}:WIDT {width_s:.12f}")
-    pulse_generator.write(f":PULSE{channel}:DELAY {delay_s:.12f}")
-
-    if wait_count > 0:
-        pulse_generator.write(f":PULSE{channel}:WCOUNTER {wait_count}N")
-
-    pulse_generator.write(f":PULSE{channel}:CMODE {mode}")
-    pulse_generator.write(f":PULSE{channel}:POL {polarity}")
-    pulse_generator.write(f":PULSE{channel}:CGATE {gate}")
-
-    pulse_generator.write(f":PULSE0:EXT:MODE {trigger}")
-    pulse_generator.write(":PULSE0:MODE NORM")
-    pulse_generator.write(f":PULSE0:PER {period_s:.12f}")
+from Log_sink import LogSink
+from Instrument_pool import POOL
+from BNC505 import (
+    STATE, CHANNELS, MHz_to_s, Gpid_devices_open, Invalidate, CLOSE_ALL, Pulse_commands, Stop_all,
+    Sequence_range, Load_sequence_table, Run_sequence,
+    PRESET_SLOTS, PresetStore, Save_to_slot, Recall_slot, Verify_state
+)
 
-    pulse_generator.write(":PULSE0:STATE ON")
-    time.sleep(0.1)
+PRECISION = 2
+NUDGE_STEP = 1.0    # Pas des boutons − / + de Width et Delay (dans l'unité affichée)
+LOG_FILE = None     # ex: "Pulse_BNC505.log" pour garder le journal complet
+SEQUENCE_DIR = None # Dossier des CSV d'horodatage des séquences (None : dossier du script)
+SEQUENCE_PARAMS_GUI = {"Width": "width_s", "Delay": "delay_s", "Period": "period_s"}
 
 
 class PulseThread(QThread):
@@ -82,8 +32,11 @@ class PulseThread(QThread):
     finished_signal = Signal()
     error_signal = Signal(str)
 
-    def __init__(self, channels, ampl_v, freq_mhz, width_s, delay_s, wait_count, mode, polarity, gate, trigger):
+    def __init__(self, channels, ampl_v, freq_mhz, width_s, delay_s, wait_count, mode, polarity, gate, trigger,
+                 verbose=True, verify=False):
         super().__init__()
+        self.verbose     = verbose
+        self.verify      = verify
         self.channels    = channels
         self.ampl_v      = ampl_v
         self.freq_mhz    = freq_mhz
@@ -103,32 +56,106 @@ class PulseThread(QThread):
         pulse_generator = None
         try:
             rm, pulse_generator = Gpid_devices_open()
-            Pulse_generator_init(pulse_generator)
 
             period_s = MHz_to_s(self.freq_mhz)
+            desired = Pulse_commands(self.channels, self.ampl_v, period_s, self.width_s, self.delay_s,
+                                     self.wait_count, self.mode, self.polarity, self.gate, self.trigger)
+
+            # Seuls les paramètres modifiés depuis le dernier envoi partent sur le bus
+            sent = STATE.apply(pulse_generator, desired)
+            if self.verbose:
+                for command in sent:
+                    self.log(f"  {command}")
+            self.log(f"{len(sent)} commande(s) envoyée(s)" if sent else "Aucun changement")
+
+            if self.verify:
+                mismatches = Verify_state(pulse_generator, desired)
+                for header, expected, answer in mismatches:
+                    self.log(f"⚠️ {header} : demandé {expected}, relu {answer}")
+                self.log(f"⚠️ Relecture : {len(mismatches)} écart(s), renvoyé(s) au prochain START" if mismatches
+                         else "Relecture OK")
+            self.finished_signal.emit()
+
+        except Exception as e:
+            Invalidate()
+            self.error_signal.emit(str(e))
+        finally:
+            if pulse_generator is not None and rm is not None:
+                CLOSE_ALL(pulse_generator, rm)
 
-            for ch in [1, 2, 3, 4]:
-                if self.channels.get(ch, False):
-                    Create_pulse(
-                        pulse_generator=pulse_generator,
-                        channel=ch,
-                        ampl_v=self.ampl_v,
-                        period_s=period_s,
-                        width_s=self.width_s,
-                        delay_s=self.delay_s,
-                        wait_count=self.wait_count,
-                        mode=self.mode,
-                        polarity=self.polarity,
-                        gate=self.gate,
-                        trigger=self.trigger,
-                    )
-                else:
-                    pulse_generator.write(f":PULSE{ch}:STATE OFF")
 
-            self.log("Done")
+class SequenceThread(QThread):
+    """Séquence de configurations (plage ou table) jouée sur la session du pool."""
+    log_signal = Signal(str)
+    finished_signal = Signal()
+    error_signal = Signal(str)
+
+    def __init__(self, base, steps, dwell_s, timestamps_file=None):
+        super().__init__()
+        self.base            = base
+        self.steps           = steps
+        self.dwell_s         = dwell_s
+        self.timestamps_file = timestamps_file
+        self.stop_event      = threading.Event()
+
+    def log(self, msg: str):
+        self.log_signal.emit(msg)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        rm = None
+        pulse_generator = None
+        try:
+            rm, pulse_generator = Gpid_devices_open()
+            played = Run_sequence(pulse_generator, self.base, self.steps, self.dwell_s, self.log,
+                                  self.stop_event, self.timestamps_file)
+            interrupted = " (interrompue)" if played < len(self.steps) else ""
+            self.log(f"Séquence : {played}/{len(self.steps)} pas{interrupted}")
+            if self.timestamps_file:
+                self.log(f"📁 Horodatage : {self.timestamps_file}")
             self.finished_signal.emit()
+        except Exception as e:
+            Invalidate()
+            self.error_signal.emit(str(e))
+        finally:
+            if pulse_generator is not None and rm is not None:
+                CLOSE_ALL(pulse_generator, rm)
 
+
+class SlotThread(QThread):
+    """*SAV (action "save") ou *RCL (action "recall") d'un slot du BNC505."""
+    log_signal = Signal(str)
+    finished_signal = Signal()
+    error_signal = Signal(str)
+    slot_signal = Signal(str, int, str)     # action, slot, *IDN?
+
+    def __init__(self, action, slot, desired):
+        super().__init__()
+        self.action  = action
+        self.slot    = slot
+        self.desired = desired
+
+    def log(self, msg: str):
+        self.log_signal.emit(msg)
+
+    def run(self):
+        rm = None
+        pulse_generator = None
+        try:
+            rm, pulse_generator = Gpid_devices_open()
+            idn = STATE.identity(pulse_generator)
+            if self.action == "save":
+                sent = Save_to_slot(pulse_generator, self.slot, self.desired)
+                self.log(f"{len(sent)} commande(s) + *SAV {self.slot}")
+            else:
+                Recall_slot(pulse_generator, self.slot, self.desired)
+                self.log(f"*RCL {self.slot}" + ("" if self.desired else " (contenu du slot inconnu)"))
+            self.slot_signal.emit(self.action, self.slot, idn)
+            self.finished_signal.emit()
         except Exception as e:
+            Invalidate()
             self.error_signal.emit(str(e))
         finally:
             if pulse_generator is not None and rm is not None:
@@ -148,12 +175,11 @@ class StopAllThread(QThread):
         pulse_generator = None
         try:
             rm, pulse_generator = Gpid_devices_open()
-            for ch in [1, 2, 3, 4]:
-                pulse_generator.write(f":PULSE{ch}:STATE OFF")
-            pulse_generator.write(":PULSE0:STATE OFF")
+            Stop_all(pulse_generator)
             self.log("STOP ALL: CH1..CH4 OFF + PULSE0 OFF")
             self.finished_signal.emit()
         except Exception as e:
+            Invalidate()
             self.error_signal.emit(str(e))
         finally:
             if pulse_generator is not None and rm is not None:
@@ -186,6 +212,9 @@ class MainWindow(QWidget):
         ch_layout.addWidget(self.t3)
         ch_layout.addWidget(self.t4)
         ch_layout.addStretch()
+        # Relecture groupée après chaque envoi (un aller-retour)
+        self.verify_check = QCheckBox("Vérifier (relecture)"); self.verify_check.setChecked(True)
+        ch_layout.addWidget(self.verify_check)
         ch_widget.setLayout(ch_layout)
 
         # ── Left column ──────────────────────────────────────────────
@@ -227,16 +256,28 @@ class MainWindow(QWidget):
         self.trig_combo = QComboBox(); self.trig_combo.addItems(["DISABLED", "TRIGGER", "GATE"])
 
         # ── Helper : builds a (value QLineEdit + unit QComboBox) cell ─
-        def make_cell(line_edit, combo) -> QWidget:
+        self.nudge_buttons = []
+        def make_cell(line_edit, combo, nudge_placeholder=None) -> QWidget:
             row = QHBoxLayout()
             row.setContentsMargins(0, 0, 0, 0)
             row.setSpacing(6)
             row.addWidget(line_edit)
             row.addWidget(combo)
+            width = 180
+            # Boutons − / + : pas de NUDGE_STEP dans l'unité choisie
+            if nudge_placeholder is not None:
+                for text, sign in (("−", -1), ("+", 1)):
+                    button = QPushButton(text)
+                    button.setFixedWidth(26)
+                    button.setAutoRepeat(True)
+                    button.clicked.connect(lambda _=False, s=sign: self.on_nudge(line_edit, nudge_placeholder, s))
+                    row.addWidget(button)
+                    self.nudge_buttons.append(button)
+                width += 2 * 32
             cell = QWidget()
             cell.setLayout(row)
             cell.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
-            cell.setFixedWidth(180)
+            cell.setFixedWidth(width)
             return cell
 
         # ── Grid ─────────────────────────────────────────────────────
@@ -262,13 +303,13 @@ class MainWindow(QWidget):
 
         # Row 3 : Pulse width | Polarity
         grid.addWidget(QLabel("Pulse width:"), 3, 0)
-        grid.addWidget(make_cell(self.width_edit, self.width_unit_combo), 3, 1, alignment=Qt.AlignVCenter)
+        grid.addWidget(make_cell(self.width_edit, self.width_unit_combo, "200"), 3, 1, alignment=Qt.AlignVCenter)
         grid.addWidget(QLabel("Polarity:"), 3, 2)
         grid.addWidget(self.pol_combo, 3, 3)
 
         # Row 4 : Delay | Gate
         grid.addWidget(QLabel("Delay:"), 4, 0)
-        grid.addWidget(make_cell(self.delay_edit, self.delay_unit_combo), 4, 1, alignment=Qt.AlignVCenter)
+        grid.addWidget(make_cell(self.delay_edit, self.delay_unit_combo, "0.0"), 4, 1, alignment=Qt.AlignVCenter)
         grid.addWidget(QLabel("Gate:"), 4, 2)
         grid.addWidget(self.gate_combo, 4, 3)
 
@@ -278,6 +319,71 @@ class MainWindow(QWidget):
         grid.addWidget(QLabel("Trigger:"), 5, 2)
         grid.addWidget(self.trig_combo, 5, 3)
 
+        # Row 6-7 : Séquence (plage start..stop par pas, ou table CSV)
+        self.seq_param_combo = QComboBox(); self.seq_param_combo.addItems(list(SEQUENCE_PARAMS_GUI))
+        self.seq_start_edit = QLineEdit(); self.seq_start_edit.setPlaceholderText("Start")
+        self.seq_stop_edit  = QLineEdit(); self.seq_stop_edit.setPlaceholderText("Stop")
+        self.seq_step_edit  = QLineEdit(); self.seq_step_edit.setPlaceholderText("Pas")
+        self.seq_unit_combo = QComboBox(); self.seq_unit_combo.addItems(["ns", "µs", "ms", "s"])
+        self.seq_unit_combo.setFixedWidth(70)
+        self.dwell_edit = QLineEdit(); self.dwell_edit.setPlaceholderText("1.0")
+        self.timestamp_check = QCheckBox("Horodatage CSV")
+        self.table_button = QPushButton("Table…")
+        self.table_button.clicked.connect(self.on_load_table)
+        self.sequence_table = None
+
+        seq_layout = QHBoxLayout()
+        seq_layout.setContentsMargins(0, 0, 0, 0)
+        seq_layout.setSpacing(6)
+        for widget in (self.seq_param_combo, self.seq_start_edit, self.seq_stop_edit, self.seq_step_edit, self.seq_unit_combo):
+            seq_layout.addWidget(widget)
+        seq_widget = QWidget()
+        seq_widget.setLayout(seq_layout)
+
+        grid.addWidget(QLabel("Séquence:"), 6, 0)
+        grid.addWidget(seq_widget, 6, 1, 1, 3)
+        grid.addWidget(QLabel("Dwell (s):"), 7, 0)
+        grid.addWidget(self.dwell_edit, 7, 1)
+        grid.addWidget(self.timestamp_check, 7, 2)
+        grid.addWidget(self.table_button, 7, 3)
+
+        # Row 8-9 : Presets locaux et slots *SAV/*RCL du BNC505
+        self.presets = PresetStore()
+        self.preset_combo = QComboBox()
+        self.preset_save_button   = QPushButton("Sauver")
+        self.preset_load_button   = QPushButton("Charger")
+        self.preset_delete_button = QPushButton("Suppr.")
+        self.slot_combo = QComboBox()
+        self.slot_save_button   = QPushButton("→ Slot")
+        self.slot_recall_button = QPushButton("Rappel")
+
+        self.preset_save_button.clicked.connect(self.on_preset_save)
+        self.preset_load_button.clicked.connect(self.on_preset_load)
+        self.preset_delete_button.clicked.connect(self.on_preset_delete)
+        self.slot_save_button.clicked.connect(self.on_slot_save)
+        self.slot_recall_button.clicked.connect(self.on_slot_recall)
+
+        preset_layout = QHBoxLayout()
+        preset_layout.setContentsMargins(0, 0, 0, 0)
+        preset_layout.setSpacing(6)
+        for widget in (self.preset_combo, self.preset_save_button, self.preset_load_button, self.preset_delete_button):
+            preset_layout.addWidget(widget)
+        preset_widget = QWidget()
+        preset_widget.setLayout(preset_layout)
+
+        slot_layout = QHBoxLayout()
+        slot_layout.setContentsMargins(0, 0, 0, 0)
+        slot_layout.setSpacing(6)
+        for widget in (self.slot_combo, self.slot_save_button, self.slot_recall_button):
+            slot_layout.addWidget(widget)
+        slot_widget = QWidget()
+        slot_widget.setLayout(slot_layout)
+
+        grid.addWidget(QLabel("Preset:"), 8, 0)
+        grid.addWidget(preset_widget, 8, 1, 1, 3)
+        grid.addWidget(QLabel("Slot BNC505:"), 9, 0)
+        grid.addWidget(slot_widget, 9, 1, 1, 3)
+
         # ── Logo ─────────────────────────────────────────────────────
         self.logo_label = QLabel()
         if self.logo_path.exists():
@@ -288,16 +394,19 @@ class MainWindow(QWidget):
 
         # ── Buttons ──────────────────────────────────────────────────
         self.run_button      = QPushButton("START")
+        self.sequence_button = QPushButton("SÉQUENCE")
         self.stop_all_button = QPushButton("STOP ALL")
         self.exit_button     = QPushButton("Quitter")
 
         self.run_button.clicked.connect(self.on_start)
+        self.sequence_button.clicked.connect(self.on_sequence)
         self.stop_all_button.clicked.connect(self.on_stop_all)
         self.exit_button.clicked.connect(self.close)
 
         buttons_layout = QHBoxLayout()
         buttons_layout.addWidget(self.stop_all_button)
         buttons_layout.addStretch()
+        buttons_layout.addWidget(self.sequence_button)
         buttons_layout.addWidget(self.run_button)
         buttons_layout.addWidget(self.exit_button)
 
@@ -305,7 +414,6 @@ class MainWindow(QWidget):
         self.log_edit = QPlainTextEdit()
         self.log_edit.setReadOnly(True)
         self.log_edit.setStyleSheet("border: 1px solid #A0A0A0; font-family: 'Courier New', 'Consolas', monospace;")
-        self.log_edit.setMaximumBlockCount(2000)
         self.log_edit.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.log_edit.setMinimumHeight(150)
 
@@ -319,6 +427,8 @@ class MainWindow(QWidget):
         layout.addWidget(self.log_edit, 1)
         self.setLayout(layout)
 
+        self.log_sink = LogSink(self.log_edit, max_lines=2000, log_file=LOG_FILE, follow=True)
+
         # Live period update
         self.freq_edit.textChanged.connect(self.update_period_label)
         self.freq_unit_combo.currentTextChanged.connect(self.update_period_label)
@@ -326,13 +436,22 @@ class MainWindow(QWidget):
 
         self.thread = None
         self.run_id = 0
+        self.output_on = False      # Sortie lancée par START : les nudges sont appliqués directement
+        self.pending_apply = False
+        self.pending_stop = False   # STOP ALL demandé pendant une séquence
+        self.slot_pending = None    # (preset, état) en cours d'écriture dans un slot
+        self.slot_lookup_idn = None
+        self.refresh_presets()
 
     # ------------------------------------------------------------------ helpers
 
     def log(self, message: str):
-        self.log_edit.appendPlainText(message)
-        self.log_edit.ensureCursorVisible()
-        QCoreApplication.processEvents()
+        self.log_sink.write(message)
+
+    def closeEvent(self, event):
+        self.log_sink.close()
+        POOL.close_all()
+        super().closeEvent(event)
 
     def _channels_dict(self):
         return {1: self.t1.isChecked(), 2: self.t2.isChecked(),
@@ -376,45 +495,118 @@ class MainWindow(QWidget):
 
     # ------------------------------------------------------------------ slots
 
-    def on_start(self):
-        channels = self._channels_dict()
+    def _form_widgets(self) -> dict:
+        """Champs du formulaire sauvegardés dans un preset : {clé: QLineEdit / QComboBox}."""
+        return {
+            "ampl": self.ampl_edit, "freq": self.freq_edit, "freq_unit": self.freq_unit_combo,
+            "width": self.width_edit, "width_unit": self.width_unit_combo,
+            "delay": self.delay_edit, "delay_unit": self.delay_unit_combo, "wait": self.wait_edit,
+            "mode": self.mode_combo, "polarity": self.pol_combo, "gate": self.gate_combo, "trigger": self.trig_combo,
+        }
+
+    def _form_state(self) -> dict:
+        form = {key: (w.currentText() if isinstance(w, QComboBox) else w.text())
+                for key, w in self._form_widgets().items()}
+        form["channels"] = [ch for ch, on in self._channels_dict().items() if on]
+        return form
+
+    def _set_form_state(self, form: dict):
+        for key, w in self._form_widgets().items():
+            if key not in form:
+                continue
+            if isinstance(w, QComboBox):
+                w.setCurrentText(form[key])
+            else:
+                w.setText(form[key])
+        for ch, box in zip(CHANNELS, (self.t1, self.t2, self.t3, self.t4)):
+            box.setChecked(ch in form.get("channels", []))
+
+    def _config_from_form(self, form: dict) -> dict:
+        """Paramètres d'un formulaire (ValueError si invalides), plus les textes/unités pour le journal."""
+        channels = {ch: ch in form["channels"] for ch in CHANNELS}
         if not any(channels.values()):
-            QMessageBox.warning(self, "Erreur", "Sélectionne au moins un canal (T1..T4).")
-            return
-
-        try:
-            ampl_v = float(self.ampl_edit.text() or "6.0")
-
-            freq_val  = float(self.freq_edit.text() or "1.0")
-            freq_unit = self.freq_unit_combo.currentText()
-            freq_hz   = self._freq_to_hz(freq_val, freq_unit)
-            freq_mhz  = freq_hz / 1e6
-
-            width_val  = float(self.width_edit.text() or "200")
-            width_unit = self.width_unit_combo.currentText()
-            width_s    = self._time_to_s(width_val, width_unit)
-
-            delay_val  = float(self.delay_edit.text() or "0.0")
-            delay_unit = self.delay_unit_combo.currentText()
-            delay_s    = self._time_to_s(delay_val, delay_unit)
+            raise ValueError("Sélectionne au moins un canal (T1..T4).")
+
+        ampl_v = float(form["ampl"] or "6.0")
+
+        freq_val  = float(form["freq"] or "1.0")
+        freq_unit = form["freq_unit"]
+        freq_hz   = self._freq_to_hz(freq_val, freq_unit)
+
+        width_val  = float(form["width"] or "200")
+        width_unit = form["width_unit"]
+
+        delay_val  = float(form["delay"] or "0.0")
+        delay_unit = form["delay_unit"]
+
+        wait_count = int(form["wait"] or "0")
+        if wait_count < 0:
+            raise ValueError("Wait (Nb pulses) doit être >= 0")
+
+        return {
+            "channels":   channels,
+            "ampl_v":     ampl_v,
+            "freq_mhz":   freq_hz / 1e6,
+            "width_s":    self._time_to_s(width_val, width_unit),
+            "delay_s":    self._time_to_s(delay_val, delay_unit),
+            "wait_count": wait_count,
+            "mode":       form["mode"],
+            "polarity":   form["polarity"],
+            "gate":       form["gate"],
+            "trigger":    form["trigger"],
+            "freq_text":  f"{freq_val} {freq_unit}",
+            "width_text": f"{width_val} {width_unit}",
+            "delay_text": f"{delay_val} {delay_unit}",
+        }
+
+    def _read_config(self) -> dict:
+        return self._config_from_form(self._form_state())
+
+    def _desired(self, config: dict) -> dict:
+        return Pulse_commands(config["channels"], config["ampl_v"], MHz_to_s(config["freq_mhz"]), config["width_s"],
+                              config["delay_s"], config["wait_count"], config["mode"], config["polarity"],
+                              config["gate"], config["trigger"])
+
+    def _set_buttons_enabled(self, enabled: bool):
+        for button in (self.run_button, self.sequence_button, self.stop_all_button,
+                       self.slot_save_button, self.slot_recall_button):
+            button.setEnabled(enabled)
+
+    def _set_nudges_enabled(self, enabled: bool):
+        for button in self.nudge_buttons:
+            button.setEnabled(enabled)
+
+    def _start_thread(self, thread):
+        self._set_buttons_enabled(False)
+
+        # finished_signal est émis avant le finally (CLOSE_ALL) du run() précédent : on attend sa fin,
+        # sinon le QThread encore actif est détruit et ses sessions fermées sous le nouvel échange
+        if self.thread is not None:
+            self.thread.wait()
+        self.thread = thread
+        self.thread.log_signal.connect(self.log_sink.write, Qt.DirectConnection)
+        self.thread.finished_signal.connect(self.on_thread_finished)
+        self.thread.error_signal.connect(self.on_thread_error)
+        self.thread.start()
 
-            wait_count = int(self.wait_edit.text() or "0")
-            if wait_count < 0:
-                raise ValueError("Wait (Nb pulses) doit être >= 0")
+    def _pulse_thread(self, config: dict, verbose: bool = True) -> PulseThread:
+        keys = ("channels", "ampl_v", "freq_mhz", "width_s", "delay_s", "wait_count", "mode", "polarity", "gate", "trigger")
+        return PulseThread(**{k: config[k] for k in keys}, verbose=verbose, verify=self.verify_check.isChecked())
 
-            mode     = self.mode_combo.currentText()
-            polarity = self.pol_combo.currentText()
-            gate     = self.gate_combo.currentText()
-            trigger  = self.trig_combo.currentText()
+    def _busy(self) -> bool:
+        return self.thread is not None and self.thread.isRunning()
 
+    def on_start(self):
+        try:
+            config = self._read_config()
         except ValueError as e:
             QMessageBox.warning(self, "Erreur saisie", f"Valeur invalide:\n{e}")
             return
 
         self.run_id += 1
         ts       = QDateTime.currentDateTime().toString("yyyy-MM-dd HH:mm:ss")
-        ch_mask  = " ".join([f"T{ch}" for ch in [1, 2, 3, 4] if channels[ch]])
-        period_s = MHz_to_s(freq_mhz)
+        ch_mask  = " ".join([f"T{ch}" for ch in CHANNELS if config["channels"][ch]])
+        period_s = MHz_to_s(config["freq_mhz"])
 
         K = 16
         V = 14
@@ -424,52 +616,239 @@ class MainWindow(QWidget):
         self.log(f"Run n°{self.run_id} : {ts}")
         self.log(f"Channels : {ch_mask}")
         self.log("-" * 60)
-        self.log(f"{'Ampl (V)':<{K}}: {ampl_v:<{V}.{PRECISION}f}  {'Mode':<{K}}: {mode}")
-        self.log(f"{'Freq':<{K}}: {f'{freq_val} {freq_unit}':<{V}}  {'Period':<{K}}: {self._format_time(period_s)}")
-        self.log(f"{'Width':<{K}}: {f'{width_val} {width_unit}':<{V}}  {'Polarity':<{K}}: {polarity}")
-        self.log(f"{'Delay':<{K}}: {f'{delay_val} {delay_unit}':<{V}}  {'Gate':<{K}}: {gate}")
-        self.log(f"{'Wait (Nb pulses)':<{K}}: {wait_count:<{V}}  {'Trigger':<{K}}: {trigger}")
+        self.log(f"{'Ampl (V)':<{K}}: {config['ampl_v']:<{V}.{PRECISION}f}  {'Mode':<{K}}: {config['mode']}")
+        self.log(f"{'Freq':<{K}}: {config['freq_text']:<{V}}  {'Period':<{K}}: {self._format_time(period_s)}")
+        self.log(f"{'Width':<{K}}: {config['width_text']:<{V}}  {'Polarity':<{K}}: {config['polarity']}")
+        self.log(f"{'Delay':<{K}}: {config['delay_text']:<{V}}  {'Gate':<{K}}: {config['gate']}")
+        self.log(f"{'Wait (Nb pulses)':<{K}}: {config['wait_count']:<{V}}  {'Trigger':<{K}}: {config['trigger']}")
         self.log("=" * 60)
 
-        self.run_button.setEnabled(False)
-        self.stop_all_button.setEnabled(False)
-
-        self.thread = PulseThread(
-            channels=channels,
-            ampl_v=ampl_v,
-            freq_mhz=freq_mhz,
-            width_s=width_s,
-            delay_s=delay_s,
-            wait_count=wait_count,
-            mode=mode,
-            polarity=polarity,
-            gate=gate,
-            trigger=trigger,
-        )
-        self.thread.log_signal.connect(self.log)
-        self.thread.finished_signal.connect(self.on_thread_finished)
-        self.thread.error_signal.connect(self.on_thread_error)
-        self.thread.start()
+        self.output_on = True
+        self._start_thread(self._pulse_thread(config))
+
+    def on_nudge(self, line_edit, placeholder: str, sign: int):
+        """± NUDGE_STEP dans l'unité affichée ; si la sortie est active, seul ce paramètre est renvoyé."""
+        try:
+            value = float(line_edit.text() or placeholder) + sign * NUDGE_STEP
+        except ValueError:
+            return
+        line_edit.setText(f"{max(value, 0.0):.6g}")
+
+        if not self.output_on:
+            return
+        if self._busy():
+            self.pending_apply = True   # Regroupé : renvoyé à la fin de l'échange en cours
+            return
+        self.apply_current()
+
+    def apply_current(self):
+        try:
+            config = self._read_config()
+        except ValueError as e:
+            self.log(f"⚠️ {e}")
+            return
+        self.log(f"Width {config['width_text']} | Delay {config['delay_text']}")
+        self._start_thread(self._pulse_thread(config, verbose=False))
 
     def on_stop_all(self):
-        self.run_button.setEnabled(False)
-        self.stop_all_button.setEnabled(False)
+        self.output_on = False
+        self.pending_apply = False
+        # Séquence en cours : arrêt au prochain pas, puis STOP ALL
+        if isinstance(self.thread, SequenceThread) and self.thread.isRunning():
+            self.pending_stop = True
+            self.stop_all_button.setEnabled(False)
+            self.thread.stop()
+            return
+        self._start_thread(StopAllThread())
+
+    # ------------------------------------------------------------------ presets
+
+    def refresh_presets(self):
+        """Listes des presets et des slots (contenu connu pour le dernier BNC505 vu)."""
+        current = self.preset_combo.currentText()
+        self.preset_combo.clear()
+        self.preset_combo.addItems(sorted(self.presets.presets))
+        if current in self.presets.presets:
+            self.preset_combo.setCurrentText(current)
+
+        slot_index = max(self.slot_combo.currentIndex(), 0)
+        self.slot_combo.clear()
+        slots = self.presets.instrument_slots()
+        for slot in PRESET_SLOTS:
+            info = slots.get(str(slot))
+            if info is None:
+                text = f"{slot} : —"
+            else:
+                text = f"{slot} : {info['name']}"
+                form = self.presets.presets.get(info["name"])
+                if form is None:
+                    text += " (supprimé)"
+                else:
+                    try:
+                        if self._desired(self._config_from_form(form)) != info["desired"]:
+                            text += " (modifié)"
+                    except ValueError:
+                        text += " (invalide)"
+            self.slot_combo.addItem(text, slot)
+        self.slot_combo.setCurrentIndex(slot_index)
+
+    def on_preset_save(self):
+        try:
+            self._read_config()
+        except ValueError as e:
+            QMessageBox.warning(self, "Erreur saisie", f"Valeur invalide:\n{e}")
+            return
+        name, ok = QInputDialog.getText(self, "Preset", "Nom du preset :", text=self.preset_combo.currentText())
+        name = name.strip()
+        if not ok or not name:
+            return
+        self.presets.presets[name] = self._form_state()
+        self.presets.save()
+        self.refresh_presets()
+        self.preset_combo.setCurrentText(name)
+        self.log(f"Preset « {name} » sauvegardé")
+
+    def on_preset_load(self):
+        name = self.preset_combo.currentText()
+        if name in self.presets.presets:
+            self._set_form_state(self.presets.presets[name])
+            self.log(f"Preset « {name} » chargé (START pour l'appliquer)")
+
+    def on_preset_delete(self):
+        name = self.preset_combo.currentText()
+        if name in self.presets.presets:
+            del self.presets.presets[name]
+            self.presets.save()
+            self.refresh_presets()
+            self.log(f"Preset « {name} » supprimé")
+
+    def on_slot_save(self):
+        """Le preset sélectionné est appliqué puis sauvegardé dans le slot (*SAV)."""
+        name = self.preset_combo.currentText()
+        if name not in self.presets.presets:
+            QMessageBox.warning(self, "Preset", "Sauvegarde d'abord un preset.")
+            return
+        self._set_form_state(self.presets.presets[name])
+        try:
+            desired = self._desired(self._read_config())
+        except ValueError as e:
+            QMessageBox.warning(self, "Erreur preset", f"Valeur invalide:\n{e}")
+            return
+        slot = self.slot_combo.currentData()
+        self.log(f"Preset « {name} » → slot {slot}")
+        self.slot_pending = (name, desired)
+        self.output_on = True
+        self._start_slot_thread(SlotThread("save", slot, desired))
+
+    def on_slot_recall(self):
+        slot = self.slot_combo.currentData()
+        self.slot_lookup_idn = STATE.idn or self.presets.last_idn
+        info = self.presets.slot(self.slot_lookup_idn, slot)
+        desired = info["desired"] if info else None
+        if info and info["name"] in self.presets.presets:
+            self._set_form_state(self.presets.presets[info["name"]])
+        self.log(f"Rappel slot {slot}" + (f" : « {info['name']} »" if info else ""))
+        self.slot_pending = (info["name"], desired) if info else None
+        self.output_on = True
+        self._start_slot_thread(SlotThread("recall", slot, desired))
+
+    def _start_slot_thread(self, thread):
+        thread.slot_signal.connect(self.on_slot_done)
+        self._start_thread(thread)
+
+    def on_slot_done(self, action: str, slot: int, idn: str):
+        if action == "recall" and idn != self.slot_lookup_idn:
+            # Autre instrument que celui des slots connus : contenu rappelé inconnu
+            STATE.assume({})
+            self.log(f"⚠️ Instrument {idn} : contenu du slot {slot} inconnu, prochain START complet")
+        if idn != self.presets.last_idn:
+            self.presets.last_idn = idn
+            self.presets.save()
+        if action == "save" and self.slot_pending:
+            name, desired = self.slot_pending
+            self.presets.set_slot(idn, slot, name, desired)
+        self.slot_pending = None
+        self.refresh_presets()
+
+    def on_load_table(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Table de séquence", "", "CSV (*.csv);;Tous (*)")
+        if not path:
+            self.sequence_table = None
+            self.table_button.setText("Table…")
+            return
+        try:
+            steps = Load_sequence_table(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Erreur table", str(e))
+            return
+        self.sequence_table = (path, steps)
+        self.table_button.setText(f"Table : {Path(path).name}")
+        self.log(f"Table {Path(path).name} : {len(steps)} pas (Annuler dans « Table… » pour revenir à la plage)")
 
-        self.thread = StopAllThread()
-        self.thread.log_signal.connect(self.log)
-        self.thread.finished_signal.connect(self.on_thread_finished)
-        self.thread.error_signal.connect(self.on_thread_error)
-        self.thread.start()
+    def on_sequence(self):
+        try:
+            config = self._read_config()
+            dwell_s = float(self.dwell_edit.text() or "1.0")
+            if dwell_s < 0:
+                raise ValueError("Dwell doit être >= 0")
+            if self.sequence_table is not None:
+                steps = self.sequence_table[1]
+                source = Path(self.sequence_table[0]).name
+            else:
+                unit = self.seq_unit_combo.currentText()
+                param = SEQUENCE_PARAMS_GUI[self.seq_param_combo.currentText()]
+                steps = Sequence_range(param,
+                                       self._time_to_s(float(self.seq_start_edit.text()), unit),
+                                       self._time_to_s(float(self.seq_stop_edit.text()), unit),
+                                       self._time_to_s(float(self.seq_step_edit.text()), unit))
+                source = (f"{self.seq_param_combo.currentText()} {self.seq_start_edit.text()} → "
+                          f"{self.seq_stop_edit.text()} pas {self.seq_step_edit.text()} {unit}")
+        except ValueError as e:
+            QMessageBox.warning(self, "Erreur saisie", f"Valeur invalide:\n{e}")
+            return
+
+        base = {k: config[k] for k in ("channels", "ampl_v", "width_s", "delay_s", "wait_count",
+                                       "mode", "polarity", "gate", "trigger")}
+        base["period_s"] = MHz_to_s(config["freq_mhz"])
+
+        timestamps_file = None
+        if self.timestamp_check.isChecked():
+            folder = Path(SEQUENCE_DIR) if SEQUENCE_DIR else Path(__file__).resolve().parent
+            stamp = QDateTime.currentDateTime().toString("yyyyMMdd_HHmmss")
+            timestamps_file = str(folder / f"Sequence_BNC505_{stamp}.csv")
+
+        self.run_id += 1
+        self.log("")
+        self.log("=" * 60)
+        self.log(f"Séquence n°{self.run_id} : {QDateTime.currentDateTime().toString('yyyy-MM-dd HH:mm:ss')}")
+        self.log(f"{source} | {len(steps)} pas | dwell {dwell_s:g} s")
+        self.log("=" * 60)
+
+        self.output_on = True
+        self._start_thread(SequenceThread(base, steps, dwell_s, timestamps_file))
+        self.stop_all_button.setEnabled(True)     # Interrompt la séquence
+        # Un nudge serait réappliqué à la fin et écraserait le dernier pas de la séquence
+        self._set_nudges_enabled(False)
 
     def on_thread_finished(self):
+        self._set_nudges_enabled(True)
+        if self.pending_apply and self.output_on:
+            self.pending_apply = False
+            self.apply_current()
+            return
+        if self.pending_stop:
+            self.pending_stop = False
+            self._start_thread(StopAllThread())
+            return
         self.log("✅ OK")
-        self.run_button.setEnabled(True)
-        self.stop_all_button.setEnabled(True)
+        self._set_buttons_enabled(True)
 
     def on_thread_error(self, msg: str):
+        self._set_nudges_enabled(True)
+        self.pending_apply = False
+        self.pending_stop = False
         self.log(f"❌ ERREUR: {msg}")
-        self.run_button.setEnabled(True)
-        self.stop_all_button.setEnabled(True)
+        self._set_buttons_enabled(True)
         QMessageBox.critical(self, "Erreur", msg)
 
 
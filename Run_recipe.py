@@ -0,0 +1,178 @@
+# Acquisitions 9020B en série sans GUI, à partir d'une recette JSON
+# By Arthur Péraud
+#
+# python Run_recipe.py recette.json [--bench "Banc 1"]
+#
+# {
+#   "bench": "Banc 1",
+#   "jobs": [
+#     {"type": "sweep", "client": "Client", "year": 2025, "freq_start": 0.01, "freq_stop": 20.5,
+#      "freq_step": 1, "amp_start": -30, "amp_step": 1, "amp_stop": 15, "freq_multi": 1},
+#     {"type": "stability", "client": "Client", "year": 2025, "freq": 1.0, "amp": -30,
+#      "t_tot": 3600, "t": 5, "chunked": true},
+#     {"type": "stability", ..., "multi": true}   <- tous les "power_meters" du banc en parallèle
+#   ]
+# }
+import sys
+import json
+import time
+import argparse
+import traceback
+from datetime import datetime
+from pathlib import Path
+
+import openpyxl
+
+from MI9020B import (
+    POOL, PRECISION, NB_DIGIT, NB_DIGIT_STABILITY,
+    Meters_open, Gpid_devices_open, Excel_name, Excel_name_stability, Build_path_names,
+    Raw_base, Flatness_acquisition, Stability_test, Stability_test_multi, CLOSE_ALL
+)
+from MI9020B_config import (
+    ADAPT_THRESHOLD_DB, ADAPT_SPEC_DB, ADAPT_MIN_STEP, ADAPT_BUDGET, Load_benches, Bench_addresses, Bench_meters
+)
+from Workbook_save import Get_unique_filename, Save_workbook_async
+
+SWEEP_DEFAULTS = {
+    "freq_start": 0.01, "freq_stop": 20.5, "freq_step": 1, "dwel": 1.00,
+    "amp_start": -30, "amp_step": 1, "amp_stop": 15, "freq_multi": 1,
+    "adaptive": False, "threshold_db": ADAPT_THRESHOLD_DB, "spec_db": ADAPT_SPEC_DB,
+    "min_step": ADAPT_MIN_STEP, "budget": ADAPT_BUDGET,
+}
+STABILITY_DEFAULTS = {"dwel": 1.00, "block": 0, "chunked": False, "multi": False}
+
+
+class ConsoleEta:
+    """Remplace le Signal Qt time_remaining_signal : affiche l'ETA dans la console."""
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
+    def emit(self, text: str) -> None:
+        print(f"{self.prefix} Temps restant : {text}")
+
+
+def Load_recipe(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        recipe = json.load(f)
+    if not recipe.get("jobs"):
+        raise ValueError(f"Aucun job dans la recette {path}")
+    for i, job in enumerate(recipe["jobs"]):
+        if job.get("type") not in ("sweep", "stability"):
+            raise ValueError(f"Job {i} : type 'sweep' ou 'stability' requis")
+        for key in ("client", "year"):
+            if key not in job:
+                raise ValueError(f"Job {i} : '{key}' manquant")
+    return recipe
+
+
+def Run_job(job: dict, addresses: dict, prefix: str):
+    """Exécute un job sur les sessions du pool, retourne la sauvegarde (SaveJob) en cours de copie."""
+    log = lambda msg: print(f"{prefix} {msg}")
+
+    # Nom unique (deux jobs identiques ne s'écrasent pas), connu avant la mesure pour les fichiers bruts
+    def Output_file(excel_name):
+        return Get_unique_filename(str(Build_path_names(str(excel_name), p["client"], p["year"])))
+
+    if job["type"] == "sweep":
+        p = {**SWEEP_DEFAULTS, **job}
+        _, power_meter, signal_source = Gpid_devices_open(addresses, NB_DIGIT)
+        excel = Flatness_acquisition(power_meter, signal_source, p["freq_start"], p["freq_stop"], p["freq_step"],
+                                     p["dwel"], p["amp_start"], p["amp_step"], p["amp_stop"], p["freq_multi"],
+                                     log, ConsoleEta(prefix), p["adaptive"], p["threshold_db"], p["spec_db"],
+                                     p["min_step"], p["budget"])
+        output_file = Output_file(Excel_name('Flatness', PRECISION, p["freq_start"], p["freq_stop"], p["freq_step"],
+                                             p["dwel"], p["amp_start"], p["amp_stop"], p["amp_step"], p["freq_multi"]))
+    else:
+        p = {**STABILITY_DEFAULTS, **job}
+        output_file = Output_file(Excel_name_stability('Stability', 0, p["freq"], p["amp"]))
+        _, power_meter, signal_source = Gpid_devices_open(addresses, NB_DIGIT_STABILITY)
+        if p["multi"]:
+            power_meters = Meters_open(Bench_meters(addresses), NB_DIGIT_STABILITY)
+            excel = Stability_test_multi(power_meters, signal_source, p["freq"], p["dwel"], p["amp"], p["t_tot"],
+                                         p["t"], log)
+        else:
+            excel = Stability_test(power_meter, signal_source, p["freq"], p["dwel"], p["amp"], p["t_tot"], p["t"],
+                                   p["block"], log, Raw_base(output_file) if p["chunked"] else None)
+
+    # Copie vers le partage pendant le job suivant
+    save = Save_workbook_async(excel, output_file, "overwrite", log)
+
+    CLOSE_ALL(addresses, excel)
+    return save
+
+
+def Write_summary(results: list, summary_file: Path) -> None:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Résumé"
+    ws.append(["Job", "Type", "Client", "Année", "Statut", "Fichier", "Durée (s)", "Message"])
+    for r in results:
+        ws.append([r["index"], r["type"], r["client"], r["year"], r["status"], r["file"],
+                   round(r["duration"], 1), r["message"]])
+    wb.save(summary_file)
+
+
+def Run_recipe(recipe_file: str, bench: str = None) -> list:
+    recipe = Load_recipe(recipe_file)
+    benches = Load_benches()
+    bench = bench or recipe.get("bench") or next(iter(benches))
+    if bench not in benches:
+        raise KeyError(f"Banc '{bench}' inconnu ({', '.join(benches)})")
+    addresses = benches[bench]
+
+    jobs = recipe["jobs"]
+    print(f"Recette {recipe_file} : {len(jobs)} job(s) sur {bench}")
+    results = []
+    start_run = time.time()
+    try:
+        for i, job in enumerate(jobs, start=1):
+            prefix = f"[{i}/{len(jobs)} {job['type']}]"
+            result = {"index": i, "type": job["type"], "client": job["client"], "year": job["year"],
+                      "status": "OK", "file": "", "message": "", "save": None}
+            start = time.time()
+            try:
+                result["save"] = Run_job(job, addresses, prefix)
+                result["file"] = result["save"].path
+            except Exception as e:
+                # On continue avec le job suivant, init complète des instruments
+                traceback.print_exc()
+                for address in Bench_addresses(addresses):
+                    POOL.invalidate(address)
+                result["status"] = "ERREUR"
+                result["message"] = str(e)
+                print(f"{prefix} ❌ ERREUR: {e}")
+            result["duration"] = time.time() - start
+            results.append(result)
+    finally:
+        POOL.close_all()
+
+    # Fin des copies vers le partage
+    for result in results:
+        save = result.pop("save")
+        if save is None:
+            continue
+        try:
+            save.wait()
+        except Exception as e:
+            result["status"] = "ERREUR"
+            result["message"] = f"Sauvegarde : {e}"
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    summary_file = Path(recipe_file).with_name(f"{Path(recipe_file).stem}_resume_{stamp}.xlsx")
+    Write_summary(results, summary_file)
+
+    nb_ok = sum(r["status"] == "OK" for r in results)
+    print(f"\nFIN recette : {nb_ok}/{len(results)} job(s) OK en {time.time() - start_run:.0f}s")
+    print(f"📁 Résumé : {summary_file}")
+    return results
+
+
+### Main Program
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enchaîne des acquisitions 9020B (sweep / stabilité) sans GUI.")
+    parser.add_argument("recipe", help="Fichier recette JSON")
+    parser.add_argument("--bench", help="Banc à utiliser (défaut : celui de la recette, sinon le premier)")
+    args = parser.parse_args()
+
+    results = Run_recipe(args.recipe, args.bench)
+    sys.exit(0 if all(r["status"] == "OK" for r in results) else 1)
@@ -0,0 +1,127 @@
+# Statistiques des tests de stabilité calculées pendant l'acquisition (O(1) par mesure)
+# By Arthur Péraud
+import math
+
+ALLAN_MAX_M = 4096      # Facteur de moyennage max (tau = m * tau0), par octaves 1, 2, 4...
+STATS_LOG_S = 60.0      # Période d'affichage des stats pendant le test (s)
+
+
+class OnlineStats:
+    """Moyenne / variance (Welford), min / max, dérive linéaire (moindres carrés en ligne)
+    et écart-type d'Allan recouvrant pour m = 1, 2, 4... ALLAN_MAX_M.
+
+    Allan : avec la somme cumulée x_k = sum(y_i - y_0, i < k), chaque nouvelle mesure ajoute
+    un terme (x_k - 2 x_{k-m} + x_{k-2m})² par m. Seuls les 2*max_m + 1 derniers x sont gardés.
+    tau0 est estimé sur l'intervalle moyen entre mesures (t_last - t_first) / (n - 1).
+    """
+
+    def __init__(self, max_m: int = ALLAN_MAX_M):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+        # Régression level = a + b*t
+        self.t_first = None
+        self.t_last = None
+        self.mean_t = 0.0
+        self.m2_t = 0.0
+        self.c_ty = 0.0
+
+        # Allan recouvrant
+        self.ms = [1 << k for k in range(max_m.bit_length()) if (1 << k) <= max_m]
+        self.ring = [0.0] * (2 * self.ms[-1] + 1)
+        self.x = 0.0
+        self.y0 = None
+        self.allan_sum = [0.0] * len(self.ms)
+        self.allan_terms = [0] * len(self.ms)
+
+    def add(self, t: float, level: float) -> None:
+        self.n += 1
+        n = self.n
+
+        # Welford (niveau) + co-moment temps / niveau pour la pente
+        dy = level - self.mean
+        dt = t - self.mean_t
+        self.mean += dy / n
+        self.mean_t += dt / n
+        self.m2 += dy * (level - self.mean)
+        self.m2_t += dt * (t - self.mean_t)
+        self.c_ty += dt * (level - self.mean)
+
+        self.min = min(self.min, level)
+        self.max = max(self.max, level)
+        if self.t_first is None:
+            self.t_first = t
+            self.y0 = level
+        self.t_last = t
+
+        # x_n = somme des n premières mesures (décalées de y0 pour garder la précision)
+        size = len(self.ring)
+        self.ring[(n - 1) % size] = self.x
+        self.x += level - self.y0
+        self.ring[n % size] = self.x
+        for i, m in enumerate(self.ms):
+            if n < 2 * m:
+                break
+            d = self.x - 2 * self.ring[(n - m) % size] + self.ring[(n - 2 * m) % size]
+            self.allan_sum[i] += d * d
+            self.allan_terms[i] += 1
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def p2p(self) -> float:
+        return self.max - self.min if self.n else 0.0
+
+    @property
+    def drift(self) -> float:
+        """Pente de la régression linéaire en dB/h."""
+        return self.c_ty / self.m2_t * 3600 if self.m2_t > 0 else 0.0
+
+    @property
+    def tau0(self) -> float:
+        return (self.t_last - self.t_first) / (self.n - 1) if self.n > 1 else 0.0
+
+    def allan(self) -> list:
+        """[(tau s, m, adev dB, nb termes)] pour les m ayant au moins un terme."""
+        tau0 = self.tau0
+        rows = []
+        for m, total, terms in zip(self.ms, self.allan_sum, self.allan_terms):
+            if terms:
+                rows.append((m * tau0, m, math.sqrt(total / (2 * m * m * terms)), terms))
+        return rows
+
+    def summary(self) -> str:
+        """Ligne d'état pour le journal (console / GUI)."""
+        if not self.n:
+            return "Stats : aucune mesure"
+        line = (f"Stats : N {self.n} | moy {self.mean:.4f} dBm | σ {self.std:.4f} dB | "
+                f"p2p {self.p2p:.4f} dB | dérive {self.drift:+.4f} dB/h")
+        adev = self.allan()
+        if adev:
+            line += " | ADEV " + " ".join(f"{tau:.3g}s:{dev:.2e}" for tau, _, dev, _ in adev[::2])
+        return line
+
+    def write_sheet(self, wb, title: str = "Stats", extra_rows=()) -> None:
+        """Feuille de synthèse (fonctionne aussi sur un classeur write-only).
+        extra_rows : lignes ajoutées après la dérive (ex: jitter du cadencement)."""
+        sheet = wb.create_sheet(title)
+        for row in (["Mesures", self.n],
+                    ["Durée (s)", (self.t_last - self.t_first) if self.n else 0.0],
+                    ["tau0 (s)", self.tau0],
+                    ["Moyenne (dBm)", self.mean],
+                    ["Ecart-type (dB)", self.std],
+                    ["Min (dBm)", self.min if self.n else None],
+                    ["Max (dBm)", self.max if self.n else None],
+                    ["Crête-à-crête (dB)", self.p2p],
+                    ["Dérive linéaire (dB/h)", self.drift],
+                    *extra_rows,
+                    [],
+                    ["tau (s)", "m", "Ecart-type d'Allan (dB)", "Termes"]):
+            sheet.append(row)
+        for row in self.allan():
+            sheet.append(list(row))
@@ -0,0 +1,166 @@
+# Stockage des tests de stabilité longs : brut en fichiers binaires tournants, résumés dans l'xlsx
+# By Arthur Péraud
+import os
+import json
+import numpy as np
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.workbook import Workbook
+
+RAW_DTYPE = np.dtype([('t', '<f8'), ('level', '<f8')])   # 16 octets par mesure
+RAW_CHUNK_SAMPLES = 1_000_000   # Mesures par fichier .bin (16 Mo) avant rotation
+RAW_FLUSH_SAMPLES = 1000        # Mesures bufferisées en mémoire avant écriture disque
+SUMMARY_WINDOWS = {"10 s": 10, "1 min": 60, "10 min": 600}
+SUMMARY_HEADERS = ["Début (s)", "Fin (s)", "Moyenne (dBm)", "Min (dBm)", "Max (dBm)", "Ecart-type (dB)", "N"]
+
+
+class RawChunkWriter:
+    """Mesures (t, level) en float64 dans base_0000.bin, base_0001.bin... (rotation tous
+    les chunk_samples points). base.json décrit le format et la liste des fichiers."""
+
+    def __init__(self, base: str, chunk_samples: int = RAW_CHUNK_SAMPLES, flush_samples: int = RAW_FLUSH_SAMPLES):
+        self.base = base
+        self.chunk_samples = chunk_samples
+        self.buffer = np.empty(flush_samples, dtype=RAW_DTYPE)
+        self.buffered = 0
+        self.files = []
+        self.in_chunk = 0       # Mesures déjà écrites dans le fichier courant
+        self.count = 0
+        self.file = None
+
+    def _open_next(self) -> None:
+        if self.file:
+            self.file.close()
+        path = f"{self.base}_{len(self.files):04d}.bin"
+        self.files.append(os.path.basename(path))
+        self.file = open(path, "wb")
+        self.in_chunk = 0
+
+    def _flush(self) -> None:
+        done = 0
+        while done < self.buffered:
+            if self.file is None or self.in_chunk >= self.chunk_samples:
+                self._open_next()
+            n = min(self.buffered - done, self.chunk_samples - self.in_chunk)
+            self.buffer[done:done + n].tofile(self.file)
+            self.in_chunk += n
+            done += n
+        if self.file:
+            self.file.flush()
+        self.buffered = 0
+
+    def add(self, t: float, level: float) -> None:
+        self.buffer[self.buffered] = (t, level)
+        self.buffered += 1
+        self.count += 1
+        if self.buffered == len(self.buffer):
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        if self.file:
+            self.file.close()
+            self.file = None
+        with open(f"{self.base}.json", "w", encoding="utf-8") as f:
+            json.dump({"dtype": RAW_DTYPE.descr, "count": self.count, "files": self.files}, f, indent=1)
+
+
+def Read_raw(base: str) -> np.ndarray:
+    """Relit toutes les mesures brutes d'un test (champs 't' et 'level')."""
+    with open(f"{base}.json", encoding="utf-8") as f:
+        index = json.load(f)
+    folder = os.path.dirname(base)
+    chunks = [np.fromfile(os.path.join(folder, name), dtype=RAW_DTYPE) for name in index["files"]]
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=RAW_DTYPE)
+
+
+class WindowSummary:
+    """min / max / moyenne / écart-type par fenêtre de width s, émis à la clôture de chaque fenêtre."""
+
+    def __init__(self, width: float, emit):
+        self.width = width
+        self.emit = emit        # emit(list) : une ligne SUMMARY_HEADERS
+        self.window = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def _close_window(self) -> None:
+        if self.n:
+            std = (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0
+            start = self.window * self.width
+            self.emit([start, start + self.width, self.mean, self.min, self.max, std, self.n])
+        self._reset()
+
+    def add(self, t: float, level: float) -> None:
+        window = int(t // self.width)
+        if window != self.window:
+            self._close_window()
+            self.window = window
+        # Welford : stable même pour un écart-type de quelques mdB autour de -30 dBm
+        self.n += 1
+        delta = level - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (level - self.mean)
+        self.min = min(self.min, level)
+        self.max = max(self.max, level)
+
+    def close(self) -> None:
+        self._close_window()
+
+
+class StabilityStore:
+    """Remplace DataSheetWriter pour les tests longs (même interface set_row / finalize).
+
+    Les mesures brutes vont dans les fichiers binaires raw_base_XXXX.bin, seules les feuilles
+    de résumé (une par fenêtre de SUMMARY_WINDOWS) sont écrites, en flux, dans le classeur.
+    Mémoire constante quelle que soit la durée du test.
+    """
+
+    def __init__(self, raw_base: str, number_format: str, windows: dict = None):
+        self.raw = RawChunkWriter(raw_base)
+        self.number_format = number_format
+
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.summaries = []
+        for title, width in (windows or SUMMARY_WINDOWS).items():
+            sheet = self.wb.create_sheet(title)
+            sheet.append(SUMMARY_HEADERS)
+            self.summaries.append(WindowSummary(width, lambda row, sheet=sheet: self._append(sheet, row)))
+        self.closed = False
+
+    def _append(self, sheet, row: list) -> None:
+        cells = []
+        for value in row[:-1]:
+            cell = WriteOnlyCell(sheet, value=value)
+            cell.number_format = self.number_format
+            cells.append(cell)
+        sheet.append(cells + [row[-1]])
+
+    def add(self, t: float, level: float) -> None:
+        self.raw.add(t, level)
+        for summary in self.summaries:
+            summary.add(t, level)
+
+    def set_row(self, index: int, values: dict) -> None:
+        """Interface DataSheetWriter : {'B': t, 'C': level}."""
+        self.add(values['B'], values['C'])
+
+    def finalize(self) -> Workbook:
+        if not self.closed:
+            for summary in self.summaries:
+                summary.close()
+            self.raw.close()
+
+            files = self.wb.create_sheet("Brut")
+            files.append(["Mesures", self.raw.count])
+            files.append(["Index", os.path.basename(self.raw.base) + ".json"])
+            for name in self.raw.files:
+                files.append(["Fichier", name])
+            self.closed = True
+        return self.wb
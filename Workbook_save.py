@@ -0,0 +1,209 @@
+# Sauvegarde des classeurs vers le partage réseau, sans dépendance Qt ni openpyxl
+# By Arthur Péraud
+#
+# Le classeur est sérialisé dans un fichier local (rapide, dans le thread appelant), puis copié vers un
+# fichier temporaire du dossier cible et renommé atomiquement : jamais de fichier à moitié écrit sur le partage.
+# Save_workbook_async rend la main dès la sérialisation, la copie se fait dans un thread de fond.
+import os
+import shutil
+import typing
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Fichier de sortie déjà présent : ask (question), overwrite (écrasé), rename (nom unique), skip (non sauvegardé)
+OVERWRITE_POLICIES = ("ask", "overwrite", "rename", "skip")
+STAGING_DIR = None          # Dossier local des fichiers sérialisés (None : dossier temporaire du système)
+COPY_CHUNK = 1 << 20        # Octets par écriture vers le partage
+PROGRESS_MIN_SIZE = 8 << 20 # Progression de la copie journalisée au-delà de cette taille
+PROGRESS_STEP = 25          # %
+SAVE_WORKERS = 2            # Copies vers le partage en parallèle
+
+_pool = None
+_pool_lock = threading.Lock()
+_reserved = set()           # Cibles en cours de copie : exclues par Get_unique_filename
+
+
+class SaveJob(typing.NamedTuple):
+    path: str               # Fichier final sur le partage
+    future: Future          # Résultat : path, ou l'exception de la copie
+
+    def wait(self, timeout: float = None) -> str:
+        return self.future.result(timeout)
+
+
+def Is_file_locked(filepath: str) -> bool:
+    """Vérifie si un fichier est ouvert ou verrouillé (ex: par Excel)."""
+    if not os.path.exists(filepath):
+        return False
+    try:
+        with open(filepath, "a"):
+            return False
+    except IOError:
+        return True
+
+
+def Get_unique_filename(path: str) -> str:
+    """Génère un nom de fichier unique en ajoutant (1), (2), etc. s'il existe déjà.
+    Un seul listage du dossier (au lieu d'un os.path.exists par candidat sur le partage)."""
+    path = str(path)
+    folder, name = os.path.split(path)
+    try:
+        existing = {entry.lower() for entry in os.listdir(folder or ".")}
+    except FileNotFoundError:
+        existing = set()
+    with _pool_lock:
+        existing |= {os.path.basename(p).lower() for p in _reserved if os.path.dirname(p) == folder}
+
+    base, ext = os.path.splitext(name)
+    i = 1
+    new_name = name
+    while new_name.lower() in existing:
+        new_name = f"{base}({i}){ext}"
+        i += 1
+    return os.path.join(folder, new_name)
+
+
+def Ask_console(output_file: str) -> typing.Optional[str]:
+    """Question "écraser ?" en console : overwrite, rename, ou None (réponse non reconnue)."""
+    confirm = input(f"\n⚠️  Le fichier '{output_file}' existe déjà. Voulez-vous l’écraser ? (o/n) : ").strip().lower()
+    if confirm in ['o', 'y']:
+        return "overwrite"
+    if confirm == 'n':
+        return "rename"
+    print("Réponse non reconnue.")
+    return None
+
+
+def Resolve_output(output_file: str, overwrite: str = "rename", ask=Ask_console,
+                   log_func=print) -> typing.Optional[str]:
+    """Fichier à écrire selon la politique overwrite (None : non sauvegardé). Crée le dossier si besoin.
+    ask(output_file) -> "overwrite" / "rename" / None, appelé pour la politique "ask"."""
+    if overwrite not in OVERWRITE_POLICIES:
+        raise ValueError(f"Politique d'écrasement inconnue : {overwrite} ({', '.join(OVERWRITE_POLICIES)})")
+    output_file = str(output_file)
+
+    # Vérifie et crée le dossier si nécessaire
+    folder = os.path.dirname(output_file)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+        log_func(f"📂 Dossier créé : {folder}")
+
+    with _pool_lock:
+        pending = output_file in _reserved
+    if not pending and not os.path.exists(output_file):
+        return output_file
+    if overwrite == "ask":
+        overwrite = ask(output_file)
+    if overwrite == "overwrite":
+        log_func(f"⚠️  '{output_file}' existe déjà, il sera écrasé.")
+        return output_file
+    if overwrite == "rename":
+        new_file = Get_unique_filename(output_file)
+        log_func(f"📁 '{output_file}' existe déjà, nouveau nom : {new_file}")
+        return new_file
+    if overwrite == "skip":
+        log_func(f"⏭️  '{output_file}' existe déjà, fichier non sauvegardé.")
+    else:
+        log_func(f"Fichier non sauvegardé : {output_file}")
+    return None
+
+
+def Stage_workbook(wb, target: str) -> str:
+    """Sérialise le classeur en local. Dossier cible sur le même disque : directement à côté de la cible."""
+    folder = os.path.dirname(os.path.abspath(target))
+    staging = STAGING_DIR or tempfile.gettempdir()
+    try:
+        local = os.stat(staging).st_dev == os.stat(folder).st_dev
+    except OSError:
+        local = False
+    base = os.path.splitext(os.path.basename(target))[0]
+    fd, tmp = tempfile.mkstemp(suffix=".xlsx", prefix=f".{base}_", dir=folder if local else staging)
+    os.close(fd)
+    try:
+        wb.save(tmp)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return tmp
+
+
+def Publish(staged: str, target: str, log_func=print) -> str:
+    """Copie staged vers un temporaire du dossier cible puis renomme atomiquement (os.replace).
+    En cas d'échec le fichier local est conservé et signalé."""
+    folder = os.path.dirname(os.path.abspath(target))
+    try:
+        if os.path.dirname(os.path.abspath(staged)) != folder:
+            fd, tmp = tempfile.mkstemp(suffix=".tmp", prefix=".save_", dir=folder)
+            try:
+                size = os.path.getsize(staged)
+                copied = 0
+                next_percent = PROGRESS_STEP
+                with open(staged, "rb") as src, os.fdopen(fd, "wb") as dst:
+                    while True:
+                        chunk = src.read(COPY_CHUNK)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        copied += len(chunk)
+                        percent = copied * 100 // size
+                        if size >= PROGRESS_MIN_SIZE and next_percent <= percent < 100:
+                            log_func(f"⏳ Copie {os.path.basename(target)} : {percent}%")
+                            next_percent = (percent // PROGRESS_STEP + 1) * PROGRESS_STEP
+                shutil.copystat(staged, tmp)
+                os.replace(tmp, target)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            os.remove(staged)
+        else:
+            os.replace(staged, target)
+    except Exception as e:
+        log_func(f"❌ Sauvegarde échouée vers {target} : {e}. Copie locale conservée : {staged}")
+        raise
+    finally:
+        with _pool_lock:
+            _reserved.discard(target)
+    return target
+
+
+def _Save_pool() -> ThreadPoolExecutor:
+    # Threads non démons : le programme attend la fin des copies avant de quitter
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=SAVE_WORKERS, thread_name_prefix="save")
+        return _pool
+
+
+def Save_workbook_async(wb, output_file: str, overwrite: str = "rename", log_func=print,
+                        ask=Ask_console) -> typing.Optional[SaveJob]:
+    """Sérialise le classeur en local puis rend la main ; la copie vers le partage continue en fond.
+    Retourne le SaveJob (None si non sauvegardé). Le classeur peut être réutilisé / fermé au retour."""
+    target = Resolve_output(output_file, overwrite, ask, log_func)
+    if target is None:
+        return None
+    with _pool_lock:
+        _reserved.add(target)
+    try:
+        staged = Stage_workbook(wb, target)
+    except BaseException:
+        with _pool_lock:
+            _reserved.discard(target)
+        raise
+
+    def Copy() -> str:
+        Publish(staged, target, log_func)
+        log_func(f"✅ Fichier sauvegardé sous {target}")
+        return target
+
+    log_func(f"💾 Copie en cours vers {target}")
+    return SaveJob(target, _Save_pool().submit(Copy))
+
+
+def Save_workbook_safely(wb, output_file: str, overwrite: str = "ask", log_func=print,
+                         ask=Ask_console) -> typing.Optional[str]:
+    """Comme Save_workbook_async, mais attend la fin de la copie. Retourne le fichier écrit (None si non sauvegardé)."""
+    job = Save_workbook_async(wb, output_file, overwrite, log_func, ask)
+    return job.wait() if job else None
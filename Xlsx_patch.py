@@ -0,0 +1,240 @@
+# Manipulation d'un xlsx au niveau XML : cellules substituées dans le XML des feuilles, le reste du zip recopié
+# By Arthur Péraud
+import os
+import re
+import posixpath
+import tempfile
+import zipfile
+from io import BytesIO
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+from openpyxl.cell._writer import write_cell
+from openpyxl.utils import coordinate_to_tuple, column_index_from_string, get_column_letter
+from openpyxl.xml.functions import xmlfile
+
+DIMENSION_RE = re.compile(rb'<dimension [^>]*/>')
+ROW_RE = re.compile(rb'<row\b[^>]*?\sr="(\d+)"[^>]*?(/?)>')
+CELL_START_RE = re.compile(rb'<c\b[^>]*?\sr="([A-Z]+)\d+"')
+CALC_CHAIN = "xl/calcChain.xml"
+# Eléments qui suivent <calcPr> dans CT_Workbook
+AFTER_CALC_PR = (b"<oleSize", b"<customWorkbookViews", b"<pivotCaches", b"<smartTagPr", b"<smartTagTypes",
+                 b"<webPublishing", b"<fileRecoveryPr", b"<webPublishObjects", b"<extLst", b"</workbook>")
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def Cell_xml(cell) -> bytes:
+    """Elément <c> d'une cellule sérialisé comme par Workbook.save (b"" si openpyxl ne l'écrirait pas)."""
+    if cell._value is None and not cell.has_style and not cell._comment:
+        return b""
+    out = BytesIO()
+    with xmlfile(out) as xf:
+        write_cell(xf, cell.parent, cell, cell.has_style)
+    return out.getvalue()
+
+
+def Cell_re(coord: str) -> re.Pattern:
+    """Elément <c r="coord"> complet (auto-fermant ou avec contenu), attributs dans n'importe quel ordre."""
+    return re.compile(rb'<c\b(?=[^>]*\sr="' + coord.encode() + rb'")[^>]*?(?:/>|>.*?</c>)', re.S)
+
+
+class SheetTemplate:
+    """XML d'une feuille découpé autour de cellules à trous et de <dimension>.
+    stamp() recolle les morceaux fixes avec le XML de chaque cellule, sans reparser la feuille."""
+
+    def __init__(self, xml: bytes, coords):
+        spans = []
+        m = DIMENSION_RE.search(xml)
+        if m is None:
+            raise ValueError("Pas de <dimension> dans la feuille")
+        spans.append((m.start(), m.end(), None))
+        for coord in coords:
+            m = Cell_re(coord).search(xml)
+            if m is None:
+                raise ValueError(f"Cellule {coord} absente du XML de la feuille")
+            spans.append((m.start(), m.end(), coord))
+        spans.sort()
+
+        self.parts = []     # Morceaux fixes, len(self.keys) + 1
+        self.keys = []      # None = <dimension>, sinon coordonnée
+        pos = 0
+        for start, end, key in spans:
+            if start < pos:
+                raise ValueError(f"Cellules imbriquées dans le XML ({key})")
+            self.parts.append(xml[pos:start])
+            self.keys.append(key)
+            pos = end
+        self.parts.append(xml[pos:])
+
+    def stamp(self, cells: dict, dimension: str) -> bytes:
+        """cells : {coordonnée: XML de la cellule (b"" pour l'omettre)}."""
+        dim = b'<dimension ref="' + dimension.encode() + b'" />'
+        out = [self.parts[0]]
+        for key, part in zip(self.keys, self.parts[1:]):
+            out.append(dim if key is None else cells[key])
+            out.append(part)
+        return b"".join(out)
+
+
+def Rewrite_package(source, target, replacements: dict, drop=()) -> None:
+    """Recopie le zip source (chemin, fichier ou ZipFile) vers target en remplaçant les membres de
+    replacements {nom: contenu} et en omettant ceux de drop. Les autres sont recopiés tels quels, dans le même ordre."""
+    zin = source if isinstance(source, zipfile.ZipFile) else zipfile.ZipFile(source)
+    try:
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zout:
+            for info in zin.infolist():
+                if info.filename in drop:
+                    continue
+                data = replacements.get(info.filename)
+                zout.writestr(info, zin.read(info) if data is None else data)
+    finally:
+        if zin is not source:
+            zin.close()
+
+
+def Value_xml(coord: str, attrs: bytes, value) -> bytes:
+    """<c> avec la valeur donnée ; attrs : attributs conservés (style...) hors r et t."""
+    head = b'<c r="' + coord.encode() + b'"' + attrs
+    if value is None:
+        return head + b"/>"
+    if isinstance(value, bool):
+        return head + b' t="b"><v>' + (b"1" if value else b"0") + b"</v></c>"
+    if isinstance(value, (int, float)):
+        return head + b"><v>" + repr(value).encode() + b"</v></c>"
+    if isinstance(value, str):
+        space = b' xml:space="preserve"' if value != value.strip() else b""
+        return head + b' t="inlineStr"><is><t' + space + b">" + escape(value).encode() + b"</t></is></c>"
+    raise ValueError(f"Type non pris en charge pour {coord} : {type(value).__name__}")
+
+
+def Patch_cells(xml: bytes, values: dict) -> bytes:
+    """Remplace (ou insère, dans l'ordre lignes / colonnes) les cellules {coordonnée: valeur} du XML d'une
+    feuille. Le style des cellules existantes est conservé. ValueError si la feuille ne s'y prête pas."""
+    if b"<worksheet" not in xml or b"<sheetData" not in xml:
+        raise ValueError("XML de feuille non reconnu (préfixe d'espace de noms ?)")
+
+    for coord in sorted(values, key=coordinate_to_tuple):
+        row, col = coordinate_to_tuple(coord)
+        m = Cell_re(coord).search(xml)
+        if m:
+            element = m.group()
+            if re.search(rb'<f\b[^>]*\sref="', element):
+                raise ValueError(f"{coord} porte une formule partagée / matricielle")
+            tag = element[:element.index(b">")].rstrip(b"/")
+            attrs = b"".join(a.group() for a in re.finditer(rb'\s(?!r=|t=)[\w:]+="[^"]*"', tag))
+            xml = xml[:m.start()] + Value_xml(coord, attrs, values[coord]) + xml[m.end():]
+            continue
+
+        if values[coord] is None:
+            continue
+        new_cell = Value_xml(coord, b"", values[coord])
+        rows = {int(r.group(1)): r for r in ROW_RE.finditer(xml)}
+        r = rows.get(row)
+        if r is None:
+            # Nouvelle ligne avant la première ligne suivante, sinon en fin de <sheetData>
+            after = [rows[k].start() for k in rows if k > row]
+            new_row = b'<row r="' + str(row).encode() + b'">' + new_cell + b"</row>"
+            if after:
+                pos = min(after)
+            elif b"<sheetData/>" in xml or b"<sheetData />" in xml:
+                xml = re.sub(rb"<sheetData ?/>", b"<sheetData>" + new_row + b"</sheetData>", xml, count=1)
+                continue
+            else:
+                pos = xml.index(b"</sheetData>")
+            xml = xml[:pos] + new_row + xml[pos:]
+            continue
+
+        # spans (indication facultative) retiré : il ne couvrirait plus la nouvelle cellule
+        open_tag = re.sub(rb'\sspans="[^"]*"', b"", r.group()[:-2 if r.group(2) else -1]) + b">"
+        if r.group(2):
+            xml = xml[:r.start()] + open_tag + new_cell + b"</row>" + xml[r.end():]
+            continue
+        end = xml.index(b"</row>", r.end())
+        pos = end
+        for c in CELL_START_RE.finditer(xml, r.end(), end):
+            if column_index_from_string(c.group(1).decode()) > col:
+                pos = c.start()
+                break
+        xml = xml[:r.start()] + open_tag + xml[r.end():pos] + new_cell + xml[pos:]
+
+    return Extend_dimension(xml, values)
+
+
+def Extend_dimension(xml: bytes, coords) -> bytes:
+    m = re.search(rb'<dimension ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"', xml)
+    if m is None:
+        return xml
+    min_col = column_index_from_string(m.group(1).decode())
+    min_row = int(m.group(2))
+    max_col = column_index_from_string((m.group(3) or m.group(1)).decode())
+    max_row = int(m.group(4) or m.group(2))
+    for coord in coords:
+        row, col = coordinate_to_tuple(coord)
+        min_row, max_row = min(min_row, row), max(max_row, row)
+        min_col, max_col = min(min_col, col), max(max_col, col)
+    ref = f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}".encode()
+    return xml[:m.start()] + b'<dimension ref="' + ref + b'"' + xml[m.end():]
+
+
+def Sheet_members(archive: zipfile.ZipFile) -> dict:
+    """{titre: membre du zip} des feuilles de calcul, dans l'ordre du classeur."""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {}
+    for rel in rels.iter(f"{NS_PKG_REL}Relationship"):
+        if rel.get("Type", "").endswith("/worksheet"):
+            target = rel.get("Target")
+            targets[rel.get("Id")] = target[1:] if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+    members = {}
+    for sheet in workbook.iter(f"{NS_MAIN}sheet"):
+        rid = sheet.get(f"{NS_REL}id")
+        if rid in targets:
+            members[sheet.get("name")] = targets[rid]
+    return members
+
+
+def Full_calc_on_load(xml: bytes) -> bytes:
+    """workbook.xml avec <calcPr fullCalcOnLoad="1"> : Excel recalcule les formules à l'ouverture."""
+    m = re.search(rb"<calcPr\b[^>]*?/?>", xml)
+    if m:
+        tag = re.sub(rb'\sfullCalcOnLoad="[^"]*"', b"", m.group())
+        end = -2 if tag.endswith(b"/>") else -1
+        tag = tag[:end].rstrip() + b' fullCalcOnLoad="1"' + tag[end:]
+        return xml[:m.start()] + tag + xml[m.end():]
+    pos = min(i for i in (xml.find(t) for t in AFTER_CALC_PR) if i >= 0)
+    return xml[:pos] + b'<calcPr fullCalcOnLoad="1"/>' + xml[pos:]
+
+
+def Without_calc_chain(member: str, xml: bytes) -> bytes:
+    """[Content_Types].xml / workbook.xml.rels sans la référence à calcChain.xml (reconstruit par Excel)."""
+    if member == "[Content_Types].xml":
+        return re.sub(rb'<Override\b[^>]*PartName="/xl/calcChain.xml"[^>]*/>', b"", xml)
+    return re.sub(rb'<Relationship\b[^>]*Target="/?(?:xl/)?calcChain.xml"[^>]*/>', b"", xml)
+
+
+def Patch_workbook(path: str, sheet_values: dict) -> None:
+    """Ecrit {titre: {coordonnée: valeur}} directement dans le XML des feuilles concernées.
+    Les autres membres du zip sont recopiés tels quels ; le fichier est remplacé atomiquement."""
+    with zipfile.ZipFile(path) as archive:
+        members = Sheet_members(archive)
+        missing = [title for title in sheet_values if title not in members]
+        if missing:
+            raise ValueError(f"Feuille(s) introuvable(s) : {', '.join(missing)}")
+
+        replacements = {members[title]: Patch_cells(archive.read(members[title]), values)
+                        for title, values in sheet_values.items()}
+        replacements["xl/workbook.xml"] = Full_calc_on_load(archive.read("xl/workbook.xml"))
+        names = archive.namelist()
+        if CALC_CHAIN in names:
+            for member in ("[Content_Types].xml", "xl/_rels/workbook.xml.rels"):
+                replacements[member] = Without_calc_chain(member, archive.read(member))
+
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                Rewrite_package(archive, f, replacements, drop={CALC_CHAIN})
+        except BaseException:
+            os.remove(tmp)
+            raise
+    os.replace(tmp, path)